@@ -6,12 +6,25 @@
 # @Software: PyCharm
 import os
 from firecrawl import FirecrawlApp
+import io
 import json
 import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 from dotenv import load_dotenv
 import google.genai as genai
+from gemini_memo import GeminiMemo
+from http_cache import HTTPCache, ResponseTooLarge
+
+try:
+    import pypdf  # optional: local page selection before a PDF is uploaded
+except ImportError:
+    pypdf = None
 
 # Load environment variables
 load_dotenv()
@@ -25,6 +38,52 @@ app = FirecrawlApp(api_key=firecrawl_api_key)
 client = genai.Client(api_key=gemini_api_key)  # Create Gemini client
 model_name = "gemini-2.0-flash"
 types = genai.types
+# Persistent memo of Gemini responses (GEMINI_MEMO_PATH, GEMINI_MEMO_TTL, GEMINI_MEMO_BYPASS)
+gemini = GeminiMemo(client)
+
+# PDF extraction settings
+PDF_MAX_BYTES = 15 * 1024 * 1024  # PDFs over this size are not downloaded
+PDF_MAX_UPLOAD_PAGES = 20  # most keyword-dense pages uploaded per PDF
+PDF_FALLBACK_PAGES = 3  # leading pages uploaded when no page mentions an objective keyword
+OBJECTIVE_STOPWORDS = {
+    'the', 'and', 'for', 'with', 'from', 'that', 'this', 'what', 'which', 'who', 'when', 'where', 'how',
+    'are', 'was', 'were', 'find', 'get', 'about', 'into', 'their', 'its', 'all', 'any', 'information',
+    'details', 'list', 'show', 'give', 'tell', 'page', 'website', 'site',
+}
+
+# Top-page analysis settings
+TOP_PAGES = 3  # ranked pages analyzed per objective
+# Scraping the ranked pages concurrently answers faster but may scrape and prompt on every candidate
+# page before the first answer lands (up to max_pages times the Firecrawl / Gemini calls); off by default
+TOP_PAGES_PARALLEL = os.getenv("TOP_PAGES_PARALLEL", "") not in ("", "0")
+
+# MIME detection settings
+MIME_WORKERS = 16  # concurrent HEAD requests per batch
+MIME_PER_HOST_LIMIT = 4  # concurrent HEAD requests against a single host
+MIME_NEGATIVE_TTL = 300  # seconds to skip a host after a HEAD timeout / connection failure
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.heif')
+# Extensions and domains that can never be a PDF or a supported image, so no HEAD is needed
+NON_MEDIA_EXTENSIONS = (
+    '.html', '.htm', '.php', '.asp', '.aspx', '.jsp', '.css', '.js', '.json', '.xml', '.rss', '.txt',
+    '.svg', '.ico', '.zip', '.gz', '.mp3', '.mp4', '.webm', '.mov', '.doc', '.docx', '.xls', '.xlsx',
+)
+NON_MEDIA_DOMAINS = (
+    'twitter.com', 'x.com', 'facebook.com', 'instagram.com', 'linkedin.com', 'youtube.com', 'youtu.be',
+    'tiktok.com', 'github.com', 'wikipedia.org', 'apple.com', 'reddit.com',
+)
+
+# Shared keep-alive connection pool for HEAD requests and downloads; sized for every top page running
+# its MIME batch at once, so parallel analysis does not discard and reopen connections
+HTTP_POOL_SIZE = MIME_WORKERS * TOP_PAGES
+http_session = requests.Session()
+http_session.mount("http://", HTTPAdapter(pool_connections=32, pool_maxsize=HTTP_POOL_SIZE))
+http_session.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=HTTP_POOL_SIZE))
+# Revalidating on-disk cache for PDFs, images and HEAD results (HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES,
+# HTTP_CACHE_STALE_SECONDS), so re-running an objective against a crawled site is nearly network-free
+http_cache = HTTPCache(session=http_session)
+_host_slots = {}  # host -> semaphore capping concurrent HEAD requests
+_failed_hosts = {}  # host -> time until which the host is skipped
+_mime_lock = threading.Lock()
 
 
 # ANSI color codes
@@ -45,17 +104,67 @@ def pdf_size_in_mb(data: bytes) -> float:
     return len(data) / (1024 * 1024)
 
 
+def objective_keywords(objective):
+    """
+    Lowercase keywords of an objective for matching against page text.
+    Latin words of 3+ letters minus stopwords; CJK runs are split into overlapping character pairs.
+    """
+    keywords = set()
+    for word in re.findall(r'[^\W_]+', objective.lower()):
+        cjk_runs = re.findall(r'[\u4e00-\u9fff]+', word)
+        if cjk_runs:
+            for run in cjk_runs:
+                keywords.update(run[i:i + 2] for i in range(max(1, len(run) - 1)))
+        elif len(word) >= 3 and word not in OBJECTIVE_STOPWORDS:
+            keywords.add(word)
+    return keywords
+
+
+def select_pdf_pages(pdf_data, objective):
+    """
+    Cut a PDF down to the pages whose text mentions objective keywords (at most PDF_MAX_UPLOAD_PAGES,
+    densest first, kept in document order). Returns (pdf_bytes, kept_page_indexes, total_pages), or None
+    when the whole PDF should be uploaded: pypdf is not installed, the PDF cannot be parsed, it has no
+    text layer (scanned), or every page would be kept anyway.
+    """
+    if pypdf is None:
+        return None
+    keywords = objective_keywords(objective)
+    try:
+        reader = pypdf.PdfReader(io.BytesIO(pdf_data))
+        texts = [(page.extract_text() or '').lower() for page in reader.pages]
+    except Exception as e:
+        print(f"{Colors.YELLOW}Warning: local PDF text extraction failed, uploading the whole PDF. Error: {e}{Colors.RESET}")
+        return None
+    if not any(text.strip() for text in texts):
+        return None
+
+    scores = [sum(text.count(keyword) for keyword in keywords) for text in texts]
+    matching = sorted((i for i, score in enumerate(scores) if score), key=lambda i: -scores[i])
+    kept = sorted(matching[:PDF_MAX_UPLOAD_PAGES]) or list(range(min(PDF_FALLBACK_PAGES, len(texts))))
+    if len(kept) >= len(texts):
+        return None
+
+    writer = pypdf.PdfWriter()
+    for i in kept:
+        writer.add_page(reader.pages[i])
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue(), kept, len(texts)
+
+
 def gemini_extract_pdf_content(pdf_url, objective):
     """
-    Downloads a PDF from pdf_url, then calls Gemini to extract text.
+    Downloads a PDF from pdf_url (streamed, abandoned past PDF_MAX_BYTES), then calls Gemini to extract text.
+    When pypdf is installed only the pages mentioning objective keywords are uploaded; a PDF already
+    answered for this objective is served from the memo without being parsed.
     Returns a string with the extracted text only.
     """
     try:
-        pdf_data = requests.get(pdf_url, timeout=15).content
-        size_mb = pdf_size_in_mb(pdf_data)
-        if size_mb > 15:
-            print(
-                f"{Colors.YELLOW}Warning: PDF size is {size_mb} MB. Skipping PDF extraction.{Colors.RESET}")
+        try:
+            pdf_data = http_cache.get(pdf_url, timeout=15, max_bytes=PDF_MAX_BYTES).content
+        except ResponseTooLarge as e:
+            print(f"{Colors.YELLOW}Warning: {e}. Skipping PDF extraction.{Colors.RESET}")
             return ""
 
         prompt = f"""
@@ -63,13 +172,28 @@ def gemini_extract_pdf_content(pdf_url, objective):
         From this PDF, extract only the text that helps address this objective.
         If it contains no relevant info, return an empty string.
         """
-        response = client.models.generate_content(
+        # Keyed on the original PDF bytes and kept without expiry, so a document is only ever sent once
+        key_contents = [types.Part.from_bytes(data=pdf_data, mime_type="application/pdf"), prompt]
+        cached = gemini.lookup(model_name, key_contents)
+        if cached is not None:
+            return cached.text.strip()
+
+        upload_data = pdf_data
+        selected = select_pdf_pages(pdf_data, objective)
+        if selected:
+            upload_data, kept, total = selected
+            print(f"{Colors.CYAN}PDF pre-extraction: selected {len(kept)}/{total} pages "
+                  f"({pdf_size_in_mb(upload_data):.2f} of {pdf_size_in_mb(pdf_data):.2f} MB){Colors.RESET}")
+
+        response = gemini.generate_content(
             model=model_name,
             contents=[
                 types.Part.from_bytes(
-                    data=pdf_data, mime_type="application/pdf"),
+                    data=upload_data, mime_type="application/pdf"),
                 prompt
-            ]
+            ],
+            ttl=0,
+            key_contents=key_contents
         )
         return response.text.strip()
     except Exception as e:
@@ -85,12 +209,16 @@ def gemini_extract_image_data(image_url):
     """
     try:
         print(f"Gemini IMAGE extraction from: {image_url}")
-        image_data = requests.get(image_url, timeout=15).content
+        image_data = http_cache.get(image_url, timeout=15).content
         # 1) Summarize
-        resp_summary = client.models.generate_content([
-            "Describe the contents of this image in a short paragraph.",
-            types.Part.from_bytes(data=image_data, mime_type="image/jpeg"),
-        ])
+        resp_summary = gemini.generate_content(
+            model=model_name,
+            contents=[
+                "Describe the contents of this image in a short paragraph.",
+                types.Part.from_bytes(data=image_data, mime_type="image/jpeg"),
+            ],
+            ttl=0
+        )
         summary_text = resp_summary.text.strip()
 
         return f"**Image Summary**:\n{summary_text}"
@@ -109,27 +237,112 @@ def extract_urls_from_markdown(markdown_text):
     return list(set(found))  # unique them
 
 
+def classify_url_fast(url):
+    """
+    Classify a URL from its extension or domain without any network request.
+    Returns 'pdf', 'image', None (certainly neither), or 'unknown' when a HEAD request is needed.
+    """
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+    path = parsed.path.lower()
+    if path.endswith('.pdf'):
+        return 'pdf'
+    if path.endswith(IMAGE_EXTENSIONS):
+        return 'image'
+    if path.endswith(NON_MEDIA_EXTENSIONS):
+        return None
+    if any(host == domain or host.endswith('.' + domain) for domain in NON_MEDIA_DOMAINS):
+        return None
+    return 'unknown'
+
+
+def _host_slot(host):
+    with _mime_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(MIME_PER_HOST_LIMIT)
+        return _host_slots[host]
+
+
+def _host_failed_recently(host):
+    with _mime_lock:
+        until = _failed_hosts.get(host)
+        if until is None:
+            return False
+        if until < time.monotonic():
+            del _failed_hosts[host]
+            return False
+        return True
+
+
 def detect_mime_type(url, timeout=8):
     """
-    Attempt a HEAD request to detect the Content-Type. Return 'pdf', 'image' or None if undetermined.
-    Also validates image extensions for supported formats.
+    Detect whether url points to a PDF or a supported image. Return 'pdf', 'image' or None if undetermined.
+    Uses the extension / domain fast path first, then a cached HEAD request over the shared connection pool,
+    at most MIME_PER_HOST_LIMIT at a time per host. Hosts that time out are skipped for MIME_NEGATIVE_TTL seconds.
     """
+    fast = classify_url_fast(url)
+    if fast != 'unknown':
+        return fast
+
+    host = (urlparse(url).hostname or '').lower()
+    if _host_failed_recently(host):
+        return None
     try:
-        resp = requests.head(url, timeout=timeout, allow_redirects=True)
+        with _host_slot(host):
+            if _host_failed_recently(host):  # another thread gave up on this host while we waited
+                return None
+            resp = http_cache.head(url, timeout=timeout)
         ctype = resp.headers.get('Content-Type', '').lower()
-        exts = ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.heif']
 
         if 'pdf' in ctype:
             return 'pdf'
-        elif ctype.startswith('image/') and any(url.lower().endswith(ext) for ext in exts):
+        elif ctype.startswith('image/') and urlparse(resp.url or url).path.lower().endswith(IMAGE_EXTENSIONS):
             return 'image'
         else:
             return None
+    except (requests.Timeout, requests.ConnectionError) as e:
+        with _mime_lock:
+            _failed_hosts[host] = time.monotonic() + MIME_NEGATIVE_TTL
+        print(f"Warning: HEAD request failed for {url}, skipping host {host} for {MIME_NEGATIVE_TTL}s. Error: {e}")
+        return None
     except RequestException as e:
         print(f"Warning: HEAD request failed for {url}. Error: {e}")
         return None
 
 
+def detect_mime_types(urls, timeout=8):
+    """
+    Classify a batch of URLs concurrently. Returns {url: 'pdf' | 'image' | None}.
+    URLs resolved by the fast path never reach the thread pool.
+    """
+    results = {}
+    pending = []
+    for url in urls:
+        fast = classify_url_fast(url)
+        if fast == 'unknown':
+            pending.append(url)
+        else:
+            results[url] = fast
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(MIME_WORKERS, len(pending))) as pool:
+            for url, mime_type in zip(pending, pool.map(lambda u: detect_mime_type(u, timeout), pending)):
+                results[url] = mime_type
+
+    print(f"{Colors.CYAN}Classified {len(results)} URLs ({len(results) - len(pending)} by extension/domain, "
+          f"{len(pending)} by HEAD): {sum(1 for t in results.values() if t == 'pdf')} PDF, "
+          f"{sum(1 for t in results.values() if t == 'image')} images{Colors.RESET}")
+    return results
+
+
+def relevance_score(result):
+    """Numeric relevance of a ranked result; the LLM may return scores as strings, so anything unparsable is 0."""
+    try:
+        return float(result.get("relevance_score") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
 def find_relevant_page_via_map(objective, url, app):
     try:
         print(f"{Colors.CYAN}Understood. The objective is: {objective}{Colors.RESET}")
@@ -143,7 +356,7 @@ def find_relevant_page_via_map(objective, url, app):
         print(
             f"{Colors.YELLOW}Analyzing objective to determine optimal search parameter...{Colors.RESET}")
         # Use gemini-pro instead of gemini-2.0-flash
-        response = client.models.generate_content(
+        response = gemini.generate_content(
             model=model_name,
             contents=[map_prompt]
         )
@@ -200,7 +413,7 @@ def find_relevant_page_via_map(objective, url, app):
         {json.dumps(links, indent=2)}"""
 
         print(f"{Colors.YELLOW}Ranking URLs by relevance to objective...{Colors.RESET}")
-        response = client.models.generate_content(
+        response = gemini.generate_content(
             model=model_name,
             contents=[rank_prompt]
         )
@@ -227,6 +440,8 @@ def find_relevant_page_via_map(objective, url, app):
                 print(f"{Colors.RED}No JSON array found in response{Colors.RESET}")
                 return None
 
+            # Most relevant first: this is the order pages are scraped and the tie-breaker between answers
+            ranked_results.sort(key=relevance_score, reverse=True)
             links = [result["url"] for result in ranked_results]
 
             print(f"{Colors.CYAN}Top 3 ranked URLs:{Colors.RESET}")
@@ -258,94 +473,160 @@ def find_relevant_page_via_map(objective, url, app):
         return None
 
 
-def find_objective_in_top_pages(map_website, objective, app):
+class PageAnalysisCancelled(Exception):
+    """Raised inside a page worker once another page has already satisfied the objective."""
+
+
+def analyze_page(link, objective, app, cancelled=None):
+    """
+    Scrape one page, enrich it with PDF/image extraction and ask Gemini whether it meets the objective.
+    Returns the parsed JSON object, or None if the objective is not met on this page.
+    Between stages the worker checks the cancelled event and stops before issuing more scrapes or LLM calls.
+    """
+    def check_cancelled():
+        if cancelled is not None and cancelled.is_set():
+            raise PageAnalysisCancelled(link)
+
+    print(f"{Colors.YELLOW}Initiating scrape of page: {link}{Colors.RESET}")
+    scrape_result = app.scrape_url(
+        link, params={'formats': ['markdown']})
+    print(
+        f"{Colors.GREEN}Page scraping completed successfully: {link}{Colors.RESET}")
+    check_cancelled()
+
+    # Now detect any PDF or image URLs in the Markdown text
+    page_markdown = scrape_result.get('markdown', '')
+    if not page_markdown:
+        print(
+            f"{Colors.RED}No markdown returned for {link}, skipping...{Colors.RESET}")
+        return None
+
+    found_urls = extract_urls_from_markdown(page_markdown)
+    pdf_image_append = ""
+
+    mime_types = detect_mime_types(found_urls)
+    for sub_url in found_urls:
+        mime_type_short = mime_types[sub_url]
+        if mime_type_short == 'pdf':
+            check_cancelled()
+            print(
+                f"{Colors.YELLOW} Detected PDF: {sub_url}. Extracting content...{Colors.RESET}")
+            pdf_content = gemini_extract_pdf_content(sub_url, objective)
+            if pdf_content:
+                pdf_image_append += f"\n\n---\n[PDF from {sub_url}]:\n{pdf_content}"
+        elif mime_type_short == 'image':
+            check_cancelled()
+            print(
+                f"{Colors.YELLOW} Detected Image: {sub_url}. Extracting content...{Colors.RESET}")
+            image_content = gemini_extract_image_data(sub_url)
+            if image_content:
+                pdf_image_append += f"\n\n---\n[Image from {sub_url}]:\n{image_content}"
+
+    # Append extracted PDF/image text to the main markdown for the page
+    if pdf_image_append:
+        scrape_result[
+            'markdown'] += f"\n\n---\n**Additional Gemini Extraction:**\n{pdf_image_append}\n"
+
+    check_prompt = f"""
+    Analyze this content to find: {objective}
+    If found, return ONLY a JSON object with information related to the objective. If not found, respond EXACTLY with: Objective not met
+
+    Content to analyze:
+    {scrape_result['markdown']}
+
+    Remember:
+    - Return valid JSON if information is found
+    - Return EXACTLY "Objective not met" if not found
+    - No other text or explanations
+    """
+
+    check_cancelled()
+    response = gemini.generate_content(
+        model=model_name,
+        contents=[check_prompt]
+    )
+
+    result = response.text.strip()
+
+    print(f"{Colors.MAGENTA}Debug - Check response for {link}:{Colors.RESET}")
+    print(result)
+
+    if result != "Objective not met":
+        print(
+            f"{Colors.GREEN}Objective potentially fulfilled. Relevant information identified.{Colors.RESET}")
+        try:
+            if '{' in result and '}' in result:
+                start_idx = result.find('{')
+                end_idx = result.rfind('}') + 1
+                json_str = result[start_idx:end_idx]
+                return json.loads(json_str)
+            else:
+                print(
+                    f"{Colors.RED}No JSON object found in response{Colors.RESET}")
+        except json.JSONDecodeError:
+            print(
+                f"{Colors.RED}Error in parsing response. Proceeding to next page...{Colors.RESET}")
+    else:
+        print(
+            f"{Colors.YELLOW}Objective not met on {link}. Proceeding to next link...{Colors.RESET}")
+    return None
+
+
+def find_objective_in_top_pages(map_website, objective, app, parallel=TOP_PAGES_PARALLEL, max_pages=TOP_PAGES):
+    """
+    Analyze the top ranked pages until one satisfies the objective.
+    By default pages are checked one at a time in rank order, so later pages are only scraped and sent to
+    Gemini when the earlier ones fail. With parallel=True (or TOP_PAGES_PARALLEL=1) all candidate pages are
+    scraped and checked concurrently; the first page that satisfies the objective is returned right away
+    (the most relevant one if several finish together), queued pages are cancelled and in-flight workers
+    stop before their next scrape or LLM call. That lowers latency but can spend up to max_pages times the
+    Firecrawl credits and Gemini tokens of a sequential run.
+    """
     try:
         if not map_website:
             print(f"{Colors.RED}No links found to analyze.{Colors.RESET}")
             return None
 
-        top_links = map_website[:3]
+        top_links = map_website[:max_pages]
         print(
             f"{Colors.CYAN}Proceeding to analyze top {len(top_links)} links: {top_links}{Colors.RESET}")
 
-        for link in top_links:
-            print(f"{Colors.YELLOW}Initiating scrape of page: {link}{Colors.RESET}")
-            scrape_result = app.scrape_url(
-                link, params={'formats': ['markdown']})
-            print(
-                f"{Colors.GREEN}Page scraping completed successfully.{Colors.RESET}")
+        if not parallel:
+            for link in top_links:
+                result = analyze_page(link, objective, app)
+                if result is not None:
+                    return result
+            print(f"{Colors.RED}All available pages analyzed. Objective not fulfilled in examined content.{Colors.RESET}")
+            return None
 
-            # Now detect any PDF or image URLs in the Markdown text
-            page_markdown = scrape_result.get('markdown', '')
-            if not page_markdown:
-                print(
-                    f"{Colors.RED}No markdown returned for {link}, skipping...{Colors.RESET}")
-                continue
-
-            found_urls = extract_urls_from_markdown(page_markdown)
-            pdf_image_append = ""
-
-            for sub_url in found_urls:
-                mime_type_short = detect_mime_type(sub_url)
-                if mime_type_short == 'pdf':
-                    print(
-                        f"{Colors.YELLOW} Detected PDF: {sub_url}. Extracting content...{Colors.RESET}")
-                    pdf_content = gemini_extract_pdf_content(sub_url)
-                    if pdf_content:
-                        pdf_image_append += f"\n\n---\n[PDF from {sub_url}]:\n{pdf_content}"
-                elif mime_type_short == 'image':
-                    print(
-                        f"{Colors.YELLOW} Detected Image: {sub_url}. Extracting content...{Colors.RESET}")
-                    image_content = gemini_extract_image_data(sub_url)
-                    if image_content:
-                        pdf_image_append += f"\n\n---\n[Image from {sub_url}]:\n{image_content}"
-
-            # Append extracted PDF/image text to the main markdown for the page
-            if pdf_image_append:
-                scrape_result[
-                    'markdown'] += f"\n\n---\n**Additional Gemini Extraction:**\n{pdf_image_append}\n"
-
-            check_prompt = f"""
-            Analyze this content to find: {objective}
-            If found, return ONLY a JSON object with information related to the objective. If not found, respond EXACTLY with: Objective not met
-
-            Content to analyze:
-            {scrape_result['markdown']}
-
-            Remember:
-            - Return valid JSON if information is found
-            - Return EXACTLY "Objective not met" if not found
-            - No other text or explanations
-            """
-
-            response = client.models.generate_content(
-                model=model_name,
-                contents=[check_prompt]
-            )
-
-            result = response.text.strip()
-
-            print(f"{Colors.MAGENTA}Debug - Check response:{Colors.RESET}")
-            print(result)
-
-            if result != "Objective not met":
-                print(
-                    f"{Colors.GREEN}Objective potentially fulfilled. Relevant information identified.{Colors.RESET}")
-                try:
-                    if '{' in result and '}' in result:
-                        start_idx = result.find('{')
-                        end_idx = result.rfind('}') + 1
-                        json_str = result[start_idx:end_idx]
-                        return json.loads(json_str)
-                    else:
-                        print(
-                            f"{Colors.RED}No JSON object found in response{Colors.RESET}")
-                except json.JSONDecodeError:
-                    print(
-                        f"{Colors.RED}Error in parsing response. Proceeding to next page...{Colors.RESET}")
-            else:
-                print(
-                    f"{Colors.YELLOW}Objective not met on this page. Proceeding to next link...{Colors.RESET}")
+        cancelled = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=len(top_links))
+        try:
+            futures = {pool.submit(analyze_page, link, objective, app, cancelled): rank
+                       for rank, link in enumerate(top_links)}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                answers = []
+                for future in done:
+                    try:
+                        result = future.result()
+                    except PageAnalysisCancelled:
+                        continue
+                    except Exception as e:
+                        print(f"{Colors.RED}Error analyzing {top_links[futures[future]]}: {str(e)}{Colors.RESET}")
+                        continue
+                    if result is not None:
+                        answers.append((futures[future], result))
+                if answers:
+                    rank, result = min(answers, key=lambda answer: answer[0])
+                    print(f"{Colors.GREEN}Answer found on {top_links[rank]}; cancelling "
+                          f"{len(pending)} remaining page(s).{Colors.RESET}")
+                    return result
+        finally:
+            cancelled.set()
+            # Don't wait for in-flight scrapes: they notice the event and stop before the next call
+            pool.shutdown(wait=False, cancel_futures=True)
 
         print(f"{Colors.RED}All available pages analyzed. Objective not fulfilled in examined content.{Colors.RESET}")
         return None
@@ -378,6 +659,8 @@ def main():
     else:
         print(
             f"{Colors.RED}No relevant pages identified. Consider refining the search parameters or trying a different website.{Colors.RESET}")
+    http_cache.print_summary()
+    gemini.print_summary()
 
 
 if __name__ == "__main__":
@@ -5,13 +5,235 @@
 # @File    : app.py
 # @Software: PyCharm
 # app.py
-from flask import Flask
+"""
+按需语音服务
+GET /tts?character=关羽&event=attack  角色台词（event 为台词类型或特殊台词键）
+GET /tts?event=game_start             游戏事件台词
+GET /tts?text=...&voice=narrator      任意文本（voice 为音色角色或音色名）
+命中 TTS 缓存直接返回；未命中时同一句台词只合成一次，并发请求等待并共享结果。
+响应带强 ETag，支持 If-None-Match 与 Range。
+
+GET /voices/<相对路径>                静态语音资源
+JSON 配置返回把片段路径改写为带内容哈希 URL 的副本（预压缩 gzip，每次重新验证）；
+带哈希的片段 URL 永久缓存（immutable），哈希与当前内容不符时重定向到新 URL。
+设置 TTS_X_SENDFILE=1 时由前置 nginx / Apache 发送文件，否则由 WSGI 服务器的 file_wrapper 发送。
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from flask import Flask, Response, abort, jsonify, redirect, request, send_file
+
+from single_flight import SingleFlight
+from voice_assets import VoiceAssets, file_digest, split_hashed_name
+
+TTS_MAX_TEXT_CHARS = int(os.getenv("TTS_MAX_TEXT_CHARS", "200"))
+TTS_HTTP_MAX_AGE = int(os.getenv("TTS_HTTP_MAX_AGE", "3600"))
+CARD_REFRESH_SECONDS = 30  # 角色卡片索引的刷新间隔
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
 
 app = Flask(__name__)
+app.config["USE_X_SENDFILE"] = os.getenv("TTS_X_SENDFILE") == "1"
+
+_generator = None
+_generator_lock = threading.Lock()
+_cards_refreshed_at = 0.0
+_flight = SingleFlight()
+_assets = None
+
+
+class LineNotFound(LookupError):
+    """请求的台词不存在"""
+
+
+def get_generator():
+    """第一次请求时才创建语音生成器（导入 app 不做任何 I/O）"""
+    global _generator
+    with _generator_lock:
+        if _generator is None:
+            from voice_generator import VoiceGenerator
+            _generator = VoiceGenerator()
+        return _generator
+
+
+def get_character_card(generator, name):
+    """从角色卡片索引查角色卡片，索引最多每 CARD_REFRESH_SECONDS 秒同步一次卡片目录"""
+    global _cards_refreshed_at
+    with _generator_lock:
+        if time.monotonic() - _cards_refreshed_at > CARD_REFRESH_SECONDS:
+            generator.character_index.refresh()
+            _cards_refreshed_at = time.monotonic()
+    cards = generator.character_index.query(name=name)
+    return cards[0] if cards else None
+
+
+def character_lines(generator, character):
+    """角色的 (音色, {台词键: 文本})，与生成器写入 voices/characters 的台词一致；
+    角色既不在卡片索引也不在台词目录中时抛出 LineNotFound"""
+    from voice_generator import VOICE_OPTIONS
+
+    catalog = generator.catalog
+    card = get_character_card(generator, character)
+    if card is not None:
+        return generator.get_character_lines({"title": "", "faction": None, "type": None, **card})
+    if character not in catalog.lines:
+        raise LineNotFound(f"未知的角色: {character[:50]}")
+    lines = {"intro": f"吾乃{character}！"}
+    lines.update((line_type, catalog.line(character, line_type)) for line_type in catalog.line_types)
+    lines.update(catalog.special_lines(character))
+    return VOICE_OPTIONS[catalog.voice_role(character, None)], lines
+
+
+def resolve_line(args):
+    """把请求参数解析为 (文本, 音色)，参数不合法时抛出 ValueError，台词或角色不存在时抛出 LineNotFound"""
+    from voice_generator import VOICE_OPTIONS
+
+    generator = get_generator()
+    catalog = generator.catalog
+    text = (args.get("text") or "").strip()
+    event = args.get("event")
+    character = args.get("character")
+    if text:
+        voice = args.get("voice", "narrator")
+        voice = VOICE_OPTIONS.get(voice, voice)
+        if voice not in VOICE_OPTIONS.values():
+            raise ValueError(f"未知的音色: {voice}")
+    elif not event:
+        raise ValueError("需要 text 或 event 参数")
+    elif not character:
+        if event not in catalog.event_lines:
+            raise LineNotFound(f"未知的游戏事件: {event}")
+        text, voice = catalog.event_lines[event], VOICE_OPTIONS[catalog.event_voice]
+    else:
+        voice, lines = character_lines(generator, character)
+        if not lines.get(event):
+            raise LineNotFound(f"{character} 没有 {event} 台词")
+        text = lines[event]
+
+    if len(text) > TTS_MAX_TEXT_CHARS:  # 模板台词等解析出的文本同样受限
+        raise ValueError(f"文本超过 {TTS_MAX_TEXT_CHARS} 字")
+    return text, voice
+
+
+def synthesize_to_cache(text, voice):
+    """合成一句台词并写入 TTS 缓存，返回缓存中的音频路径"""
+    from voice_generator import TTS_MODEL
+
+    generator = get_generator()
+    cached_path = generator.tts_cache.get(TTS_MODEL, voice, text)
+    if cached_path:  # 前一个合并窗口刚刚写入
+        return cached_path
+
+    def synthesize(work_dir):
+        audio_path = os.path.join(work_dir, "clip.wav")
+        generator.download_voice(generator.request_audio_url(text, voice), audio_path)
+        generator.tts_cache.put(TTS_MODEL, voice, text, audio_path)
+
+    with tempfile.TemporaryDirectory(prefix="tts_", dir=generator.tts_cache.cache_dir) as work_dir:
+        generator.retry_policy.call(synthesize, work_dir)
+    return generator.tts_cache.get(TTS_MODEL, voice, text)
+
+
+def file_etag(path):
+    """按文件内容计算强 ETag"""
+    return file_digest(path)[:32]
+
+
+def get_assets():
+    global _assets
+    with _generator_lock:
+        if _assets is None:
+            from voice_generator import VOICE_OUTPUT_DIR
+            _assets = VoiceAssets(VOICE_OUTPUT_DIR)
+        return _assets
+
 
 @app.route('/')
 def hello_world():
     return 'Hello, World!'
 
+
+@app.route('/tts')
+def tts():
+    from tts_cache import make_cache_key
+    from voice_generator import TTS_MODEL
+
+    try:
+        text, voice = resolve_line(request.args)
+    except ValueError as e:
+        return jsonify(error=str(e), code="bad_request"), 400
+    except LineNotFound as e:
+        return jsonify(error=str(e), code="line_not_found"), 404
+
+    generator = get_generator()
+    audio_path = generator.tts_cache.get(TTS_MODEL, voice, text)
+    source = "hit"
+    for _ in range(2):
+        if not audio_path:
+            try:
+                audio_path, shared = _flight.do(make_cache_key(TTS_MODEL, voice, text), synthesize_to_cache,
+                                                text, voice)
+            except Exception:
+                # 异常里可能带接口地址、请求 ID 或本地路径，只写服务端日志，不返回给客户端
+                app.logger.exception("语音合成失败 voice=%s text=%r", voice, text)
+                generator.metrics.count("http_tts_failed")
+                return jsonify(error="语音合成失败，请稍后重试", code="tts_failed"), 502
+            source = "coalesced" if shared else "miss"
+            generator.metrics.count(f"http_{source}")
+        if not audio_path:
+            app.logger.error("语音合成后缓存中未找到音频 voice=%s text=%r", voice, text)
+            return jsonify(error="语音合成失败，请稍后重试", code="tts_cache_missing"), 502
+
+        try:
+            response = send_file(audio_path, mimetype="audio/wav", conditional=True, etag=file_etag(audio_path),
+                                 max_age=TTS_HTTP_MAX_AGE)
+        except FileNotFoundError:  # 缓存 LRU 淘汰在查到路径与发送之间删除了文件，重新合成一次
+            audio_path = None
+            continue
+        response.headers["X-TTS-Cache"] = source
+        return response
+    app.logger.error("音频在发送前被缓存淘汰 voice=%s text=%r", voice, text)
+    return jsonify(error="语音合成失败，请稍后重试", code="tts_evicted"), 502
+
+
+@app.route('/voices/<path:asset>')
+def voice_asset(asset):
+    assets = get_assets()
+    if asset.endswith(".json"):
+        served = assets.manifest(asset, time.monotonic())
+        if served is None:
+            abort(404)
+        gzipped = "gzip" in request.accept_encodings
+        response = Response(served["gzip"] if gzipped else served["body"], mimetype="application/json")
+        if gzipped:
+            response.headers["Content-Encoding"] = "gzip"
+        response.headers["Vary"] = "Accept-Encoding"
+        response.set_etag(served["etag"] + ("-gz" if gzipped else ""))
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    rel_path, digest = split_hashed_name(asset)
+    path = assets.resolve(rel_path)
+    if path is None:
+        abort(404)
+    current = file_digest(path)
+    if digest is None:
+        # 未带哈希的旧路径：可以缓存，但每次都要重新验证
+        response = send_file(path, conditional=True, etag=current[:32])
+        response.cache_control.no_cache = True
+        return response
+    if not current.startswith(digest):
+        # 旧哈希对应的字节已不存在，转到当前内容的 URL（这个跳转本身不能被缓存）
+        response = redirect(assets.current_url(rel_path))
+        response.cache_control.no_cache = True
+        return response
+    response = send_file(path, conditional=True, etag=current[:32], max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=7000)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=7000, threaded=True)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音后处理与编码
+裁掉首尾静音、按 RMS 统一各音色响度，再用 ffmpeg 编码为 Opus/OGG/MP3 等网页格式。
+在进程池中并行处理，结果（格式与字节数）写入 voice_database.json 的 "encodings" 段。
+原始 WAV 作为母版保持不动，已有 WAV 可以批量转换而不调用 TTS 接口。
+"""
+
+import array
+import json
+import os
+import shutil
+import subprocess
+import sys
+import wave
+from datetime import datetime
+
+from voice_verify import find_wav_files
+
+ENCODE_FORMATS = {
+    "opus": {"ext": ".opus", "args": ["-c:a", "libopus", "-b:a", "32k", "-f", "opus"]},
+    "ogg": {"ext": ".ogg", "args": ["-c:a", "libvorbis", "-q:a", "3", "-f", "ogg"]},
+    "mp3": {"ext": ".mp3", "args": ["-c:a", "libmp3lame", "-b:a", "48k", "-f", "mp3"]},
+}
+DEFAULT_ENCODE_FORMATS = ("opus", "mp3")
+
+TARGET_RMS_DBFS = -20.0  # 统一后的响度
+PEAK_CEILING_DBFS = -1.0  # 增益后峰值上限，避免削波
+SILENCE_THRESHOLD_DBFS = -45.0  # 低于该峰值的窗口视为静音
+SILENCE_WINDOW_MS = 10
+SILENCE_PADDING_MS = 40  # 裁剪后首尾保留的静音
+
+FULL_SCALE = 32768.0
+
+
+def _dbfs_to_amplitude(dbfs):
+    return FULL_SCALE * (10 ** (dbfs / 20))
+
+
+def read_pcm16(wav_path):
+    """读取 16 位 PCM WAV，返回 (参数, 采样数组)"""
+    with wave.open(wav_path, 'rb') as wf:
+        params = wf.getparams()
+        if params.sampwidth != 2:
+            raise ValueError(f"仅支持 16 位 PCM，实际为 {params.sampwidth * 8} 位")
+        samples = array.array('h', wf.readframes(params.nframes))
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return params, samples
+
+
+def write_pcm16(wav_path, params, samples):
+    """写出 16 位 PCM WAV"""
+    data = array.array('h', samples)
+    if sys.byteorder == "big":
+        data.byteswap()
+    with wave.open(wav_path, 'wb') as wf:
+        wf.setnchannels(params.nchannels)
+        wf.setsampwidth(2)
+        wf.setframerate(params.framerate)
+        wf.writeframes(data.tobytes())
+
+
+def trim_silence(samples, framerate, nchannels=1):
+    """裁掉首尾静音，保留少量余量"""
+    window = max(1, framerate * SILENCE_WINDOW_MS // 1000) * nchannels
+    threshold = _dbfs_to_amplitude(SILENCE_THRESHOLD_DBFS)
+    loud = [
+        start for start in range(0, len(samples), window)
+        if max(abs(s) for s in samples[start:start + window]) >= threshold
+    ]
+    if not loud:
+        return samples
+    padding = framerate * SILENCE_PADDING_MS // 1000 * nchannels
+    begin = max(0, loud[0] - padding)
+    end = min(len(samples), loud[-1] + window + padding)
+    begin -= begin % nchannels
+    return samples[begin:end]
+
+
+def normalize_loudness(samples):
+    """按 RMS 把响度调整到 TARGET_RMS_DBFS，峰值不超过 PEAK_CEILING_DBFS"""
+    if not samples:
+        return samples
+    rms = (sum(s * s for s in samples) / len(samples)) ** 0.5
+    peak = max(abs(s) for s in samples)
+    if rms == 0 or peak == 0:
+        return samples
+    gain = min(_dbfs_to_amplitude(TARGET_RMS_DBFS) / rms, _dbfs_to_amplitude(PEAK_CEILING_DBFS) / peak)
+    return array.array('h', (max(-32768, min(32767, int(round(s * gain)))) for s in samples))
+
+
+def encoded_path(wav_path, fmt):
+    """编码后文件的路径：与 WAV 同目录，仅扩展名不同"""
+    return os.path.splitext(wav_path)[0] + ENCODE_FORMATS[fmt]["ext"]
+
+
+def encode_clip(wav_path, formats, ffmpeg=None, force=False):
+    """处理单个 WAV：裁剪静音、统一响度并编码为各格式
+
+    返回 {格式: 字节数}，在子进程中执行，因此只接收和返回可 pickle 的简单类型。
+    """
+    targets = [fmt for fmt in formats if fmt in ENCODE_FORMATS]
+    source_mtime = os.path.getmtime(wav_path)
+    fresh = {
+        fmt: os.path.getsize(encoded_path(wav_path, fmt)) for fmt in targets
+        if os.path.exists(encoded_path(wav_path, fmt))
+        and os.path.getmtime(encoded_path(wav_path, fmt)) >= source_mtime
+    }
+    if (len(fresh) == len(targets) and not force) or not ffmpeg:
+        return fresh
+
+    params, samples = read_pcm16(wav_path)
+    samples = normalize_loudness(trim_silence(samples, params.framerate, params.nchannels))
+
+    processed_path = f"{wav_path}.{os.getpid()}.norm.wav"
+    write_pcm16(processed_path, params, samples)
+    sizes = {}
+    try:
+        for fmt in targets:
+            output_path = encoded_path(wav_path, fmt)
+            tmp_path = f"{output_path}.part"
+            subprocess.run(
+                [ffmpeg, "-y", "-loglevel", "error", "-i", processed_path] + ENCODE_FORMATS[fmt]["args"] + [tmp_path],
+                check=True
+            )
+            os.replace(tmp_path, output_path)
+            sizes[fmt] = os.path.getsize(output_path)
+    finally:
+        os.remove(processed_path)
+    return sizes
+
+
+def find_wav_clips(output_dir, database):
+    """列出需要编码的 WAV（相对路径），优先使用清单，重复台词只编码一次
+
+    返回 (待编码列表, {别名: 被引用的片段})。
+    """
+    clips = database.get("clips")
+    if clips:
+        primaries = [rel for rel, entry in clips.items() if "alias_of" not in entry]
+        aliases = {rel: entry["alias_of"] for rel, entry in clips.items() if "alias_of" in entry}
+        return sorted(primaries), aliases
+    return find_wav_files(output_dir), {}
+
+
+def encode_voice_tree(output_dir, formats=DEFAULT_ENCODE_FORMATS, workers=None, force=False):
+    """批量编码 output_dir 下的语音，并把结果写入 voice_database.json
+
+    不调用 TTS 接口，可直接用于转换已有的 WAV。voice_database.json 不存在时新建一个只含编码记录的文件，
+    下次生成语音时会补全其余内容并沿用这些记录。
+    """
+    if not os.path.isdir(output_dir):
+        raise FileNotFoundError(f"语音目录不存在: {output_dir}")
+    database_path = os.path.join(output_dir, "voice_database.json")
+    try:
+        with open(database_path, 'r', encoding='utf-8') as f:
+            database = json.load(f)
+    except (OSError, ValueError):
+        database = {}
+
+    unknown = [fmt for fmt in formats if fmt not in ENCODE_FORMATS]
+    if unknown:
+        raise ValueError(f"不支持的编码格式: {', '.join(unknown)}")
+
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        print("⚠️ 未找到 ffmpeg，只会记录已存在的编码文件")
+
+    clips, aliases = find_wav_clips(output_dir, database)
+    print(f"🎚️ 编码 {len(clips)} 个语音片段 → {', '.join(formats)}")
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed  # 进程池连带 multiprocessing，只在编码时导入
+
+    encodings = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(encode_clip, os.path.join(output_dir, rel), list(formats), ffmpeg, force): rel
+            for rel in clips if os.path.exists(os.path.join(output_dir, rel))
+        }
+        for future in as_completed(futures):
+            rel = futures[future]
+            try:
+                sizes = future.result()
+            except Exception as e:
+                print(f"❌ 编码失败 {rel}: {str(e)}")
+                continue
+            wav_size = os.path.getsize(os.path.join(output_dir, rel))
+            encodings[rel] = {"wav": {"file": rel, "bytes": wav_size}}
+            for fmt, size in sizes.items():
+                encodings[rel][fmt] = {"file": os.path.splitext(rel)[0] + ENCODE_FORMATS[fmt]["ext"], "bytes": size}
+
+    # 重复台词直接链接到已编码的文件
+    for alias, primary in aliases.items():
+        if primary not in encodings:
+            continue
+        encodings[alias] = {"wav": {"file": alias, "bytes": encodings[primary]["wav"]["bytes"]}}
+        for fmt, info in encodings[primary].items():
+            if fmt == "wav":
+                continue
+            alias_file = os.path.splitext(alias)[0] + ENCODE_FORMATS[fmt]["ext"]
+            alias_path = os.path.join(output_dir, alias_file)
+            tmp_path = f"{alias_path}.part"
+            try:
+                os.link(os.path.join(output_dir, info["file"]), tmp_path)
+            except OSError:
+                shutil.copyfile(os.path.join(output_dir, info["file"]), tmp_path)
+            os.replace(tmp_path, alias_path)
+            encodings[alias][fmt] = {"file": alias_file, "bytes": info["bytes"]}
+
+    database["encodings"] = dict(sorted(encodings.items()))
+    database.setdefault("database_info", {})["encoded_at"] = datetime.now().isoformat()
+    tmp_path = f"{database_path}.part"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(database, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, database_path)
+    print(f"💾 编码记录已写入: {database_path}")
+
+    totals = {}
+    for formats_info in encodings.values():
+        for fmt, info in formats_info.items():
+            totals[fmt] = totals.get(fmt, 0) + info["bytes"]
+    print("📦 编码结果:")
+    for fmt, size in sorted(totals.items()):
+        print(f"   - {fmt}: {size / 1024 / 1024:.2f} MB")
+    return encodings
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+角色卡片索引
+把 character_cards/ 下的 JSON 卡片编译进 SQLite 索引，按文件 (mtime, 大小) 只重新解析改动过的卡片，
+删除的卡片同步移除。生成器从索引一次读出全部角色，也可按势力 / 类型 / 角色名查询。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+from tts_cache import TTS_CACHE_DIR
+
+CHARACTER_CARDS_DIR = os.getenv("CHARACTER_CARDS_DIR", "character_cards")
+CHARACTER_INDEX_NAME = "character_index.sqlite"
+
+
+def is_card_file(name):
+    """角色卡片文件：*.json，但不包括生成的 *_voices.json"""
+    return name.endswith('.json') and not name.endswith('_voices.json')
+
+
+class CharacterIndex:
+    """角色卡片的增量索引
+
+    cache_dir 为 None 时索引只建在内存里（只读的命令不在磁盘上留下 .tts_cache）。
+    """
+
+    def __init__(self, cards_dir=CHARACTER_CARDS_DIR, cache_dir=TTS_CACHE_DIR):
+        self.cards_dir = cards_dir
+        self.dir_key = os.path.abspath(cards_dir)  # 多个卡片目录共用一份索引
+        self.lock = threading.Lock()
+        if cache_dir is None:
+            db_path = ":memory:"
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+            db_path = os.path.join(cache_dir, CHARACTER_INDEX_NAME)
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS cards (
+                dir TEXT NOT NULL,
+                file TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                name TEXT,
+                faction TEXT,
+                type TEXT,
+                data TEXT,
+                error TEXT,
+                PRIMARY KEY (dir, file)
+            );
+            CREATE INDEX IF NOT EXISTS cards_name ON cards (dir, name);
+            CREATE INDEX IF NOT EXISTS cards_faction ON cards (dir, faction);
+            CREATE INDEX IF NOT EXISTS cards_type ON cards (dir, type);
+        """)
+        self.db.commit()
+
+    def _parse_card(self, path):
+        """解析一张卡片，返回 (角色字典, 错误信息)"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                card = json.load(f)
+        except Exception as e:
+            return None, str(e)
+        if not isinstance(card, dict) or not card.get("name"):
+            return None, "缺少 name 字段"
+        return card, None
+
+    def refresh(self):
+        """对比卡片目录与索引，只解析新增或改动的卡片，返回 (卡片文件数, 重新解析数)"""
+        try:
+            entries = {entry.name: entry.stat() for entry in os.scandir(self.cards_dir)
+                       if entry.is_file() and is_card_file(entry.name)}
+        except FileNotFoundError:
+            entries = {}
+
+        with self.lock:
+            indexed = {
+                file: (mtime_ns, size)
+                for file, mtime_ns, size in self.db.execute(
+                    "SELECT file, mtime_ns, size FROM cards WHERE dir = ?", (self.dir_key,)
+                )
+            }
+            removed = [(self.dir_key, file) for file in indexed if file not in entries]
+            self.db.executemany("DELETE FROM cards WHERE dir = ? AND file = ?", removed)
+
+            parsed = 0
+            for file, stat in entries.items():
+                if indexed.get(file) == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                card, error = self._parse_card(os.path.join(self.cards_dir, file))
+                self.db.execute(
+                    "INSERT OR REPLACE INTO cards (dir, file, mtime_ns, size, name, faction, type, data, error) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.dir_key, file, stat.st_mtime_ns, stat.st_size,
+                     card.get("name") if card else None, card.get("faction") if card else None,
+                     card.get("type") if card else None,
+                     json.dumps(card, ensure_ascii=False) if card else None, error)
+                )
+                parsed += 1
+            self.db.commit()
+
+        if parsed or removed:
+            print(f"🗂️ 角色索引已更新: 重新解析 {parsed} 张卡片, 移除 {len(removed)} 张")
+        return len(entries), parsed
+
+    def query(self, faction=None, char_type=None, name=None):
+        """按势力 / 类型 / 角色名查询角色，按卡片文件名排序（查询前先调用 refresh 同步卡片目录）"""
+        conditions = ["dir = ?"]
+        params = [self.dir_key]
+        for column, value in (("faction", faction), ("type", char_type), ("name", name)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT file, data, error FROM cards WHERE {' AND '.join(conditions)} ORDER BY file", params
+            ).fetchall()
+
+        characters = []
+        for file, data, error in rows:
+            if error:
+                print(f"❌ 加载角色失败 {file}: {error}")
+                continue
+            characters.append(json.loads(data))
+        return characters
+
+    def close(self):
+        with self.lock:
+            self.db.close()
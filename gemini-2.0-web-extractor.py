@@ -11,6 +11,7 @@ import requests
 from dotenv import load_dotenv
 from serpapi.google_search import GoogleSearch
 from google import genai
+from gemini_memo import GeminiMemo
 
 
 # ANSI color codes
@@ -29,6 +30,7 @@ load_dotenv()
 
 # Initialize clients
 client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+gemini = GeminiMemo(client)  # persistent memo of Gemini responses (GEMINI_MEMO_PATH, GEMINI_MEMO_TTL, GEMINI_MEMO_BYPASS)
 firecrawl_api_key = os.getenv("fc-d1f644e356c44793b56f66830bf199f6")
 serp_api_key = os.getenv("380fe39f6919ee70af9cd1a3856dec84d3ba1d044603b0f79b242e7b2e851b9f")
 
@@ -65,7 +67,7 @@ def select_urls_with_gemini(company, objective, serp_results):
             "Response Format: {\"selected_urls\": [\"https://example.com\", \"https://example2.com\"]}"
         )
 
-        response = client.models.generate_content(
+        response = gemini.generate_content(
             model="gemini-2.0-flash",
             contents=prompt
         )
@@ -209,6 +211,7 @@ def main():
         return
 
     selected_urls = select_urls_with_gemini(company, objective, serp_results)
+    gemini.print_summary()
 
     if not selected_urls:
         print(f"{Colors.RED}No URLs were selected.{Colors.RESET}")
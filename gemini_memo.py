@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent memo cache for Gemini generate_content calls.
+Responses are keyed on the model, the generation config, the prompt text and the content hash of every
+attachment (PDF / image bytes), so the same prompt is answered locally across runs and a document that
+has been sent to Gemini once is never sent again. Entries expire after GEMINI_MEMO_TTL seconds
+(0 keeps them forever); GEMINI_MEMO_BYPASS=1 or bypass=True skips the lookup and refreshes the entry.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from single_flight import SingleFlight
+
+GEMINI_MEMO_PATH = os.getenv("GEMINI_MEMO_PATH", "gemini_memo.sqlite")
+GEMINI_MEMO_TTL = float(os.getenv("GEMINI_MEMO_TTL", str(7 * 24 * 3600)))
+GEMINI_MEMO_BYPASS = os.getenv("GEMINI_MEMO_BYPASS", "") not in ("", "0")
+
+
+def _part_digest(part):
+    """Stable description of one content part: text is hashed as-is, attachments by their bytes."""
+    if isinstance(part, str):
+        return ["text", hashlib.sha256(part.encode("utf-8")).hexdigest()]
+    if isinstance(part, bytes):
+        return ["bytes", hashlib.sha256(part).hexdigest()]
+    inline = getattr(part, "inline_data", None)
+    if inline is not None and getattr(inline, "data", None) is not None:
+        return ["blob", inline.mime_type, hashlib.sha256(inline.data).hexdigest()]
+    text = getattr(part, "text", None)
+    if isinstance(text, str):
+        return ["text", hashlib.sha256(text.encode("utf-8")).hexdigest()]
+    return ["repr", hashlib.sha256(repr(part).encode("utf-8")).hexdigest()]
+
+
+def memo_key(model, contents, config=None):
+    """Memo key for a generate_content call."""
+    parts = contents if isinstance(contents, (list, tuple)) else [contents]
+    description = {
+        "model": model,
+        "config": repr(config) if config is not None else None,
+        "parts": [_part_digest(part) for part in parts],
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class MemoResponse:
+    """A memoized generate_content result; only .text is kept."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class GeminiMemo:
+    """Memoizing wrapper around client.models.generate_content."""
+
+    def __init__(self, client, path=GEMINI_MEMO_PATH, ttl=GEMINI_MEMO_TTL, bypass=GEMINI_MEMO_BYPASS):
+        self.client = client
+        self.ttl = ttl
+        self.bypass = bypass
+        self.lock = threading.Lock()
+        self.flights = SingleFlight()  # identical concurrent calls share one request
+        self.stats = {"hits": 0, "misses": 0, "bypassed": 0, "saved_seconds": 0.0, "spent_seconds": 0.0}
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                text TEXT NOT NULL,
+                latency REAL NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL
+            );
+        """)
+        self.db.commit()
+
+    def _lookup(self, key, now):
+        with self.lock:
+            row = self.db.execute("SELECT text, latency, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[2] is not None and row[2] <= now):
+            return None
+        return row[0], row[1]
+
+    def _hit(self, key):
+        cached = self._lookup(key, time.time())
+        if cached is None:
+            return None
+        text, latency = cached
+        with self.lock:
+            self.stats["hits"] += 1
+            self.stats["saved_seconds"] += latency
+        return MemoResponse(text)
+
+    def _store(self, key, model, text, latency, ttl):
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, text, latency, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, text, latency, now, now + ttl if ttl else None)
+            )
+            self.db.commit()
+
+    def _call(self, key, model, contents, config, ttl, **kwargs):
+        started = time.monotonic()
+        if config is not None:
+            kwargs["config"] = config
+        response = self.client.models.generate_content(model=model, contents=contents, **kwargs)
+        latency = time.monotonic() - started
+        with self.lock:
+            self.stats["spent_seconds"] += latency
+        text = getattr(response, "text", None)
+        if isinstance(text, str):  # blocked or empty candidates are not memoized
+            self._store(key, model, text, latency, ttl)
+        return response
+
+    def generate_content(self, model, contents, config=None, ttl=None, bypass=False, key_contents=None, **kwargs):
+        """
+        Same call shape as client.models.generate_content. Returns the memoized response when one exists,
+        otherwise calls Gemini and stores the text. ttl overrides GEMINI_MEMO_TTL for this entry
+        (0 = never expires); bypass=True always calls Gemini and refreshes the entry.
+        key_contents replaces contents in the memo key when the uploaded parts are derived from a larger
+        input (pages cut from a PDF), so the entry is found again without re-deriving them.
+        """
+        key = memo_key(model, contents if key_contents is None else key_contents, config)
+        ttl = self.ttl if ttl is None else ttl
+        if bypass or self.bypass:
+            with self.lock:
+                self.stats["bypassed"] += 1
+            return self._call(key, model, contents, config, ttl, **kwargs)
+
+        cached = self._hit(key)
+        if cached is not None:
+            return cached
+
+        with self.lock:
+            self.stats["misses"] += 1
+        response, _ = self.flights.do(key, self._call, key, model, contents, config, ttl, **kwargs)
+        return response
+
+    def lookup(self, model, contents, config=None):
+        """
+        Memoized response for a call without calling Gemini, or None on a miss (always None when bypassing).
+        Lets callers skip preparing expensive contents when the answer is already known; a miss is
+        counted by the generate_content call that follows, so pass the same contents there as key_contents.
+        """
+        if self.bypass:
+            return None
+        return self._hit(memo_key(model, contents, config))
+
+    def purge_expired(self):
+        """Delete expired entries. Returns the number removed."""
+        with self.lock:
+            removed = self.db.execute(
+                "DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            ).rowcount
+            self.db.commit()
+        return removed
+
+    def print_summary(self):
+        stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        if not lookups and not stats["bypassed"]:
+            return
+        rate = stats["hits"] / lookups * 100 if lookups else 0.0
+        print(f"Gemini memo: {stats['hits']}/{lookups} hits ({rate:.0f}%), {stats['bypassed']} bypassed, "
+              f"saved ~{stats['saved_seconds']:.1f}s of model latency "
+              f"(spent {stats['spent_seconds']:.1f}s on live calls)")
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+On-disk HTTP cache for the crawler scripts.
+GET bodies and HEAD headers are cached per (method, URL) with a SQLite index and evicted LRU-first
+once the byte budget is exceeded. Stale entries are revalidated with If-None-Match / If-Modified-Since
+and reused on 304; with stale-while-revalidate enabled, recently expired entries are returned at once
+and revalidated on a background thread.
+"""
+
+import email.utils
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from single_flight import SingleFlight
+
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+HTTP_CACHE_STALE_SECONDS = float(os.getenv("HTTP_CACHE_STALE_SECONDS", "0"))  # stale-while-revalidate window
+HEURISTIC_FRESHNESS_MAX = 24 * 3600  # cap for the 10% Last-Modified heuristic
+
+BODY_CHUNK_BYTES = 64 * 1024
+# Response headers kept with a cached entry
+STORED_HEADERS = ("Content-Type", "Content-Length", "ETag", "Last-Modified", "Cache-Control", "Expires", "Date")
+
+
+def _parse_http_date(value):
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _cache_directives(headers):
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
+
+
+def freshness_lifetime(headers, now):
+    """Freshness lifetime in seconds: max-age, then Expires, then the Last-Modified heuristic; 0 for no-cache."""
+    directives = _cache_directives(headers)
+    if "no-cache" in directives:
+        return 0.0
+    if "max-age" in directives:
+        try:
+            return max(0.0, float(directives["max-age"]))
+        except ValueError:
+            return 0.0
+    expires = _parse_http_date(headers.get("Expires"))
+    if expires is not None:
+        date = _parse_http_date(headers.get("Date")) or now
+        return max(0.0, expires - date)
+    last_modified = _parse_http_date(headers.get("Last-Modified"))
+    if last_modified is not None:
+        date = _parse_http_date(headers.get("Date")) or now
+        return min(HEURISTIC_FRESHNESS_MAX, max(0.0, (date - last_modified) * 0.1))
+    return 0.0
+
+
+class ResponseTooLarge(Exception):
+    """The response body exceeds the caller's max_bytes. Raised before or while streaming it."""
+
+    def __init__(self, url, size, max_bytes, declared=False):
+        qualifier = "declares" if declared else "exceeds"
+        super().__init__(f"{url} {qualifier} {size / 1024 / 1024:.1f} MB, over the "
+                         f"{max_bytes / 1024 / 1024:.1f} MB limit")
+        self.url = url
+        self.size = size
+        self.max_bytes = max_bytes
+
+
+def read_capped(response, url, max_bytes=None):
+    """
+    Read a streamed response body, refusing it up front when Content-Length is over max_bytes and
+    aborting the stream as soon as more than max_bytes have arrived.
+    """
+    declared = response.headers.get("Content-Length", "")
+    if max_bytes and declared.isdigit() and int(declared) > max_bytes:
+        raise ResponseTooLarge(url, int(declared), max_bytes, declared=True)
+    chunks = []
+    size = 0
+    for chunk in response.iter_content(BODY_CHUNK_BYTES):
+        size += len(chunk)
+        if max_bytes and size > max_bytes:
+            raise ResponseTooLarge(url, size, max_bytes)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+class CachedResponse:
+    """A response served from the cache or the network, mirroring the commonly used parts of requests.Response."""
+
+    def __init__(self, url, status_code, headers, content, source):
+        from requests.structures import CaseInsensitiveDict
+
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.source = source  # "fresh", "revalidated", "stale" or "network"
+
+    @property
+    def from_cache(self):
+        return self.source != "network"
+
+
+class HTTPCache:
+    """Revalidating on-disk HTTP cache."""
+
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES, session=None,
+                 stale_while_revalidate=HTTP_CACHE_STALE_SECONDS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.session = session
+        self.stale_while_revalidate = stale_while_revalidate
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self.stats = {"fresh": 0, "revalidated": 0, "stale": 0, "network": 0, "bytes_saved": 0}
+        self.lock = threading.Lock()
+        self.revalidating = set()  # keys being revalidated in the background
+        self.flights = SingleFlight()  # concurrent misses for one URL share a single request
+        self.db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                method TEXT NOT NULL,
+                url TEXT NOT NULL,
+                final_url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                fresh_until REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access);
+        """)
+        self.db.commit()
+
+    def _session(self):
+        if self.session is None:
+            import requests
+
+            self.session = requests.Session()
+        return self.session
+
+    def _object_path(self, key):
+        return os.path.join(self.objects_dir, key[:2], key)
+
+    def _lookup(self, key):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT final_url, status, headers, size, fresh_until FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        final_url, status, headers, size, fresh_until = row
+        entry = {"final_url": final_url, "status": status, "headers": json.loads(headers), "size": size,
+                 "fresh_until": fresh_until, "content": b""}
+        if size:
+            try:
+                with open(self._object_path(key), 'rb') as f:
+                    entry["content"] = f.read()
+            except FileNotFoundError:
+                return None
+            if len(entry["content"]) != size:
+                return None  # index and object file disagree, treat as a miss
+        return entry
+
+    def _store(self, key, method, url, response, content):
+        now = time.time()
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        if content:
+            path = self._object_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses (key, method, url, final_url, status, headers, size, stored_at, "
+                "fresh_until, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, method, url, response.url or url, response.status_code, json.dumps(headers), len(content), now,
+                 now + freshness_lifetime(headers, now), now)
+            )
+            self.db.commit()
+            self._evict()
+
+    def _refresh(self, key, response):
+        """304: keep the stored body and recompute freshness from the new headers."""
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT headers FROM responses WHERE key = ?", (key,)).fetchone()
+            headers = json.loads(row[0]) if row else {}
+            headers.update({name: response.headers[name] for name in STORED_HEADERS
+                            if name in response.headers and name != "Content-Length"})
+            self.db.execute(
+                "UPDATE responses SET headers = ?, fresh_until = ?, last_access = ? WHERE key = ?",
+                (json.dumps(headers), now + freshness_lifetime(headers, now), now, key)
+            )
+            self.db.commit()
+
+    def _touch(self, key):
+        with self.lock:
+            self.db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits max_bytes. Caller holds the lock."""
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._object_path(key))
+            except FileNotFoundError:
+                pass
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+        self.db.commit()
+
+    def _fetch(self, key, method, url, entry, timeout, max_bytes=None):
+        """Request url from the server, conditionally when a stored copy exists."""
+        headers = {}
+        if entry:
+            if entry["headers"].get("ETag"):
+                headers["If-None-Match"] = entry["headers"]["ETag"]
+            if entry["headers"].get("Last-Modified"):
+                headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        response = self._session().request(method, url, headers=headers, timeout=timeout, allow_redirects=True,
+                                           stream=True)
+        try:
+            if response.status_code == 304 and entry:
+                self._refresh(key, response)
+                self._count("revalidated", entry["size"])
+                return CachedResponse(entry["final_url"], entry["status"], entry["headers"], entry["content"],
+                                      "revalidated")
+            content = read_capped(response, url, max_bytes) if method == "GET" else b""
+        finally:
+            response.close()
+
+        if response.status_code == 200 and "no-store" not in _cache_directives(response.headers):
+            self._store(key, method, url, response, content)
+        self._count("network")
+        return CachedResponse(response.url or url, response.status_code, response.headers, content, "network")
+
+    def _revalidate_in_background(self, key, method, url, entry, timeout):
+        with self.lock:
+            if key in self.revalidating:
+                return
+            self.revalidating.add(key)
+
+        def run():
+            try:
+                self._fetch(key, method, url, entry, timeout)
+            except Exception as e:
+                print(f"Warning: background revalidation failed for {url}. Error: {e}")
+            finally:
+                with self.lock:
+                    self.revalidating.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _count(self, source, saved=0):
+        with self.lock:
+            self.stats[source] += 1
+            self.stats["bytes_saved"] += saved
+
+    def request(self, method, url, timeout=15, max_bytes=None):
+        """
+        Cached request. Fresh entries are returned without touching the network, stale ones are revalidated
+        first. If the network fails and a stored copy exists, the stored copy is returned.
+        Bodies over max_bytes raise ResponseTooLarge without being downloaded in full.
+        """
+        key = hashlib.sha256(f"{method} {url}".encode("utf-8")).hexdigest()
+        entry = self._lookup(key)
+        if entry and max_bytes and entry["size"] > max_bytes:
+            raise ResponseTooLarge(url, entry["size"], max_bytes)
+        now = time.time()
+        if entry and now < entry["fresh_until"]:
+            self._touch(key)
+            self._count("fresh", entry["size"])
+            return CachedResponse(entry["final_url"], entry["status"], entry["headers"], entry["content"], "fresh")
+        if entry and now < entry["fresh_until"] + self.stale_while_revalidate:
+            self._touch(key)
+            self._count("stale", entry["size"])
+            self._revalidate_in_background(key, method, url, entry, timeout)
+            return CachedResponse(entry["final_url"], entry["status"], entry["headers"], entry["content"], "stale")
+
+        import requests
+
+        try:
+            response, _ = self.flights.do(key, self._fetch, key, method, url, entry, timeout, max_bytes)
+            return response
+        except requests.RequestException as e:
+            if not entry:
+                raise
+            print(f"Warning: revalidation failed for {url}, using the stored copy. Error: {e}")
+            self._count("stale", entry["size"])
+            return CachedResponse(entry["final_url"], entry["status"], entry["headers"], entry["content"], "stale")
+
+    def get(self, url, timeout=15, max_bytes=None):
+        return self.request("GET", url, timeout=timeout, max_bytes=max_bytes)
+
+    def head(self, url, timeout=8):
+        return self.request("HEAD", url, timeout=timeout)
+
+    def print_summary(self):
+        stats = dict(self.stats)
+        total = stats["fresh"] + stats["revalidated"] + stats["stale"] + stats["network"]
+        if not total:
+            return
+        print(f"HTTP cache: {stats['fresh']} fresh hits, {stats['revalidated']} revalidated (304), "
+              f"{stats['stale']} stale, {stats['network']} network fetches, "
+              f"{stats['bytes_saved'] / 1024 / 1024:.1f} MB not re-downloaded")
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -13,16 +13,29 @@
 
 import os
 import json
-import requests
+import argparse
+import threading
 import time
 from datetime import datetime
-import hashlib
-from pathlib import Path
-import dashscope
+
+from character_index import CharacterIndex
+from tts_batch import TTS_BATCH_LINES, batch_text, plan_batches, split_batch_audio, write_clip
+from tts_limiter import RateLimiter, TTS_WORKERS
+from tts_metrics import create_metrics
+from tts_cache import TTS_CACHE_DIR, TTSCache
+from tts_retry import FailureLedger, RetryPolicy, TTSRequestError
+from voice_catalog import load_catalog
+from voice_dedup import dedupe_jobs, print_dedupe_report
+from voice_manifest import (
+    build_clip_catalog, diff_clip_catalog, dirty_groups, load_voice_database,
+    make_clip_entry, print_build_plan, relative_voice_path, remove_orphan_clips, restrict_plan
+)
+from voice_priority import CoverageProgress, PlayPriority
 
 # TTS API配置
-# 你可以将此行替换为你的实际 API Key，或在环境变量中设置。
-dashscope.api_key = os.getenv("DASHCOPE_API_KEY", "sk-e9985a0de2164cce8e9b29cbbd6fdad1")
+# API Key 从环境变量 DASHSCOPE_API_KEY（兼容旧的 DASHCOPE_API_KEY）读取，不写在代码里。
+# dashscope SDK 在第一次真正合成时才导入并设置 API Key，导入本模块不做任何 I/O。
+TTS_API_KEY = os.getenv("DASHSCOPE_API_KEY") or os.getenv("DASHCOPE_API_KEY")
 
 # 语音配置
 # 修正为 API 支持的音色类型
@@ -34,78 +47,365 @@ VOICE_OPTIONS = {
     "narrator": "Ethan"  # 旁白/系统音
 }
 
+# TTS 模型，同时作为持久化缓存键的一部分
+TTS_MODEL = "qwen-tts"
+
 # 输出目录
 VOICE_OUTPUT_DIR = "voices_new"
 CHARACTER_VOICES_DIR = os.path.join(VOICE_OUTPUT_DIR, "characters")
 GAME_VOICES_DIR = os.path.join(VOICE_OUTPUT_DIR, "game_events")
 
-# 创建目录
-os.makedirs(CHARACTER_VOICES_DIR, exist_ok=True)
-os.makedirs(GAME_VOICES_DIR, exist_ok=True)
+
+def get_speech_synthesizer():
+    """延迟导入 dashscope：SDK 连带 aiohttp、requests 导入要数百毫秒，只有真正合成时才需要"""
+    import dashscope
+    if TTS_API_KEY:
+        dashscope.api_key = TTS_API_KEY
+    return dashscope.audio.qwen_tts.SpeechSynthesizer
 
 
 class VoiceGenerator:
     """语音生成器类"""
 
-    def __init__(self):
-        self.voice_cache = {}  # 语音缓存避免重复生成
+    def __init__(self, workers=TTS_WORKERS, limiter=None, tts_cache=None, encode_formats=None,
+                 retry_policy=None, failure_ledger=None, metrics=None, prometheus_path=None, catalog=None,
+                 batch_lines=TTS_BATCH_LINES, character_index=None, priority=None):
+        self._tts_cache = tts_cache  # 跨进程、跨输出目录共享的语音缓存，第一次使用时才打开
+        self._open_lock = threading.Lock()
         self.max_retries = 3  # 最大重试次数
-
-    def generate_tts_voice(self, text, voice_type, output_path):
-        """生成TTS语音并保存到指定路径，包含重试机制"""
-        if not text or not text.strip():
-            print(f"❌ 文本为空，跳过语音生成。")
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=self.max_retries)  # 退避重试与熔断
+        self.workers = max(1, int(workers))  # 并发合成的线程数，1 为顺序执行
+        self.limiter = limiter or RateLimiter()  # 按接口配额限流
+        self.clip_manifest = {}  # 已生成片段的指纹，写入 voice_database.json 的 clips 段
+        self.clip_aliases = {}  # 重复台词片段 → 实际合成的片段
+        self.encode_formats = encode_formats  # 合成后额外编码的网页格式，如 ("opus", "mp3")
+        self.failure_ledger = failure_ledger or FailureLedger(VOICE_OUTPUT_DIR)  # 最终失败的片段，可单独重放
+        self.metrics = metrics or create_metrics(VOICE_OUTPUT_DIR)  # 各阶段耗时与计数，写入 metrics.jsonl
+        self.prometheus_path = prometheus_path  # 运行结束时导出 Prometheus 文本格式的路径
+        self.catalog = catalog or load_catalog()  # 台词目录 voice_catalog.json 编译后的只读索引表
+        self.batch_lines = batch_lines  # 同音色短台词每批合并合成的句数，0 或 1 为逐句合成
+        self._character_index = character_index  # 角色卡片的增量 SQLite 索引，第一次使用时才打开
+        self.priority = priority or PlayPriority()  # 按播放概率排列合成顺序，可由客户端播放记录修正
+        self.coverage = None  # 当前批次按播放概率加权的完成进度
+
+    @property
+    def tts_cache(self):
+        """持久化语音缓存；只读的 plan / verify 不使用它，因此不会创建 .tts_cache"""
+        with self._open_lock:
+            if self._tts_cache is None:
+                self._tts_cache = TTSCache()
+            return self._tts_cache
+
+    @property
+    def character_index(self):
+        """角色卡片索引，第一次使用时才打开"""
+        with self._open_lock:
+            if self._character_index is None:
+                self._character_index = CharacterIndex()
+            return self._character_index
+
+    def fetch_cached_voice(self, text, voice_type, output_path):
+        """命中持久化缓存时直接落盘，返回输出路径；未命中返回 None"""
+        cached_path = self.tts_cache.get(TTS_MODEL, voice_type, text)
+        if not cached_path:
+            self.metrics.count("cache_miss")
             return None
-
-        # 检查缓存
-        cache_key = f"{text}_{voice_type}"
-        if cache_key in self.voice_cache:
-            return self.voice_cache[cache_key]
-
-        for attempt in range(self.max_retries):
-            try:
-                print(f"🎤 尝试生成语音 (第 {attempt + 1}/{self.max_retries} 次): {text[:20]}... (voice: {voice_type})")
-
-                response = dashscope.audio.qwen_tts.SpeechSynthesizer.call(
-                    model="qwen-tts",
+        self.metrics.count("cache_hit")
+        print(f"♻️ 缓存命中: {text[:20]}... (voice: {voice_type})")
+        self.tts_cache.materialize(cached_path, output_path)
+        self.tts_cache.record_output(output_path, TTS_MODEL, voice_type, text)
+        self.failure_ledger.resolve(relative_voice_path(output_path, VOICE_OUTPUT_DIR))
+        return output_path
+
+    def save_generated_voice(self, text, voice_type, output_path):
+        """登记新下载的语音文件到持久化缓存"""
+        print(f"✅ 语音生成成功: {os.path.basename(output_path)}")
+        with self.metrics.span("write", path=relative_voice_path(output_path, VOICE_OUTPUT_DIR)) as span:
+            self.tts_cache.put(TTS_MODEL, voice_type, text, output_path)
+            self.tts_cache.record_output(output_path, TTS_MODEL, voice_type, text)
+            span["bytes"] = os.path.getsize(output_path)
+        self.failure_ledger.resolve(relative_voice_path(output_path, VOICE_OUTPUT_DIR))
+        return output_path
+
+    def request_audio_url(self, text, voice_type):
+        """调用 TTS 接口合成语音，成功时返回音频下载地址，失败时抛出 TTSRequestError"""
+        with self.metrics.span("synthesize", voice=voice_type, chars=len(text.strip())) as span:
+            waited_at = time.perf_counter()
+            synthesizer = get_speech_synthesizer()
+            with self.limiter:
+                span["wait_ms"] = round((time.perf_counter() - waited_at) * 1000, 2)
+                response = synthesizer.call(
+                    model=TTS_MODEL,
                     text=text.strip(),
                     voice=voice_type
                 )
+            span["status_code"] = response.status_code
 
-                if response.status_code == 200:
-                    audio_url = response.output.audio["url"]
+            if response.status_code == 200:
+                return response.output.audio["url"]
 
-                    audio_response = requests.get(audio_url)
-                    audio_response.raise_for_status()
+            print(f"❌ 语音生成失败，状态码: {response.status_code}, 错误信息: {response.message}")
+            raise TTSRequestError.from_response(response)
 
-                    with open(output_path, 'wb') as f:
-                        f.write(audio_response.content)
+    def generate_tts_voice(self, text, voice_type, output_path):
+        """生成TTS语音并保存到指定路径，按重试策略退避重试，最终失败的片段写入失败清单"""
+        if not text or not text.strip():
+            print(f"❌ 文本为空，跳过语音生成。")
+            return None
 
-                    print(f"✅ 语音生成成功: {os.path.basename(output_path)}")
-                    self.voice_cache[cache_key] = output_path
-                    return output_path
-                else:
-                    print(f"❌ 语音生成失败，状态码: {response.status_code}, 错误信息: {response.message}")
-                    time.sleep(2)  # 失败后稍作等待
-                    continue
+        rel_path = relative_voice_path(output_path, VOICE_OUTPUT_DIR)
+        with self.metrics.span("clip", path=rel_path, voice=voice_type) as span:
+            # 检查持久化缓存，相同台词只合成一次
+            if self.fetch_cached_voice(text, voice_type, output_path):
+                span["cache"] = "hit"
+                return output_path
+            span["cache"] = "miss"
 
+            def on_retry(attempt, error, delay):
+                span["retries"] = attempt
+                self.metrics.count("retries")
+
+            try:
+                return self.retry_policy.call(self.synthesize_voice, text, voice_type, output_path, on_retry=on_retry)
             except Exception as e:
-                print(f"❌ 语音生成出错: {str(e)}")
-                time.sleep(2)  # 失败后稍作等待
+                span["status"] = "failed"
+                self.record_failure(text, voice_type, output_path, e, getattr(e, "attempts", 1))
+                return None
+
+    def synthesize_voice(self, text, voice_type, output_path):
+        """合成单条语音：请求接口、下载音频并登记缓存，失败时抛出异常"""
+        audio_url = self.request_audio_url(text, voice_type)
+        self.download_voice(audio_url, output_path)
+        return self.save_generated_voice(text, voice_type, output_path)
+
+    def synthesize_batch(self, texts, voice_type, batch_path):
+        """用停顿标记合并多句台词做一次合成，下载整段音频"""
+        audio_url = self.request_audio_url(batch_text(texts), voice_type)
+        return self.download_voice(audio_url, batch_path)
+
+    def generate_batch_voices(self, jobs):
+        """合并合成一批同音色短台词并按静音切回逐句片段
+
+        返回 ({任务键: 输出路径}, 需要逐句合成的任务)。合成最终失败、切分不明确或时长校验
+        不通过时整批退回逐句合成。
+        """
+        import tempfile
+
+        voice_type = jobs[0][2]
+        texts = [text.strip() for _, text, _, _ in jobs]
+        with self.metrics.span("batch_split", voice=voice_type, lines=len(jobs)) as span:
+            def on_retry(attempt, error, delay):
+                span["retries"] = attempt
+                self.metrics.count("retries")
+
+            os.makedirs(VOICE_OUTPUT_DIR, exist_ok=True)
+            with tempfile.TemporaryDirectory(prefix=".batch_", dir=VOICE_OUTPUT_DIR) as batch_dir:
+                batch_path = os.path.join(batch_dir, "batch.wav")
+                try:
+                    self.retry_policy.call(self.synthesize_batch, texts, voice_type, batch_path, on_retry=on_retry)
+                    params, clips = split_batch_audio(batch_path, texts)
+                except Exception as e:
+                    print(f"↩️ {len(jobs)} 句合并合成未能切分，改为逐句合成: {str(e)}")
+                    span["status"] = "fallback"
+                    span["reason"] = str(e)
+                    self.metrics.count("batch_fallback", len(jobs))
+                    return {}, list(jobs)
+
+            results = {}
+            for (job_key, text, _, audio_path), pcm in zip(jobs, clips):
+                write_clip(audio_path, params, pcm)
+                results[job_key] = self.save_generated_voice(text, voice_type, audio_path)
+            self.metrics.count("batched_lines", len(jobs))
+        return results, []
+
+    def synthesize_batched_jobs(self, pending):
+        """同音色短台词合并合成，返回 ({任务键: 输出路径}, 仍需逐句合成的任务)"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        batches, singles = plan_batches(pending, self.batch_lines)
+        if not batches:
+            return {}, pending
+
+        # 已在持久化缓存中的台词不必再合成
+        results = {}
+        remaining = []
+        for batch in batches:
+            for job_key, text, voice_type, audio_path in batch:
+                if self.fetch_cached_voice(text, voice_type, audio_path):
+                    results[job_key] = audio_path
+                else:
+                    remaining.append((job_key, text, voice_type, audio_path))
+        batches, leftovers = plan_batches(remaining, self.batch_lines)
+        singles.extend(leftovers)
+
+        print(f"🧺 合并合成 {sum(len(batch) for batch in batches)} 句短台词 → {len(batches)} 次请求")
+        with ThreadPoolExecutor(max_workers=min(self.workers, max(1, len(batches)))) as pool:
+            for batch_results, fallback in pool.map(self.generate_batch_voices, batches):
+                results.update(batch_results)
+                singles.extend(fallback)
+        return results, singles
+
+    def download_voice(self, audio_url, output_path):
+        """流式下载音频文件，写完后原子替换，中断时断点续传
+
+        下载到的不是完整 WAV（错误页、截断）时删除文件并抛出 WavFormatError，由重试策略重新合成。
+        """
+        from tts_download import download_file
+        from voice_verify import check_wav
+
+        with self.metrics.span("download", path=relative_voice_path(output_path, VOICE_OUTPUT_DIR)) as span:
+            download_file(audio_url, output_path)
+            check_wav(output_path)
+            span["bytes"] = os.path.getsize(output_path)
+        return output_path
+
+    def record_failure(self, text, voice_type, output_path, error, attempts):
+        """把最终失败的片段写入失败清单"""
+        print(f"🔴 语音生成最终失败 (共尝试 {attempts} 次)：{text[:20]}... {str(error)}")
+        self.metrics.count("failed")
+        self.failure_ledger.record(
+            relative_voice_path(output_path, VOICE_OUTPUT_DIR), text, voice_type, TTS_MODEL, error, attempts
+        )
+
+    def recorded_outputs(self):
+        """查询输出文件生成记录的函数；缓存目录还不存在时没有任何记录，返回 None 且不创建它"""
+        if self._tts_cache is None and not os.path.isdir(TTS_CACHE_DIR):
+            return None
+        return self.tts_cache.output_record
+
+    def manifest_fingerprints(self):
+        """voice_database.json 中记录的片段指纹 {相对路径: 指纹}，证明没有缓存登记的旧文件对应哪条台词"""
+        clips = load_voice_database(os.path.join(VOICE_OUTPUT_DIR, "voice_database.json")).get("clips", {})
+        return {rel_path: entry.get("fingerprint") for rel_path, entry in clips.items()}
+
+    def get_pending_jobs(self, jobs):
+        """筛出需要合成的任务
+
+        jobs 为 (任务键, 文本, 音色, 输出路径) 列表。返回 (已就绪结果, 待合成任务)，
+        输出文件存在且与当前台词一致的任务直接计入结果。
+        """
+        results = {}
+        pending = []
+        fingerprints = self.manifest_fingerprints()
+        for job_key, text, voice_type, audio_path in jobs:
+            if not text:
                 continue
-
-        print(f"🔴 语音生成最终失败，已达最大重试次数：{text[:20]}...")
-        return None
-
-    def generate_character_voices(self, character_data):
-        """为角色生成语音"""
+            fingerprint = fingerprints.get(relative_voice_path(audio_path, VOICE_OUTPUT_DIR))
+            if self.tts_cache.is_current(audio_path, TTS_MODEL, voice_type, text, fingerprint):
+                print(f"🔊 语音已存在，跳过: {audio_path}")
+                self.metrics.count("cache_current")
+                results[job_key] = audio_path
+                continue
+            if os.path.exists(audio_path):
+                print(f"✏️ 台词或音色已修改，重新生成: {audio_path}")
+            pending.append((job_key, text, voice_type, audio_path))
+        return results, pending
+
+    def begin_coverage(self, jobs, results):
+        """按播放概率为本批任务建立加权进度，已就绪的片段直接计入"""
+        self.coverage = CoverageProgress(self.priority.weights([job for job in jobs if job[1]]), done=results)
+        self.coverage.print_progress()
+
+    def mark_done(self, job_key):
+        """记录一个完成的片段，推进覆盖率"""
+        if self.coverage:
+            self.coverage.complete(job_key)
+
+    def prioritize(self, unique, duplicates):
+        """按播放概率从高到低排列待合成任务，重复台词的概率计入其主任务"""
+        weights = self.coverage.weights if self.coverage else \
+            self.priority.weights(unique + [job for job, _ in duplicates])
+        combined = {job[0]: weights.get(job[0], 0.0) for job in unique}
+        for job, primary in duplicates:
+            combined[primary[0]] += weights.get(job[0], 0.0)
+        return self.priority.order(unique, combined)
+
+    def run_voice_jobs(self, jobs):
+        """执行一批语音合成任务，已是最新的片段直接跳过，返回 {任务键: 输出路径}"""
+        with self.metrics.span("batch", jobs=len(jobs)) as span:
+            results, pending = self.get_pending_jobs(jobs)
+            span["pending"] = len(pending)
+            self.begin_coverage(jobs, results)
+            results.update(self.synthesize_jobs(pending))
+            span["completed"] = len(results)
+            span["coverage"] = round(self.coverage.coverage(), 4)
+        self.coverage.print_progress()
+        return results
+
+    def synthesize_jobs(self, pending):
+        """合成任务列表中的全部语音，返回 {任务键: 输出路径}
+
+        相同 (文本, 音色) 的任务只合成一次，其余路径以硬链接落盘。
+        按播放概率从高到低提交，中途中断或被限流时最常播放的片段已经生成。
+        """
+        unique, duplicates = dedupe_jobs(pending, TTS_MODEL)
+        print_dedupe_report(unique, duplicates)
+        self.metrics.count("deduplicated", len(duplicates))
+        results = self.synthesize_unique_jobs(self.prioritize(unique, duplicates))
+        results.update(self.link_duplicate_jobs(duplicates, results))
+        return results
+
+    def synthesize_unique_jobs(self, pending):
+        """逐条合成语音，workers > 1 时在线程池中并发，速率由限流器控制
+
+        开启多句合并时先合并合成同音色的短台词，其余台词和切分失败的批次再逐句合成。
+        """
+        results = {}
+        if self.batch_lines > 1:
+            results, pending = self.synthesize_batched_jobs(pending)
+            for job_key in results:
+                self.mark_done(job_key)
+        if self.workers == 1 or len(pending) <= 1:
+            for job_key, text, voice_type, audio_path in pending:
+                generated_path = self.generate_tts_voice(text, voice_type, audio_path)
+                if generated_path:
+                    results[job_key] = generated_path
+                    self.mark_done(job_key)
+            return results
+
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        print(f"⚡ 并发合成 {len(pending)} 条语音 (workers: {self.workers})")
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                pool.submit(self.generate_tts_voice, text, voice_type, audio_path): job_key
+                for job_key, text, voice_type, audio_path in pending
+            }
+            for future in as_completed(futures):
+                generated_path = future.result()
+                if generated_path:
+                    results[futures[future]] = generated_path
+                    self.mark_done(futures[future])
+        return results
+
+    def link_duplicate_jobs(self, duplicates, results):
+        """把重复台词的输出以硬链接（跨文件系统时复制）落到各自路径"""
+        linked = {}
+        for job, primary in duplicates:
+            job_key, text, voice_type, audio_path = job
+            primary_path = results.get(primary[0])
+            if not primary_path:
+                self.failure_ledger.record(
+                    relative_voice_path(audio_path, VOICE_OUTPUT_DIR), text, voice_type, TTS_MODEL,
+                    f"重复台词的主片段 {relative_voice_path(primary[3], VOICE_OUTPUT_DIR)} 生成失败", 0
+                )
+                continue
+            self.tts_cache.materialize(primary_path, audio_path)
+            self.tts_cache.record_output(audio_path, TTS_MODEL, voice_type, text)
+            self.failure_ledger.resolve(relative_voice_path(audio_path, VOICE_OUTPUT_DIR))
+            self.clip_aliases[relative_voice_path(audio_path, VOICE_OUTPUT_DIR)] = \
+                relative_voice_path(primary[3], VOICE_OUTPUT_DIR)
+            linked[job_key] = audio_path
+            self.mark_done(job_key)
+        return linked
+
+    def get_character_lines(self, character_data):
+        """获取角色的音色和全部台词"""
         name = character_data['name']
         title = character_data['title']
         faction = character_data['faction']
         char_type = character_data['type']
 
-        print(f"\n🎭 生成角色语音: {name} ({title})")
-
         voice_type = self.select_voice_for_character(name, char_type, faction)
 
         character_voices = {
@@ -120,25 +420,39 @@ class VoiceGenerator:
 
         special_voices = self.get_special_lines(name, title, char_type, faction)
         character_voices.update(special_voices)
+        return voice_type, character_voices
 
-        voice_files = {}
-        character_dir = os.path.join(CHARACTER_VOICES_DIR, name)
-        os.makedirs(character_dir, exist_ok=True)
+    def get_character_jobs(self, character_data):
+        """生成角色的语音合成任务列表，任务键为 (角色名, 语音键)"""
+        name = character_data['name']
+        voice_type, character_voices = self.get_character_lines(character_data)
 
+        character_dir = os.path.join(CHARACTER_VOICES_DIR, name)
+        jobs = []
         for voice_key, text in character_voices.items():
             if text:
-                filename = f"{voice_key}.wav"
-                audio_path = os.path.join(character_dir, filename)
-
-                if os.path.exists(audio_path):
-                    print(f"🔊 语音已存在，跳过: {audio_path}")
-                    voice_files[voice_key] = os.path.relpath(audio_path, VOICE_OUTPUT_DIR).replace("\\", "/")
-                    continue
-
-                generated_path = self.generate_tts_voice(text, voice_type, audio_path)
-                if generated_path:
-                    voice_files[voice_key] = os.path.relpath(generated_path, VOICE_OUTPUT_DIR).replace("\\", "/")
-                    time.sleep(1)  # 避免API调用过快
+                audio_path = os.path.join(character_dir, f"{voice_key}.wav")
+                jobs.append(((name, voice_key), text, voice_type, audio_path))
+        return voice_type, jobs
+
+    def record_clips(self, jobs, results):
+        """记录已生成片段的 (文本, 音色, 模型) 指纹"""
+        for job_key, text, voice_type, audio_path in jobs:
+            if job_key in results:
+                rel_path = relative_voice_path(audio_path, VOICE_OUTPUT_DIR)
+                entry = make_clip_entry(TTS_MODEL, voice_type, text)
+                if rel_path in self.clip_aliases:
+                    entry["alias_of"] = self.clip_aliases[rel_path]
+                self.clip_manifest[rel_path] = entry
+
+    def save_character_config(self, name, voice_type, jobs, results):
+        """根据合成结果写出角色的 voices.json"""
+        self.record_clips(jobs, results)
+        voice_files = {}
+        for job_key, _, _, _ in jobs:
+            if job_key in results:
+                # 将绝对路径转换为相对路径，以便于配置文件的可移植性
+                voice_files[job_key[1]] = os.path.relpath(results[job_key], VOICE_OUTPUT_DIR).replace("\\", "/")
 
         voice_config = {
             "character_name": name,
@@ -147,6 +461,10 @@ class VoiceGenerator:
             "generated_at": datetime.now().isoformat()
         }
 
+        # 为每个角色创建单独的文件夹
+        character_dir = os.path.join(CHARACTER_VOICES_DIR, name)
+        os.makedirs(character_dir, exist_ok=True)
+
         config_path = os.path.join(character_dir, "voices.json")
         with open(config_path, 'w', encoding='utf-8') as f:
             json.dump(voice_config, f, ensure_ascii=False, indent=2)
@@ -154,161 +472,67 @@ class VoiceGenerator:
         print(f"💾 角色语音配置保存: {name}/voices.json")
         return voice_config
 
+    def generate_character_voices(self, character_data):
+        """为角色生成语音"""
+        name = character_data['name']
+        print(f"\n🎭 生成角色语音: {name} ({character_data['title']})")
+
+        voice_type, jobs = self.get_character_jobs(character_data)
+        results = self.run_voice_jobs(jobs)
+        return self.save_character_config(name, voice_type, jobs, results)
+
     def select_voice_for_character(self, name, char_type, faction):
-        """为角色选择合适的声音类型"""
-        if name in ["关羽", "张飞", "赵云", "马超", "黄忠", "许褚", "典韦", "夏侯惇", "张辽", "甘宁", "太史慈", "吕蒙", "吕布"]:
-            return VOICE_OPTIONS["male_heroic"]
-        if name in ["诸葛亮", "刘备", "法正", "曹操", "司马懿", "郭嘉", "荀彧", "孙权", "周瑜", "陆逊", "华佗", "袁绍", "董卓"]:
-            return VOICE_OPTIONS["male_wise"]
-        if name in ["孙尚香"]:
-            return VOICE_OPTIONS["female_strong"]
-        if name in ["貂蝉"]:
-            return VOICE_OPTIONS["female_gentle"]
-
-        if char_type == "武将" or char_type == "君主":
-            return VOICE_OPTIONS["male_heroic"]
-        elif char_type == "谋士" or char_type == "医者":
-            return VOICE_OPTIONS["male_wise"]
-        elif char_type == "美女":
-            return VOICE_OPTIONS["female_gentle"]
-
-        return VOICE_OPTIONS["male_heroic"]
-
-    # 补充和完善了所有角色的语音文本，以确保不会出现空文本导致生成失败
+        """为角色选择合适的声音类型：台词目录给出音色角色，再映射到本模块的 VOICE_OPTIONS"""
+        return VOICE_OPTIONS[self.catalog.voice_role(name, char_type)]
+
     def get_attack_line(self, name, char_type):
-        attack_lines = {
-            "关羽": "青龙偃月，斩尽敌寇！", "张飞": "燕人张飞在此，谁敢与我一战！", "赵云": "常山赵子龙，七进七出！",
-            "马超": "西凉马超来也，受死吧！", "黄忠": "百步穿杨，老当益壮！", "吕布": "人中吕布，马中赤兔！",
-            "曹操": "宁教我负天下人，休教天下人负我！", "司马懿": "老谋深算，你中计了！", "诸葛亮": "运筹帷幄之中，决胜千里之外！",
-            "周瑜": "既生瑜，何生亮！受我一击！", "孙权": "江东子弟，随我冲锋！", "刘备": "仁德之师，所向披靡！",
-            "貂蝉": "美人计中，你难逃一死！", "董卓": "顺我者昌，逆我者亡！", "华佗": "医者仁心，但也有雷霆手段！",
-            "孙尚香": "巾帼不让须眉！看招！", "颜良文丑": "河北名将，颜良文丑！", "许褚": "虎痴在此，谁来与我一战！"
-        }
-        return attack_lines.get(name, f"吃我一招！{name}来也！")
+        """获取攻击语音"""
+        return self.catalog.line(name, "attack")
 
     def get_defend_line(self, name, char_type):
-        defend_lines = {
-            "关羽": "义薄云天，岂会被你所伤！", "张飞": "燕人张飞，岂是易与之辈！", "赵云": "一身是胆，何惧之有！",
-            "马超": "西凉铁骑，刀枪不入！", "黄忠": "老将虽老，宝刀未老！", "吕布": "天下第一，岂会怕你！",
-            "曹操": "乱世奸雄，岂会中你之计！", "司马懿": "隐忍多年，岂会功亏一篑！", "诸葛亮": "空城计在此，你奈我何！",
-            "周瑜": "美周郎在此，休想伤我！", "孙权": "江东基业，岂容你破坏！", "刘备": "汉室宗亲，自有天佑！",
-            "貂蝉": "闭月羞花，你下得了手吗？", "董卓": "天下大权在握，谁敢动我！", "华佗": "医术通神，起死回生！",
-            "孙尚香": "女儿身，也有英雄胆！", "颜良文丑": "双雄在此，休得猖狂！", "许褚": "这身肥肉，可不是白长的！"
-        }
-        return defend_lines.get(name, f"{name}在此，休想伤我！")
+        """获取防御语音"""
+        return self.catalog.line(name, "defend")
 
     def get_skill_line(self, name, char_type):
-        skill_lines = {
-            "关羽": "武圣显灵，忠义无敌！", "张飞": "勇猛无敌，当阳桥断！", "赵云": "一身是胆，七进七出！",
-            "马超": "锦马超在此，谁来与我一战！", "黄忠": "老当益壮，定军山前！", "吕布": "方天画戟，赤兔宝马，天下无敌！",
-            "曹操": "挟天子以令诸侯，谁与争锋！", "司马懿": "鹰视狼顾，你中我计了！", "诸葛亮": "卧龙凤雏，得一可安天下！",
-            "周瑜": "火攻之计，赤壁鏖战！", "孙权": "江东子弟，多才俊，卷土重来！", "刘备": "桃园结义，生死与共！",
-            "貂蝉": "倾国倾城，闭月羞花！", "董卓": "焚书坑儒，天下归心！", "华佗": "医术通神，起死回生！",
-            "孙尚香": "结姻联谊，共抗强敌！", "颜良文丑": "双雄并立，勇冠三军！", "许褚": "裸衣战敌，力大无穷！"
-        }
-        return skill_lines.get(name, f"{name}技能发动！")
+        """获取技能语音"""
+        return self.catalog.line(name, "skill")
 
     def get_damage_line(self, name, char_type):
-        damage_lines = {
-            "关羽": "啊！青龙偃月，不甘啊！", "张飞": "燕人张飞，岂能倒下！", "赵云": "子龙虽伤，斗志不减！",
-            "马超": "西凉铁骑，永不言败！", "黄忠": "老骥伏枥，志在千里！", "吕布": "天下第一，怎会受伤！",
-            "曹操": "宁教我负天下人，岂能负我！", "司马懿": "隐忍多年，岂能功亏一篑！", "诸葛亮": "鞠躬尽瘁，死而后已！",
-            "周瑜": "既生瑜，何生亮，不甘啊！", "孙权": "江东基业，不能毁于我手！", "刘备": "汉室未兴，备不敢亡！",
-            "貂蝉": "美人薄命，何其悲哀！", "董卓": "天下大权，岂能旁落！", "华佗": "医者难自医，何其讽刺！",
-            "孙尚香": "夫君...香香...受伤了...", "颜良文丑": "主公...我们...尽力了...", "许褚": "主公...许褚...不能再保护您了..."
-        }
-        return damage_lines.get(name, f"{name}受伤了！")
+        """获取受伤语音"""
+        return self.catalog.line(name, "damage")
 
     def get_death_line(self, name, char_type):
-        death_lines = {
-            "关羽": "玉可碎而不改其白，竹可焚而不毁其节...", "张飞": "燕人张飞，死也不屈！", "赵云": "子龙虽死，忠义长存...",
-            "马超": "西凉锦马超，来生再战！", "黄忠": "老将虽死，英名永存！", "吕布": "天下第一，死也光荣！",
-            "曹操": "宁教我负天下人，休教天下人负我...", "司马懿": "鹰视狼顾，终有一死...", "诸葛亮": "鞠躬尽瘁，死而后已...",
-            "周瑜": "既生瑜，何生亮，天亡我也！", "孙权": "江东子弟，多才俊，我死之后...", "刘备": "汉室未兴，备死不瞑目！",
-            "貂蝉": "红颜薄命，来世再做美人计！", "董卓": "天下大权，终成泡影！", "华佗": "医术再高，也难逃一死...",
-            "孙尚香": "夫君...香香...先走一步了...", "颜良文丑": "主公...我们...先走一步了...", "许褚": "主公...许褚...不能再保护您了..."
-        }
-        return death_lines.get(name, f"{name}虽死，精神永存！")
+        """获取死亡语音"""
+        return self.catalog.line(name, "death")
 
     def get_victory_line(self, name, char_type):
-        victory_lines = {
-            "关羽": "忠义之师，终得胜利！", "张飞": "燕人张飞，无敌天下！", "赵云": "常山赵子龙，所向披靡！",
-            "马超": "西凉铁骑，踏平天下！", "黄忠": "老将出马，一个顶俩！", "吕布": "天下第一，名副其实！",
-            "曹操": "乱世奸雄，终得天下！", "司马懿": "老谋深算，终成正果！", "诸葛亮": "卧龙凤雏，天下归心！",
-            "周瑜": "美周郎在此，谁与争锋！", "孙权": "江东子弟，多才俊！", "刘备": "汉室可兴，天下归心！",
-            "貂蝉": "美人计成，天下归心！", "董卓": "天下大权，终归于我！", "华佗": "医术通神，起死回生！",
-            "孙尚香": "谁说女子不如男！", "颜良文丑": "河北双雄，天下无敌！", "许褚": "虎痴之勇，天下无双！"
-        }
-        return victory_lines.get(name, f"{name}获胜，天下归心！")
+        """获取胜利语音"""
+        return self.catalog.line(name, "victory")
 
     def get_special_lines(self, name, title, char_type, faction):
         """获取特殊语音（基于历史人物特点）"""
-        special_lines = {}
-
-        if name == "关羽":
-            special_lines["taunt"] = "匹夫之勇，何足道哉！"
-            special_lines["ally"] = "忠义兄弟，生死与共！"
-            special_lines["enemy"] = "乱臣贼子，受死吧！"
-        elif name == "张飞":
-            special_lines["taunt"] = "燕人张飞在此，谁敢与我一战！"
-            special_lines["roar"] = "当阳桥头一声吼，吓退曹操百万兵！"
-        elif name == "赵云":
-            special_lines["rescue"] = "子龙来也，主公莫慌！"
-            special_lines["brave"] = "一身是胆，七进七出！"
-        elif name == "诸葛亮":
-            special_lines["strategy"] = "运筹帷幄之中，决胜千里之外！"
-            special_lines["wisdom"] = "智者千虑，必有一得！"
-        elif name == "曹操":
-            special_lines["ambition"] = "宁教我负天下人，休教天下人负我！"
-            special_lines["scheme"] = "兵不厌诈，你中我计了！"
-        elif name == "吕布":
-            special_lines["arrogant"] = "天下第一，谁能敌我！"
-            special_lines["challenge"] = "三英战吕布，何惧之有！"
-        elif name == "貂蝉":
-            special_lines["charm"] = "倾国倾城，闭月羞花！"
-            special_lines["scheme"] = "美人计中，你难逃一死！"
-
-        return special_lines
+        return dict(self.catalog.special_lines(name))
 
-    def generate_game_event_voices(self):
-        """生成游戏事件语音"""
-        print("\n🎮 生成游戏事件语音...")
+    def get_game_event_lines(self):
+        """获取游戏事件台词"""
+        return dict(self.catalog.event_lines)
 
-        game_events = {
-            "game_start": "三国杀游戏开始，请各位玩家准备！", "game_end": "游戏结束，胜负已分！", "turn_start": "回合开始，请行动！",
-            "turn_end": "回合结束，下一位玩家！", "identity_reveal": "身份揭晓，真相大白！", "lord_reveal": "主公现身，天下归心！",
-            "traitor_reveal": "反贼暴露，人人得而诛之！", "loyalist_reveal": "忠臣护主，义薄云天！", "spy_reveal": "内奸现身，居心叵测！",
-            "card_draw": "摸牌阶段，手气如何？", "card_play": "出牌阶段，策略为先！", "equip_use": "装备武器，增强实力！",
-            "peach_use": "使用桃酒，恢复体力！", "kill_use": "使用杀招，攻击敌人！", "dodge_use": "使用闪避，化解攻击！",
-            "trick_use": "锦囊妙计，出奇制胜！", "aoe_use": "群体攻击，无差别打击！", "delay_trick": "延时锦囊，后患无穷！",
-            "negate_use": "无懈可击，化解危机！", "damage_deal": "造成伤害，敌人受创！", "damage_receive": "受到伤害，小心应对！",
-            "heal": "体力恢复，重获新生！", "death": "角色死亡，英魂长存！", "revive": "角色复活，重返战场！",
-            "weapon_equip": "装备武器，如虎添翼！", "armor_equip": "装备防具，固若金汤！", "horse_equip": "装备马匹，日行千里！",
-            "judgement": "判定阶段，命运如何？", "judgement_success": "判定成功，运气不错！", "judgement_fail": "判定失败，运气欠佳！",
-            "skill_activate": "技能发动，效果非凡！", "skill_passive": "被动技能，自动触发！", "skill_limit": "限定技能，一局一次！",
-            "victory_lord": "主公胜利，天下太平！", "victory_traitor": "反贼胜利，乱世开启！", "victory_loyalist": "忠臣护主，功成名就！",
-            "victory_spy": "内奸得逞，居心叵测！", "duel_start": "决斗开始，一决生死！", "duel_end": "决斗结束，胜负已分！",
-            "link_start": "连环开始，休戚与共！", "link_end": "连环结束，各安天命！", "warning": "警告，小心应对！",
-            "error": "操作错误，请重试！", "success": "操作成功，继续游戏！", "info": "游戏提示，请注意！",
-            "tension": "气氛紧张，剑拔弩张！", "relax": "气氛缓和，暂时安全！", "surprise": "出人意料，局势逆转！",
-            "climax": "高潮迭起，精彩纷呈！"
-        }
+    def get_game_event_jobs(self):
+        """生成游戏事件的语音合成任务列表，任务键为事件名"""
+        return [
+            (event_key, text, VOICE_OPTIONS[self.catalog.event_voice], os.path.join(GAME_VOICES_DIR, f"event_{event_key}.wav"))
+            for event_key, text in self.get_game_event_lines().items()
+        ]
 
+    def save_game_event_config(self, jobs, results):
+        """根据合成结果写出 game_events_voices.json"""
+        self.record_clips(jobs, results)
         event_voices = {}
-        for event_key, text in game_events.items():
-            filename = f"event_{event_key}.wav"
-            audio_path = os.path.join(GAME_VOICES_DIR, filename)
-
-            if os.path.exists(audio_path):
-                print(f"🔊 语音已存在，跳过: {audio_path}")
-                event_voices[event_key] = os.path.relpath(audio_path, VOICE_OUTPUT_DIR).replace("\\", "/")
-                continue
-
-            generated_path = self.generate_tts_voice(text, VOICE_OPTIONS["narrator"], audio_path)
-            if generated_path:
-                event_voices[event_key] = os.path.relpath(generated_path, VOICE_OUTPUT_DIR).replace("\\", "/")
-                time.sleep(1)
+        for event_key, _, _, _ in jobs:
+            if event_key in results:
+                event_voices[event_key] = os.path.relpath(results[event_key], VOICE_OUTPUT_DIR).replace("\\", "/")
 
+        # 保存游戏事件语音配置
         event_config = {
             "event_voices": event_voices,
             "generated_at": datetime.now().isoformat(),
@@ -316,20 +540,24 @@ class VoiceGenerator:
         }
 
         config_path = os.path.join(GAME_VOICES_DIR, "game_events_voices.json")
+        os.makedirs(GAME_VOICES_DIR, exist_ok=True)
         with open(config_path, 'w', encoding='utf-8') as f:
             json.dump(event_config, f, ensure_ascii=False, indent=2)
 
         print(f"💾 游戏事件语音配置保存: game_events_voices.json")
         return event_config
 
-    def generate_all_character_voices(self):
-        """为所有角色生成语音"""
-        print("🎭 开始为所有角色生成语音...")
+    def generate_game_event_voices(self):
+        """生成游戏事件语音"""
+        print("\n🎮 生成游戏事件语音...")
 
-        character_cards_dir = "character_cards"
-        os.makedirs(character_cards_dir, exist_ok=True)
+        jobs = self.get_game_event_jobs()
+        results = self.run_voice_jobs(jobs)
+        return self.save_game_event_config(jobs, results)
 
-        # 为了测试，创建或更新一些示例角色文件
+    def write_sample_characters(self, character_cards_dir):
+        """首次运行、还没有任何角色卡片时写入一组示例角色以供测试，已有卡片不会被覆盖"""
+        os.makedirs(character_cards_dir, exist_ok=True)
         sample_characters = [
             {"name": "关羽", "title": "武圣", "faction": "蜀", "type": "武将"},
             {"name": "诸葛亮", "title": "卧龙", "faction": "蜀", "type": "谋士"},
@@ -341,40 +569,167 @@ class VoiceGenerator:
         for char in sample_characters:
             with open(os.path.join(character_cards_dir, f"{char['name']}.json"), 'w', encoding='utf-8') as f:
                 json.dump(char, f, ensure_ascii=False, indent=2)
+        print(f"📝 已写入 {len(sample_characters)} 个示例角色卡片: {character_cards_dir}/")
 
-        characters = []
-        for json_file in os.listdir(character_cards_dir):
-            if json_file.endswith('.json') and not json_file.endswith('_voices.json'):
-                json_path = os.path.join(character_cards_dir, json_file)
-                try:
-                    with open(json_path, 'r', encoding='utf-8') as f:
-                        character = json.load(f)
-                        characters.append(character)
-                except Exception as e:
-                    print(f"❌ 加载角色失败 {json_file}: {str(e)}")
-                    continue
+    def load_characters(self, faction=None, char_type=None, name=None):
+        """从角色索引加载角色卡片，只重新解析改动过的卡片文件；可按势力 / 类型 / 角色名筛选"""
+        card_count, _ = self.character_index.refresh()
+        if not card_count:
+            self.write_sample_characters(self.character_index.cards_dir)
+            self.character_index.refresh()
 
+        characters = self.character_index.query(faction=faction, char_type=char_type, name=name)
         print(f"📊 共找到 {len(characters)} 个角色")
+        return characters
 
-        voice_configs = []
+    def get_all_character_jobs(self, characters):
+        """汇总所有角色的任务，返回 ([(角色名, 音色, 任务列表)], 全部任务)"""
+        character_jobs = []
+        all_jobs = []
         for i, character in enumerate(characters, 1):
-            print(f"\n[{i:2d}/{len(characters)}] 生成语音: {character['name']}")
-
-            voice_config = self.generate_character_voices(character)
+            print(f"[{i:2d}/{len(characters)}] 准备语音任务: {character['name']}")
+            voice_type, jobs = self.get_character_jobs(character)
+            character_jobs.append((character['name'], voice_type, jobs))
+            all_jobs.extend(jobs)
+        return character_jobs, all_jobs
+
+    def save_all_character_configs(self, character_jobs, results):
+        """写出所有角色的 voices.json"""
+        voice_configs = []
+        for name, voice_type, jobs in character_jobs:
+            voice_config = self.save_character_config(name, voice_type, jobs, results)
             if voice_config:
                 voice_configs.append(voice_config)
 
-            time.sleep(2)
-
         print(f"\n🎉 角色语音生成完成！共生成 {len(voice_configs)} 个角色的语音")
         return voice_configs
 
+    def generate_all_character_voices(self):
+        """为所有角色生成语音"""
+        print("🎭 开始为所有角色生成语音...")
+
+        # 先汇总所有角色的任务再统一调度，让线程池和限流器跨角色工作
+        character_jobs, all_jobs = self.get_all_character_jobs(self.load_characters())
+        results = self.run_voice_jobs(all_jobs)
+        return self.save_all_character_configs(character_jobs, results)
+
     def create_voice_database(self):
         """创建完整的语音数据库"""
         print("🏗️ 创建完整语音数据库...")
 
-        character_voices = self.generate_all_character_voices()
-        game_event_voices = self.generate_game_event_voices()
+        # 角色与游戏事件放在同一批调度，跨角色、跨事件合并重复台词
+        character_jobs, all_jobs = self.get_all_character_jobs(self.load_characters())
+        event_jobs = self.get_game_event_jobs()
+        results = self.run_voice_jobs(all_jobs + event_jobs)
+
+        character_voices = self.save_all_character_configs(character_jobs, results)
+        game_event_voices = self.save_game_event_config(event_jobs, results)
+        return self.save_voice_database(character_voices, game_event_voices)
+
+    async def create_voice_database_async(self, synth_concurrency=None, download_concurrency=None):
+        """创建完整的语音数据库（asyncio 版本）
+
+        合成与下载分为两个独立限流的队列，已合成片段的下载与在途合成请求重叠进行，
+        输出目录结构和 voice_database.json 与 create_voice_database 完全一致。
+        """
+        from tts_pipeline import VoicePipeline  # asyncio 只在流水线模式下才需要
+
+        print("🏗️ 创建完整语音数据库 (asyncio 流水线)...")
+
+        character_jobs, all_jobs = self.get_all_character_jobs(self.load_characters())
+        event_jobs = self.get_game_event_jobs()
+
+        with self.metrics.span("batch", jobs=len(all_jobs) + len(event_jobs), mode="async") as span:
+            results, pending = self.get_pending_jobs(all_jobs + event_jobs)
+            span["pending"] = len(pending)
+            self.begin_coverage(all_jobs + event_jobs, results)
+            pipeline = VoicePipeline(
+                self,
+                synth_concurrency=synth_concurrency or self.workers,
+                download_concurrency=download_concurrency or self.workers * 2
+            )
+            unique, duplicates = dedupe_jobs(pending, TTS_MODEL)
+            print_dedupe_report(unique, duplicates)
+            self.metrics.count("deduplicated", len(duplicates))
+            results.update(await pipeline.run(self.prioritize(unique, duplicates)))
+            results.update(self.link_duplicate_jobs(duplicates, results))
+            span["completed"] = len(results)
+            span["coverage"] = round(self.coverage.coverage(), 4)
+        self.coverage.print_progress()
+
+        character_voices = self.save_all_character_configs(character_jobs, results)
+        game_event_voices = self.save_game_event_config(event_jobs, results)
+        return self.save_voice_database(character_voices, game_event_voices)
+
+    def get_clip_catalog(self):
+        """按当前台词目录整理全部片段，返回 (角色任务, 事件任务, {相对路径: 任务与指纹})"""
+        character_jobs, all_jobs = self.get_all_character_jobs(self.load_characters())
+        event_jobs = self.get_game_event_jobs()
+        return character_jobs, event_jobs, build_clip_catalog(all_jobs + event_jobs, TTS_MODEL, VOICE_OUTPUT_DIR)
+
+    def create_voice_database_incremental(self, plan_only=False, only=None):
+        """增量构建语音数据库
+
+        对比 voice_database.json 中记录的片段指纹与当前台词，只合成新增或修改的片段、
+        删除孤立文件，只重写受影响角色的 voices.json。plan_only 为 True 时只打印计划。
+        only 为相对路径集合时只处理其中的片段（用于重放失败清单），不清理孤立文件。
+        """
+        print("🧮 增量构建语音数据库...")
+
+        database_path = os.path.join(VOICE_OUTPUT_DIR, "voice_database.json")
+        old_database = load_voice_database(database_path)
+
+        character_jobs, event_jobs, catalog = self.get_clip_catalog()
+        plan = diff_clip_catalog(old_database.get("clips", {}), catalog, VOICE_OUTPUT_DIR, self.recorded_outputs())
+        if only is not None:
+            plan = restrict_plan(plan, only)
+        unique, _ = dedupe_jobs([catalog[rel_path]["job"] for rel_path in plan["added"] + plan["changed"]], TTS_MODEL)
+        print_build_plan(plan, self.limiter.rate, self.workers, unique_count=len(unique))
+        dirty_characters, dirty_events = dirty_groups(plan)
+        if plan_only:
+            return plan
+        if only is not None:
+            # 台词已删除或片段已是最新的失败记录不再需要重放
+            for rel_path in set(only) - set(plan["added"]) - set(plan["changed"]):
+                self.failure_ledger.resolve(rel_path)
+        if not (plan["added"] or plan["changed"] or plan["adopted"] or plan["orphaned"]):
+            print("✅ 语音数据库已是最新，无需重建")
+            return old_database
+
+        remove_orphan_clips(plan["orphaned"], VOICE_OUTPUT_DIR)
+
+        results = {catalog[rel_path]["job"][0]: catalog[rel_path]["job"][3] for rel_path in plan["unchanged"] + plan["adopted"]}
+        # 新增片段若已有与台词一致的文件（例如清单缺失的旧数据）则直接沿用
+        ready, added_jobs = self.get_pending_jobs([catalog[rel_path]["job"] for rel_path in plan["added"]])
+        results.update(ready)
+        changed_jobs = [catalog[rel_path]["job"] for rel_path in plan["changed"]]
+        self.begin_coverage([entry["job"] for entry in catalog.values()], results)
+        results.update(self.synthesize_jobs(added_jobs + changed_jobs))
+        self.coverage.print_progress()
+
+        # 未受影响的角色和事件沿用磁盘上已有的配置
+        old_characters = {config["character_name"]: config for config in old_database.get("character_voices", [])}
+        character_voices = []
+        for name, voice_type, jobs in character_jobs:
+            if name in dirty_characters or name not in old_characters:
+                character_voices.append(self.save_character_config(name, voice_type, jobs, results))
+            else:
+                self.record_clips(jobs, results)
+                character_voices.append(old_characters[name])
+
+        if dirty_events or "game_event_voices" not in old_database:
+            game_event_voices = self.save_game_event_config(event_jobs, results)
+        else:
+            self.record_clips(event_jobs, results)
+            game_event_voices = old_database["game_event_voices"]
+
+        return self.save_voice_database(character_voices, game_event_voices)
+
+    def save_voice_database(self, character_voices, game_event_voices):
+        """写出完整的 voice_database.json，开启编码时随后执行编码阶段"""
+        database_path = os.path.join(VOICE_OUTPUT_DIR, "voice_database.json")
+        # 沿用仍然有效的编码记录，编码阶段会再刷新
+        old_encodings = load_voice_database(database_path).get("encodings", {})
 
         voice_database = {
             "database_info": {
@@ -385,10 +740,14 @@ class VoiceGenerator:
             },
             "character_voices": character_voices,
             "game_event_voices": game_event_voices,
-            "voice_options": VOICE_OPTIONS
+            "voice_options": VOICE_OPTIONS,
+            "clips": dict(sorted(self.clip_manifest.items()))
         }
+        encodings = {rel: info for rel, info in old_encodings.items() if rel in self.clip_manifest}
+        if encodings:
+            voice_database["encodings"] = encodings
 
-        database_path = os.path.join(VOICE_OUTPUT_DIR, "voice_database.json")
+        os.makedirs(VOICE_OUTPUT_DIR, exist_ok=True)
         with open(database_path, 'w', encoding='utf-8') as f:
             json.dump(voice_database, f, ensure_ascii=False, indent=2)
 
@@ -398,17 +757,77 @@ class VoiceGenerator:
         print(f"   - 游戏事件语音: {len(game_event_voices.get('event_voices', {}))} 个事件")
         print(f"   - 总语音文件: {len(character_voices) * 7 + len(game_event_voices.get('event_voices', {}))} 个")
 
+        cache_stats = self.tts_cache.stats()
+        print(f"♻️ 缓存统计: 命中 {cache_stats['hits']} 次, 未命中 {cache_stats['misses']} 次, "
+              f"共 {cache_stats['entries']} 条 / {cache_stats['bytes'] / 1024 / 1024:.1f} MB")
+        if len(self.failure_ledger):
+            print(f"⚠️ {len(self.failure_ledger)} 个片段生成失败，已记录到 {os.path.basename(self.failure_ledger.path)}，"
+                  f"可用 --retry-failed 单独重放")
+        self.metrics.print_summary()
+        if self.prometheus_path:
+            self.metrics.write_prometheus(self.prometheus_path)
+
+        if self.encode_formats:
+            from audio_encode import encode_voice_tree
+
+            encode_voice_tree(VOICE_OUTPUT_DIR, self.encode_formats)
+            voice_database = load_voice_database(database_path)
+
         return voice_database
 
 
 def main():
     """主函数"""
+    from audio_encode import DEFAULT_ENCODE_FORMATS, encode_voice_tree
+    from voice_bank import build_voice_packs
+
     print("🚀 三国杀游戏语音生成系统启动...")
     print("=" * 60)
 
-    generator = VoiceGenerator()
-
-    voice_database = generator.create_voice_database()
+    parser = argparse.ArgumentParser(description="三国杀游戏语音生成")
+    parser.add_argument("--incremental", action="store_true", help="只合成新增或修改的台词，并清理孤立文件")
+    parser.add_argument("--plan", action="store_true", help="只打印增量构建计划，不调用接口")
+    parser.add_argument("--retry-failed", action="store_true", help="只重放失败清单中的片段")
+    parser.add_argument("--encode", metavar="FORMATS", help="合成后编码为网页格式，逗号分隔，如 opus,mp3")
+    parser.add_argument("--encode-only", action="store_true", help="只把已有的 WAV 批量编码，不调用 TTS 接口")
+    parser.add_argument("--pack", action="store_true", help="合成后生成游戏事件音频精灵和二进制语音包")
+    parser.add_argument("--pack-only", action="store_true", help="只根据已有的语音数据库打包，不调用 TTS 接口")
+    parser.add_argument("--pack-characters", action="store_true", help="打包时同时为每个角色生成音频精灵")
+    parser.add_argument("--batch", type=int, metavar="N", default=TTS_BATCH_LINES,
+                        help="把同音色的短台词每 N 句合并成一次合成请求，再按静音切回逐句片段")
+    parser.add_argument("--metrics-prom", metavar="PATH", help="运行结束时把指标以 Prometheus 文本格式写到 PATH")
+    args = parser.parse_args()
+
+    encode_formats = tuple(args.encode.split(",")) if args.encode else None
+    if args.encode_only:
+        encode_voice_tree(VOICE_OUTPUT_DIR, encode_formats or DEFAULT_ENCODE_FORMATS)
+        return
+    if args.pack_only:
+        build_voice_packs(VOICE_OUTPUT_DIR, include_characters=args.pack_characters)
+        return
+
+    generator = VoiceGenerator(encode_formats=encode_formats, prometheus_path=args.metrics_prom,
+                               batch_lines=args.batch)
+
+    if args.retry_failed:
+        failed = generator.failure_ledger.paths()
+        if not failed:
+            print("✅ 失败清单为空，无需重放")
+            return
+        print(f"🔁 重放失败清单中的 {len(failed)} 个片段")
+        voice_database = generator.create_voice_database_incremental(plan_only=args.plan, only=failed)
+        if args.plan:
+            return
+    elif args.plan:
+        generator.create_voice_database_incremental(plan_only=True)
+        return
+    elif args.incremental:
+        voice_database = generator.create_voice_database_incremental()
+    else:
+        voice_database = generator.create_voice_database()
+
+    if args.pack:
+        build_voice_packs(VOICE_OUTPUT_DIR, include_characters=args.pack_characters)
 
     print("\n🎉 三国杀游戏语音生成完成！")
     print(f"📁 语音文件保存在: {VOICE_OUTPUT_DIR}/")
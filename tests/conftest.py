@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""测试公共配置：语音模块都在仓库根目录，直接加入 sys.path"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
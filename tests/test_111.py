@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Ranking and top-page analysis in 111.py, with the Firecrawl / Gemini SDK clients replaced by fakes."""
+
+import importlib.util
+import json
+import os
+import sys
+import types
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("requests")
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "111.py")
+
+
+class FakeGemini:
+    def __init__(self, *answers):
+        self.answers = list(answers)
+
+    def generate_content(self, model, contents, **kwargs):
+        return SimpleNamespace(text=self.answers.pop(0))
+
+
+class FakeApp:
+    def map_url(self, url, params=None):
+        return {"links": [f"{url}/a", f"{url}/b", f"{url}/c"]}
+
+
+@pytest.fixture
+def extractor(tmp_path, monkeypatch):
+    """Load 111.py with offline SDK clients; the memo and HTTP cache are created under tmp_path."""
+    genai = types.ModuleType("google.genai")
+    genai.Client = lambda api_key=None: SimpleNamespace(models=None)
+    genai.types = SimpleNamespace()
+    google = types.ModuleType("google")
+    google.genai = genai
+    firecrawl = types.ModuleType("firecrawl")
+    firecrawl.FirecrawlApp = lambda api_key=None: FakeApp()
+    dotenv = types.ModuleType("dotenv")
+    dotenv.load_dotenv = lambda *args, **kwargs: None
+    for name, module in (("google", google), ("google.genai", genai), ("firecrawl", firecrawl), ("dotenv", dotenv)):
+        monkeypatch.setitem(sys.modules, name, module)
+    monkeypatch.chdir(tmp_path)
+
+    spec = importlib.util.spec_from_file_location("site_objective", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    memo, http_cache = module.gemini, module.http_cache
+    yield module
+    memo.close()
+    http_cache.close()
+
+
+def ranking(*scores):
+    return json.dumps([{"url": f"https://site/{name}", "relevance_score": score, "reason": "r"}
+                       for name, score in zip("abc", scores)])
+
+
+@pytest.mark.parametrize("scores, expected", [
+    ((70, 95, 80), ["b", "c", "a"]),
+    (("70", "95", "80"), ["b", "c", "a"]),
+    ((70, "95", None), ["b", "a", "c"]),
+    (("high", 60, "90.5"), ["c", "b", "a"]),
+])
+def test_ranking_tolerates_string_and_mixed_scores(extractor, scores, expected):
+    extractor.gemini = FakeGemini("about", ranking(*scores))
+    links = extractor.find_relevant_page_via_map("find the team", "https://site", FakeApp())
+    assert links == [f"https://site/{name}" for name in expected]
+
+
+def test_relevance_score(extractor):
+    assert extractor.relevance_score({"relevance_score": "88"}) == 88.0
+    assert extractor.relevance_score({"relevance_score": None}) == 0.0
+    assert extractor.relevance_score({"relevance_score": [1]}) == 0.0
+    assert extractor.relevance_score({}) == 0.0
+
+
+def test_google_document_hosts_need_a_head_request(extractor):
+    assert extractor.classify_url_fast("https://docs.google.com/document/d/1/export?format=pdf") == "unknown"
+    assert extractor.classify_url_fast("https://drive.google.com/uc?id=1&export=download") == "unknown"
+    assert extractor.classify_url_fast("https://www.youtube.com/watch?v=1") is None
+    assert extractor.classify_url_fast("https://site/report.PDF") == "pdf"
+
+
+def test_top_pages_are_analyzed_sequentially_by_default(extractor, monkeypatch):
+    analyzed = []
+
+    def analyze_page(link, objective, app, cancelled=None):
+        analyzed.append(link)
+        return {"answer": link} if link.endswith("/b") else None
+
+    monkeypatch.setattr(extractor, "analyze_page", analyze_page)
+    links = ["https://site/a", "https://site/b", "https://site/c"]
+    assert extractor.find_objective_in_top_pages(links, "objective", None) == {"answer": "https://site/b"}
+    assert analyzed == ["https://site/a", "https://site/b"]
+
+    analyzed.clear()
+    assert extractor.find_objective_in_top_pages(links, "objective", None, parallel=True) == {"answer": "https://site/b"}
+    assert sorted(analyzed) == links
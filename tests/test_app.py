@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""按需语音服务 /tts：合并合成、缓存淘汰重试与错误响应"""
+
+import os
+import threading
+import wave
+
+import pytest
+
+pytest.importorskip("flask")
+
+import app as app_module
+from single_flight import SingleFlight
+from tts_cache import TTSCache
+from voice_catalog import load_catalog
+
+SECRET = "https://dashscope.internal/req/8f2c-secret /root/.keys/api_key"
+
+
+class CountingMetrics:
+    def __init__(self):
+        self.counters = {}
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+
+class NoRetry:
+    def call(self, func, *args):
+        return func(*args)
+
+
+class FakeGenerator:
+    """只实现 /tts 用到的接口，合成时写一个本地 WAV"""
+
+    def __init__(self, cache_dir):
+        self.catalog = load_catalog()
+        self.tts_cache = TTSCache(cache_dir, max_bytes=10 * 1024 * 1024)
+        self.metrics = CountingMetrics()
+        self.retry_policy = NoRetry()
+        self.calls = []
+        self.before_synthesis = None
+        self.error = None
+
+    def request_audio_url(self, text, voice):
+        self.calls.append((text, voice))
+        if self.before_synthesis:
+            self.before_synthesis()
+        if self.error:
+            raise self.error
+        return "fake://audio"
+
+    def download_voice(self, url, path):
+        with wave.open(path, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(b"\x01\x00" * 1600)
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    generator = FakeGenerator(str(tmp_path / "cache"))
+    monkeypatch.setattr(app_module, "_generator", generator)
+    monkeypatch.setattr(app_module, "_flight", SingleFlight())
+    yield generator
+    generator.tts_cache.close()
+
+
+@pytest.fixture
+def client(generator):
+    return app_module.app.test_client()
+
+
+def test_miss_then_hit(generator, client):
+    first = client.get("/tts?event=game_start")
+    second = client.get("/tts?event=game_start")
+
+    assert first.status_code == second.status_code == 200
+    assert first.headers["X-TTS-Cache"] == "miss"
+    assert second.headers["X-TTS-Cache"] == "hit"
+    assert len(generator.calls) == 1
+
+
+def test_concurrent_requests_share_one_synthesis(generator, monkeypatch):
+    workers = 4
+    entered = threading.Semaphore(0)
+    flight = app_module._flight
+    original_do = flight.do
+
+    def counting_do(*args, **kwargs):
+        entered.release()
+        return original_do(*args, **kwargs)
+
+    def wait_for_followers():
+        # 领头请求合成时，等其余请求都进入合并窗口
+        for _ in range(workers):
+            assert entered.acquire(timeout=5)
+
+    monkeypatch.setattr(flight, "do", counting_do)
+    generator.before_synthesis = wait_for_followers
+    responses = [None] * workers
+
+    def fetch(index):
+        responses[index] = app_module.app.test_client().get("/tts?event=game_start")
+
+    threads = [threading.Thread(target=fetch, args=(index,)) for index in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert [response.status_code for response in responses] == [200] * workers
+    sources = sorted(response.headers["X-TTS-Cache"] for response in responses)
+    assert sources == ["coalesced"] * (workers - 1) + ["miss"]
+    assert len(generator.calls) == 1
+    assert generator.metrics.counters == {"http_miss": 1, "http_coalesced": workers - 1}
+
+
+def test_synthesis_error_is_logged_not_returned(generator, client, caplog):
+    generator.error = RuntimeError(f"TTS 接口返回 500: {SECRET}")
+
+    response = client.get("/tts?event=game_start")
+
+    assert response.status_code == 502
+    body = response.get_json()
+    assert body["code"] == "tts_failed"
+    assert SECRET not in response.get_data(as_text=True)
+    assert "RuntimeError" not in response.get_data(as_text=True)
+    # 完整异常只进服务端日志
+    assert any(record.exc_info and SECRET in str(record.exc_info[1]) for record in caplog.records)
+    assert generator.metrics.counters["http_tts_failed"] == 1
+
+
+def test_evicted_before_send_is_synthesized_again(generator, client, monkeypatch):
+    send_file = app_module.send_file
+    evictions = []
+
+    def evicting_send_file(path, *args, **kwargs):
+        if not evictions:  # 第一次发送前文件被 LRU 淘汰
+            evictions.append(path)
+            os.remove(path)
+        return send_file(path, *args, **kwargs)
+
+    monkeypatch.setattr(app_module, "send_file", evicting_send_file)
+    response = client.get("/tts?event=game_start")
+
+    assert response.status_code == 200
+    assert response.headers["X-TTS-Cache"] == "miss"
+    assert len(evictions) == 1
+    assert len(generator.calls) == 2
+
+
+def test_evicted_twice_returns_fixed_error(generator, client, monkeypatch):
+    def missing_file(path, *args, **kwargs):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(app_module, "send_file", missing_file)
+    response = client.get("/tts?event=game_start")
+
+    assert response.status_code == 502
+    assert response.get_json()["code"] == "tts_evicted"
+    assert str(generator.tts_cache.cache_dir) not in response.get_data(as_text=True)
+
+
+def test_bad_request_and_unknown_line(generator, client):
+    missing = client.get("/tts")
+    too_long = client.get("/tts", query_string={"text": "长" * (app_module.TTS_MAX_TEXT_CHARS + 1)})
+    unknown = client.get("/tts?event=no_such_event")
+
+    assert (missing.status_code, missing.get_json()["code"]) == (400, "bad_request")
+    assert (too_long.status_code, too_long.get_json()["code"]) == (400, "bad_request")
+    assert (unknown.status_code, unknown.get_json()["code"]) == (404, "line_not_found")
+    assert generator.calls == []
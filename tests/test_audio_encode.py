@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""语音后处理与编码：静音裁剪、响度统一和编码记录"""
+
+import array
+import json
+import os
+import stat
+import sys
+import wave
+
+import pytest
+
+import audio_encode
+from audio_encode import encode_voice_tree, normalize_loudness, trim_silence
+
+# 替身 ffmpeg：把 -i 的输入原样复制到最后一个参数（输出路径）
+FAKE_FFMPEG = """#!{python}
+import shutil, sys
+args = sys.argv[1:]
+shutil.copyfile(args[args.index("-i") + 1], args[-1])
+"""
+
+
+def write_wav(path, samples, rate=16000):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(array.array('h', samples).tobytes())
+    return path
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    if os.name != "posix":
+        pytest.skip("替身 ffmpeg 依赖 shebang")
+    path = tmp_path / "bin" / "ffmpeg"
+    path.parent.mkdir()
+    path.write_text(FAKE_FFMPEG.format(python=sys.executable), encoding='utf-8')
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(audio_encode.shutil, "which", lambda name: str(path))
+    return str(path)
+
+
+def test_trim_silence_keeps_padding():
+    rate = 1000
+    samples = [0] * 500 + [10000] * 200 + [0] * 500
+    trimmed = trim_silence(samples, rate)
+    padding = rate * audio_encode.SILENCE_PADDING_MS // 1000
+    assert len(trimmed) == 200 + 2 * padding
+    assert trim_silence([0] * 100, rate) == [0] * 100
+
+
+def test_normalize_loudness_respects_peak_ceiling():
+    quiet = array.array('h', [100, -100] * 500)
+    louder = normalize_loudness(quiet)
+    assert max(louder) > 100
+    assert max(abs(s) for s in louder) <= audio_encode._dbfs_to_amplitude(audio_encode.PEAK_CEILING_DBFS) + 1
+    assert list(normalize_loudness(array.array('h', [0] * 10))) == [0] * 10
+
+
+def test_encodings_are_recorded_without_voice_database(tmp_path, fake_ffmpeg):
+    output_dir = str(tmp_path / "voices")
+    write_wav(os.path.join(output_dir, "game_events", "start.wav"), [0] * 800 + [8000, -8000] * 800 + [0] * 800)
+
+    encodings = encode_voice_tree(output_dir, ("opus",), workers=1)
+    assert encodings["game_events/start.wav"]["opus"]["file"] == "game_events/start.opus"
+    assert os.path.exists(os.path.join(output_dir, "game_events", "start.opus"))
+
+    with open(os.path.join(output_dir, "voice_database.json"), encoding='utf-8') as f:
+        database = json.load(f)
+    assert database["encodings"] == encodings
+    assert "encoded_at" in database["database_info"]
+
+
+def test_existing_database_is_updated_and_aliases_linked(tmp_path, fake_ffmpeg):
+    output_dir = str(tmp_path / "voices")
+    write_wav(os.path.join(output_dir, "characters", "关羽", "attack.wav"), [8000, -8000] * 800)
+    write_wav(os.path.join(output_dir, "characters", "张飞", "attack.wav"), [8000, -8000] * 800)
+    database = {
+        "character_voices": [{"character_name": "关羽"}],
+        "clips": {
+            "characters/关羽/attack.wav": {"text": "看招"},
+            "characters/张飞/attack.wav": {"text": "看招", "alias_of": "characters/关羽/attack.wav"},
+        },
+    }
+    with open(os.path.join(output_dir, "voice_database.json"), 'w', encoding='utf-8') as f:
+        json.dump(database, f, ensure_ascii=False)
+
+    encodings = encode_voice_tree(output_dir, ("mp3",), workers=1)
+    assert encodings["characters/张飞/attack.wav"]["mp3"]["file"] == "characters/张飞/attack.mp3"
+    assert os.path.exists(os.path.join(output_dir, "characters", "张飞", "attack.mp3"))
+    with open(os.path.join(output_dir, "voice_database.json"), encoding='utf-8') as f:
+        saved = json.load(f)
+    assert saved["character_voices"] == database["character_voices"]
+    assert sorted(saved["encodings"]) == ["characters/关羽/attack.wav", "characters/张飞/attack.wav"]
+
+
+def test_fresh_encodings_are_recorded_without_ffmpeg(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_encode.shutil, "which", lambda name: None)
+    output_dir = str(tmp_path / "voices")
+    wav_path = write_wav(os.path.join(output_dir, "game_events", "start.wav"), [8000] * 1600)
+    opus_path = os.path.join(output_dir, "game_events", "start.opus")
+    with open(opus_path, 'wb') as f:
+        f.write(b"OggS" + b"\x00" * 60)
+    os.utime(opus_path, (os.path.getmtime(wav_path) + 10,) * 2)
+
+    encodings = encode_voice_tree(output_dir, ("opus",), workers=1)
+    assert encodings["game_events/start.wav"]["opus"]["bytes"] == 64
+
+
+def test_missing_output_dir_fails_loudly(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        encode_voice_tree(str(tmp_path / "missing"), ("opus",))
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        encode_voice_tree(str(tmp_path), ("flac",))
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""角色卡片索引的增量刷新与查询"""
+
+import json
+import os
+
+import pytest
+
+from character_index import CHARACTER_INDEX_NAME, CharacterIndex
+
+
+def write_card(cards_dir, file, card, mtime_ns=None):
+    path = cards_dir / file
+    path.write_text(json.dumps(card, ensure_ascii=False), encoding='utf-8')
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path
+
+
+@pytest.fixture
+def cards_dir(tmp_path):
+    cards = tmp_path / "character_cards"
+    cards.mkdir()
+    write_card(cards, "关羽.json", {"name": "关羽", "faction": "蜀", "type": "武将"})
+    write_card(cards, "华佗.json", {"name": "华佗", "faction": "群", "type": "谋士"})
+    write_card(cards, "关羽_voices.json", {"voices": {}})  # 生成的语音配置不是卡片
+    return cards
+
+
+def test_refresh_only_reparses_changed_cards(cards_dir):
+    index = CharacterIndex(str(cards_dir), cache_dir=None)
+    assert index.refresh() == (2, 2)
+    assert index.refresh() == (2, 0)
+
+    write_card(cards_dir, "华佗.json", {"name": "华佗", "faction": "魏", "type": "谋士"}, mtime_ns=10 ** 18)
+    assert index.refresh() == (2, 1)
+    assert index.query(name="华佗")[0]["faction"] == "魏"
+
+
+def test_removed_cards_leave_the_index(cards_dir):
+    index = CharacterIndex(str(cards_dir), cache_dir=None)
+    index.refresh()
+    (cards_dir / "关羽.json").unlink()
+    assert index.refresh() == (1, 0)
+    assert [card["name"] for card in index.query()] == ["华佗"]
+
+
+def test_query_filters_and_skips_broken_cards(cards_dir):
+    (cards_dir / "坏卡.json").write_text("{not json", encoding='utf-8')
+    write_card(cards_dir, "无名.json", {"faction": "蜀"})
+    index = CharacterIndex(str(cards_dir), cache_dir=None)
+    assert index.refresh() == (4, 4)
+    assert [card["name"] for card in index.query()] == ["关羽", "华佗"]
+    assert [card["name"] for card in index.query(faction="蜀", char_type="武将")] == ["关羽"]
+    assert index.query(faction="吴") == []
+
+
+def test_index_persists_in_cache_dir(cards_dir, tmp_path):
+    cache_dir = tmp_path / "cache"
+    CharacterIndex(str(cards_dir), cache_dir=str(cache_dir)).refresh()
+    assert (cache_dir / CHARACTER_INDEX_NAME).exists()
+    assert CharacterIndex(str(cards_dir), cache_dir=str(cache_dir)).refresh() == (2, 0)
+
+
+def test_in_memory_index_writes_nothing(cards_dir, tmp_path):
+    index = CharacterIndex(str(cards_dir), cache_dir=None)
+    index.refresh()
+    assert sorted(os.listdir(tmp_path)) == ["character_cards"]
+
+
+def test_missing_cards_dir(tmp_path):
+    index = CharacterIndex(str(tmp_path / "missing"), cache_dir=None)
+    assert index.refresh() == (0, 0)
+    assert index.query() == []
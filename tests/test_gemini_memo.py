@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Gemini memo keying, hits, expiry and bypass."""
+
+from types import SimpleNamespace
+
+import pytest
+
+import gemini_memo
+from gemini_memo import GeminiMemo, memo_key
+
+
+def blob(data, mime_type="application/pdf"):
+    return SimpleNamespace(inline_data=SimpleNamespace(data=data, mime_type=mime_type), text=None)
+
+
+class FakeModels:
+    def __init__(self):
+        self.calls = []
+
+    def generate_content(self, model, contents, **kwargs):
+        self.calls.append((model, contents, kwargs))
+        return SimpleNamespace(text=f"answer {len(self.calls)}")
+
+
+@pytest.fixture
+def memo(tmp_path):
+    client = SimpleNamespace(models=FakeModels())
+    memo = GeminiMemo(client, path=str(tmp_path / "memo.sqlite"), ttl=60, bypass=False)
+    yield memo
+    memo.close()
+
+
+def test_memo_key_depends_on_model_config_and_attachment_bytes():
+    base = memo_key("gemini-2.0-flash", [blob(b"%PDF-1"), "prompt"])
+    assert base == memo_key("gemini-2.0-flash", [blob(b"%PDF-1"), "prompt"])
+    assert base != memo_key("gemini-2.0-pro", [blob(b"%PDF-1"), "prompt"])
+    assert base != memo_key("gemini-2.0-flash", [blob(b"%PDF-2"), "prompt"])
+    assert base != memo_key("gemini-2.0-flash", [blob(b"%PDF-1", "image/jpeg"), "prompt"])
+    assert base != memo_key("gemini-2.0-flash", [blob(b"%PDF-1"), "prompt"], config={"temperature": 0})
+    assert base != memo_key("gemini-2.0-flash", ["prompt", blob(b"%PDF-1")])
+
+
+def test_memo_key_treats_text_parts_like_strings():
+    text_part = SimpleNamespace(inline_data=None, text="hello")
+    assert memo_key("m", [text_part]) == memo_key("m", ["hello"]) == memo_key("m", "hello")
+
+
+def test_second_call_is_served_from_memo(memo):
+    first = memo.generate_content(model="m", contents=["prompt"])
+    second = memo.generate_content(model="m", contents=["prompt"])
+    assert first.text == second.text == "answer 1"
+    assert len(memo.client.models.calls) == 1
+    assert (memo.stats["hits"], memo.stats["misses"]) == (1, 1)
+
+
+def test_entries_survive_a_new_process(memo, tmp_path):
+    memo.generate_content(model="m", contents=["prompt"])
+    reopened = GeminiMemo(memo.client, path=str(tmp_path / "memo.sqlite"), ttl=60, bypass=False)
+    try:
+        assert reopened.generate_content(model="m", contents=["prompt"]).text == "answer 1"
+    finally:
+        reopened.close()
+    assert len(memo.client.models.calls) == 1
+
+
+def test_key_contents_and_lookup(memo):
+    full, pages = blob(b"%PDF-full"), blob(b"%PDF-pages")
+    assert memo.lookup("m", [full, "prompt"]) is None
+    memo.generate_content(model="m", contents=[pages, "prompt"], key_contents=[full, "prompt"])
+    assert memo.client.models.calls[0][1][0] is pages
+    assert memo.lookup("m", [full, "prompt"]).text == "answer 1"
+    assert memo.lookup("m", [pages, "prompt"]) is None
+    assert (memo.stats["hits"], memo.stats["misses"]) == (1, 1)
+
+
+def test_entries_expire_after_ttl(memo, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(gemini_memo.time, "time", lambda: now[0])
+    memo.generate_content(model="m", contents=["short"], ttl=10)
+    memo.generate_content(model="m", contents=["forever"], ttl=0)
+    now[0] += 3600
+    memo.generate_content(model="m", contents=["short"])
+    memo.generate_content(model="m", contents=["forever"])
+    assert [call[1] for call in memo.client.models.calls] == [["short"], ["forever"], ["short"]]
+    assert memo.purge_expired() == 0  # the refreshed entry is fresh again
+
+
+def test_bypass_refreshes_the_entry(memo):
+    memo.generate_content(model="m", contents=["prompt"])
+    assert memo.generate_content(model="m", contents=["prompt"], bypass=True).text == "answer 2"
+    assert memo.generate_content(model="m", contents=["prompt"]).text == "answer 2"
+    assert memo.stats["bypassed"] == 1
+
+
+def test_empty_responses_are_not_memoized(memo):
+    memo.client.models.generate_content = lambda model, contents, **kwargs: SimpleNamespace(text=None)
+    memo.generate_content(model="m", contents=["blocked"])
+    assert memo.lookup("m", ["blocked"]) is None
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""多句合并合成的分批与静音切分"""
+
+import array
+import math
+import wave
+
+import pytest
+
+from tts_batch import BatchSplitError, batch_text, plan_batches, split_batch_audio
+
+RATE = 16000
+
+
+def tone(seconds, amplitude=8000):
+    return [int(amplitude * math.sin(2 * math.pi * 440 * i / RATE)) for i in range(int(seconds * RATE))]
+
+
+def silence(seconds):
+    return [0] * int(seconds * RATE)
+
+
+def write_wav(path, samples):
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(array.array('h', samples).tobytes())
+    return str(path)
+
+
+def test_plan_batches_groups_short_lines_by_voice():
+    jobs = [
+        ("a1", "你好", "v1", "a1.wav"),
+        ("b1", "来了", "v2", "b1.wav"),
+        ("a2", "看招", "v1", "a2.wav"),
+        ("a3", "这是一句超过二十个字的很长很长很长很长的台词啊", "v1", "a3.wav"),
+        ("a4", "……", "v1", "a4.wav"),
+    ]
+    batches, singles = plan_batches(jobs, max_lines=4)
+    assert [[job[0] for job in batch] for batch in batches] == [["a1", "a2"]]
+    assert sorted(job[0] for job in singles) == ["a3", "a4", "b1"]
+
+
+def test_plan_batches_disabled():
+    jobs = [("a1", "你好", "v1", "a1.wav"), ("a2", "看招", "v1", "a2.wav")]
+    assert plan_batches(jobs, max_lines=0) == ([], jobs)
+
+
+def test_batch_text_joins_with_pause():
+    assert batch_text([" 你好 ", "看招"], pause="|") == "你好|看招"
+
+
+def test_split_batch_audio_cuts_at_pauses(tmp_path):
+    texts = ["天地无极", "乾坤借法", "急急如律令"]
+    samples = silence(0.1) + tone(1.0) + silence(0.5) + tone(1.0) + silence(0.5) + tone(1.25) + silence(0.1)
+    params, clips = split_batch_audio(write_wav(tmp_path / "batch.wav", samples), texts)
+
+    assert params.framerate == RATE
+    assert len(clips) == 3
+    durations = [len(clip) / 2 / RATE for clip in clips]
+    # 每段为有声部分加前后各 60 ms 留白
+    for duration, expected in zip(durations, (1.0, 1.0, 1.25)):
+        assert duration == pytest.approx(expected + 0.12, abs=0.03)
+
+
+def test_split_batch_audio_missing_pause(tmp_path):
+    samples = tone(1.0) + silence(0.5) + tone(1.0)
+    with pytest.raises(BatchSplitError):
+        split_batch_audio(write_wav(tmp_path / "batch.wav", samples), ["天地无极", "乾坤借法", "急急如律令"])
+
+
+def test_split_batch_audio_ambiguous_pauses(tmp_path):
+    # 第一句内部的停顿与句间停顿一样长，无法判断切在哪里
+    samples = tone(0.5) + silence(0.4) + tone(0.5) + silence(0.4) + tone(1.0)
+    with pytest.raises(BatchSplitError):
+        split_batch_audio(write_wav(tmp_path / "batch.wav", samples), ["天地无极", "乾坤借法"])
+
+
+def test_split_batch_audio_duration_mismatch(tmp_path):
+    # 两段时长相同，但字数相差很多
+    samples = tone(1.0) + silence(0.5) + tone(1.0)
+    with pytest.raises(BatchSplitError):
+        split_batch_audio(write_wav(tmp_path / "batch.wav", samples), ["好", "天地无极乾坤借法急急如律令"])
+
+
+def test_split_batch_audio_rejects_8_bit(tmp_path):
+    path = tmp_path / "batch.wav"
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(1)
+        wav.setframerate(RATE)
+        wav.writeframes(b"\x80" * RATE)
+    with pytest.raises(BatchSplitError):
+        split_batch_audio(str(path), ["天地无极", "乾坤借法"])
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""基准测试的统计函数与本地替身服务"""
+
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from tts_benchmark import TTS_ENDPOINT, FakeTTSServer, make_wav_payload, percentile, summarize_samples
+from voice_verify import read_wav_info
+
+opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))  # 替身服务在本机，不走环境变量里的代理
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([3, 1, 2], 100) == 3
+    assert percentile([7], 1) == 7
+    assert percentile([], 50) is None
+
+
+def test_summarize_samples():
+    assert summarize_samples([1.0, 2.0, 3.0, 4.0]) == {"count": 4, "mean": 2.5, "p50": 2.0, "p95": 4.0, "p99": 4.0}
+    assert summarize_samples([])["mean"] is None
+
+
+def test_wav_payload_is_a_valid_clip(tmp_path):
+    payload = make_wav_payload(48044)
+    path = tmp_path / "payload.wav"
+    path.write_bytes(payload)
+    assert len(payload) == 48044
+    assert read_wav_info(str(path))["duration"] == pytest.approx(1.0)
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(**kwargs):
+        fake = FakeTTSServer(synth_latency=0, download_latency=0, latency_sigma=0, payload_bytes=4096, **kwargs)
+        base_url = fake.start()
+        servers.append(fake)
+        return fake, base_url.rsplit("/api/v1", 1)[0]
+
+    yield start
+    for fake in servers:
+        fake.stop()
+
+
+def post(root, path=TTS_ENDPOINT):
+    request = urllib.request.Request(root + path, data=json.dumps({"input": {"text": "看招"}}).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with opener.open(request, timeout=5) as response:
+            return response.status, dict(response.headers), json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), json.load(e)
+
+
+def test_server_synthesizes_and_serves_audio(server):
+    fake, root = server()
+    status, _, body = post(root)
+    assert status == 200
+    with opener.open(body["output"]["audio"]["url"], timeout=5) as response:
+        assert response.read() == fake.payload
+    assert fake.stats["synth_requests"] == 1
+    assert fake.stats["downloads"] == 1
+    assert fake.stats["bytes_served"] == len(fake.payload)
+
+
+def test_server_injects_errors_and_throttling(server):
+    fake, root = server(error_rate=1.0)
+    status, _, body = post(root)
+    assert (status, body["code"]) == (500, "InternalError")
+    assert fake.stats["synth_errors"] == 1
+
+    fake, root = server(throttle_rate=1.0)
+    status, headers, body = post(root)
+    assert (status, body["code"], headers["Retry-After"]) == (429, "Throttling.RateQuota", "1")
+    assert fake.stats["throttled"] == 1
+
+
+def test_server_unknown_endpoint(server):
+    fake, root = server()
+    status, _, body = post(root, "/api/v1/unknown")
+    assert (status, body["code"]) == (404, "NotFound")
+    assert fake.stats["synth_requests"] == 0
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""TTS 持久化缓存：输出登记与旧文件收录"""
+
+import wave
+
+import pytest
+
+from tts_cache import TTSCache, make_cache_key
+
+MODEL = "qwen-tts"
+
+
+def write_wav(path, frames=1600):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(b"\x01\x00" * frames)
+    return str(path)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = TTSCache(str(tmp_path / "cache"), max_bytes=10 * 1024 * 1024)
+    yield cache
+    cache.close()
+
+
+def test_untracked_clip_with_changed_text_is_not_adopted(cache, tmp_path):
+    # 旧版本生成的文件，当时的台词是「看招！」，现在台词已改为「吃我一刀！」
+    path = write_wav(tmp_path / "voices" / "characters" / "关羽" / "attack.wav")
+    old_fingerprint = make_cache_key(MODEL, "Ethan", "看招！")
+
+    assert not cache.is_current(path, MODEL, "Ethan", "吃我一刀！")
+    assert not cache.is_current(path, MODEL, "Ethan", "吃我一刀！", old_fingerprint)
+    # 旧音频没有以新台词的键进入缓存
+    assert cache.get(MODEL, "Ethan", "吃我一刀！") is None
+    assert cache.output_record(path) is None
+
+
+def test_untracked_clip_with_other_voice_is_not_adopted(cache, tmp_path):
+    path = write_wav(tmp_path / "attack.wav")
+    assert not cache.is_current(path, MODEL, "Ethan", "看招！", make_cache_key(MODEL, "Cherry", "看招！"))
+    assert cache.get(MODEL, "Ethan", "看招！") is None
+
+
+def test_untracked_clip_proven_by_manifest_is_adopted(cache, tmp_path):
+    path = write_wav(tmp_path / "attack.wav")
+    assert cache.is_current(path, MODEL, "Ethan", "看招！", make_cache_key(MODEL, "Ethan", "看招！"))
+    assert cache.get(MODEL, "Ethan", "看招！") is not None
+    assert cache.output_record(path)[0] == make_cache_key(MODEL, "Ethan", "看招！")
+    # 登记之后不再需要清单证明
+    assert cache.is_current(path, MODEL, "Ethan", "看招！")
+
+
+def test_broken_untracked_clip_is_not_adopted(cache, tmp_path):
+    path = tmp_path / "attack.wav"
+    path.write_bytes(b"<html>502 Bad Gateway</html>")
+    assert not cache.is_current(str(path), MODEL, "Ethan", "看招！", make_cache_key(MODEL, "Ethan", "看招！"))
+    assert cache.get(MODEL, "Ethan", "看招！") is None
+
+
+def test_recorded_output_follows_text_voice_and_size(cache, tmp_path):
+    path = write_wav(tmp_path / "attack.wav")
+    cache.record_output(path, MODEL, "Ethan", "看招！")
+    assert cache.is_current(path, MODEL, "Ethan", "看招！")
+    assert not cache.is_current(path, MODEL, "Ethan", "吃我一刀！")
+    assert not cache.is_current(path, MODEL, "Cherry", "看招！")
+
+    write_wav(tmp_path / "attack.wav", frames=800)  # 文件被其他程序改写
+    assert not cache.is_current(path, MODEL, "Ethan", "看招！")
+
+
+def test_missing_output(cache, tmp_path):
+    assert not cache.is_current(str(tmp_path / "missing.wav"), MODEL, "Ethan", "看招！",
+                                make_cache_key(MODEL, "Ethan", "看招！"))
+
+
+def test_put_get_and_lru_eviction(tmp_path):
+    source = write_wav(tmp_path / "clip.wav", frames=16000)  # 约 32 KB
+    cache = TTSCache(str(tmp_path / "cache"), max_bytes=70 * 1024)
+    try:
+        cache.put(MODEL, "Ethan", "一", source)
+        cache.put(MODEL, "Ethan", "二", source)
+        assert cache.get(MODEL, "Ethan", "一") is not None  # 访问后「二」成为最久未用
+        cache.put(MODEL, "Ethan", "三", source)
+        assert cache.get(MODEL, "Ethan", "二") is None
+        assert cache.get(MODEL, "Ethan", "三") is not None
+        # 全角与多余空白规范化后是同一条
+        assert cache.get(MODEL, "Ethan", " 一 ") is not None
+        assert cache.stats()["entries"] == 2
+    finally:
+        cache.close()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""音频下载：断点续传与 416 处理"""
+
+import json
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from tts_download import download_file
+
+URL = "https://dashscope.example/audio/clip.wav"
+PAYLOAD = bytes(range(256)) * 40  # 10240 字节
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None, fail_after=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = dict(headers or {})
+        self.fail_after = fail_after  # 发送这么多字节后模拟连接中断
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code}")
+
+    def iter_content(self, chunk_size):
+        body = self.body if self.fail_after is None else self.body[:self.fail_after]
+        for start in range(0, len(body), chunk_size):
+            yield body[start:start + chunk_size]
+        if self.fail_after is not None:
+            raise requests.exceptions.ChunkedEncodingError("connection reset")
+
+
+class FakeServer:
+    """支持 Range / If-Range 的音频服务替身"""
+
+    def __init__(self, payload=PAYLOAD, etag='"v1"', fail_first_after=None):
+        self.payload = payload
+        self.etag = etag
+        self.fail_first_after = fail_first_after
+        self.requests = []
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        headers = headers or {}
+        self.requests.append(dict(headers))
+        fail_after, self.fail_first_after = self.fail_first_after, None
+        full = {"ETag": self.etag, "Content-Length": str(len(self.payload))}
+        range_header = headers.get("Range")
+        if range_header is None or headers.get("If-Range", self.etag) != self.etag:
+            return FakeResponse(200, self.payload, full, fail_after)
+        start = int(range_header[len("bytes="):-1])
+        if start >= len(self.payload):
+            return FakeResponse(416, headers={"Content-Range": f"bytes */{len(self.payload)}"})
+        body = self.payload[start:]
+        return FakeResponse(206, body, {"ETag": self.etag, "Content-Length": str(len(body)),
+                                        "Content-Range": f"bytes {start}-{len(self.payload) - 1}/{len(self.payload)}"},
+                            fail_after)
+
+
+def leave_part(tmp_path, content, etag='"v1"'):
+    output = tmp_path / "clip.wav"
+    (tmp_path / "clip.wav.part").write_bytes(content)
+    (tmp_path / "clip.wav.part.json").write_text(json.dumps({"url": URL, "etag": etag}), encoding="utf-8")
+    return output
+
+
+def assert_finished(tmp_path, output):
+    assert output.read_bytes() == PAYLOAD
+    assert not (tmp_path / "clip.wav.part").exists()
+    assert not (tmp_path / "clip.wav.part.json").exists()
+
+
+def test_fresh_download(tmp_path):
+    output = tmp_path / "clip.wav"
+    assert download_file(URL, str(output), session=FakeServer()) == len(PAYLOAD)
+    assert_finished(tmp_path, output)
+
+
+def test_resumes_after_interruption(tmp_path):
+    server = FakeServer(fail_first_after=4000)
+    output = tmp_path / "clip.wav"
+    download_file(URL, str(output), session=server)
+    assert server.requests[1] == {"Range": "bytes=4000-", "If-Range": '"v1"'}
+    assert_finished(tmp_path, output)
+
+
+def test_416_with_complete_part_is_accepted(tmp_path):
+    server = FakeServer()
+    output = leave_part(tmp_path, PAYLOAD)
+    download_file(URL, str(output), session=server)
+    assert len(server.requests) == 1
+    assert_finished(tmp_path, output)
+
+
+def test_416_with_oversized_part_restarts(tmp_path):
+    server = FakeServer()
+    output = leave_part(tmp_path, PAYLOAD + b"stale tail of a longer, older clip")
+    download_file(URL, str(output), session=server)
+    assert [request.get("Range") for request in server.requests] == [f"bytes={len(PAYLOAD) + 34}-", None]
+    assert_finished(tmp_path, output)
+
+
+def test_416_without_content_range_restarts(tmp_path):
+    class NoContentRange(FakeServer):
+        def get(self, url, headers=None, **kwargs):
+            response = super().get(url, headers, **kwargs)
+            response.headers.pop("Content-Range", None)
+            return response
+
+    output = leave_part(tmp_path, PAYLOAD)
+    download_file(URL, str(output), session=NoContentRange())
+    assert_finished(tmp_path, output)
+
+
+def test_changed_resource_restarts_from_zero(tmp_path):
+    # 残留的 .part 属于旧版本 (ETag "v0")，If-Range 不匹配时服务端返回完整的 200
+    server = FakeServer(etag='"v1"')
+    output = leave_part(tmp_path, b"old version bytes", etag='"v0"')
+    download_file(URL, str(output), session=server)
+    assert server.requests[0]["If-Range"] == '"v0"'
+    assert_finished(tmp_path, output)
+
+
+def test_part_from_other_url_is_discarded(tmp_path):
+    output = tmp_path / "clip.wav"
+    (tmp_path / "clip.wav.part").write_bytes(b"junk from another clip")
+    (tmp_path / "clip.wav.part.json").write_text(json.dumps({"url": "https://other"}), encoding="utf-8")
+    server = FakeServer()
+    download_file(URL, str(output), session=server)
+    assert server.requests[0] == {}
+    assert_finished(tmp_path, output)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""令牌桶限流器"""
+
+import threading
+
+import pytest
+
+import tts_limiter
+from tts_limiter import RateLimiter
+
+
+class FakeClock:
+    """替换 time.monotonic / time.sleep，sleep 直接推进时钟"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(tts_limiter.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(tts_limiter.time, "sleep", fake.sleep)
+    return fake
+
+
+def test_burst_then_paced(clock):
+    limiter = RateLimiter(requests_per_second=2, max_concurrent=10)
+    start = clock.now
+    for _ in range(6):
+        with limiter:
+            pass
+    # 桶容量为 1 秒的配额（2 个令牌），其余 4 个请求按每秒 2 个放行
+    assert clock.now - start == pytest.approx(2.0)
+
+
+def test_rate_below_one_keeps_one_token(clock):
+    limiter = RateLimiter(requests_per_second=0.5, max_concurrent=1)
+    start = clock.now
+    for _ in range(3):
+        with limiter:
+            pass
+    assert clock.now - start == pytest.approx(4.0)
+
+
+def test_concurrency_cap():
+    limiter = RateLimiter(requests_per_second=1000, max_concurrent=2)
+    limiter.acquire()
+    limiter.acquire()
+    blocked = threading.Event()
+
+    def third():
+        limiter.acquire()
+        blocked.set()
+        limiter.release()
+
+    worker = threading.Thread(target=third)
+    worker.start()
+    assert not blocked.wait(0.1)
+    limiter.release()
+    assert blocked.wait(1)
+    worker.join()
+    limiter.release()
+
+
+def test_slot_released_when_interrupted(clock, monkeypatch):
+    limiter = RateLimiter(requests_per_second=1, max_concurrent=1)
+    limiter.acquire()
+    limiter.release()
+
+    def interrupted(seconds):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(tts_limiter.time, "sleep", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        limiter.acquire()  # 桶已空，等待令牌时被中断
+    assert limiter.slots.acquire(blocking=False)
+
+
+@pytest.mark.parametrize("kwargs", [{"requests_per_second": 0}, {"max_concurrent": 0}])
+def test_rejects_invalid_settings(kwargs):
+    with pytest.raises(ValueError):
+        RateLimiter(**kwargs)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""TTS 重试策略：退避、Retry-After、永久性错误与熔断"""
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+import tts_retry
+from tts_retry import CircuitBreaker, RetryPolicy, TTSRequestError, parse_retry_after
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    delays = []
+    monkeypatch.setattr(tts_retry.time, "sleep", delays.append)
+    return delays
+
+
+@pytest.fixture
+def max_jitter(monkeypatch):
+    """让抖动取上限，便于断言退避时长"""
+    monkeypatch.setattr(tts_retry.random, "uniform", lambda low, high: high)
+
+
+def test_backoff_doubles_up_to_max_delay(max_jitter):
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+    assert [policy.backoff(attempt) for attempt in range(1, 6)] == [1, 2, 4, 5, 5]
+
+
+def test_backoff_is_jittered_within_bounds():
+    policy = RetryPolicy(base_delay=1, max_delay=30)
+    for _ in range(100):
+        assert 0 <= policy.backoff(3) <= 4
+
+
+def test_retry_after_overrides_shorter_backoff(max_jitter):
+    policy = RetryPolicy(max_attempts=3, base_delay=1, breaker=CircuitBreaker(failure_threshold=10))
+    assert policy.on_failure(TTSRequestError(429, retry_after=12), attempt=1) == 12
+    assert policy.on_failure(TTSRequestError(503, retry_after=0.5), attempt=2) == 2
+
+
+def test_throttling_without_retry_after_waits_at_least_throttle_delay(max_jitter):
+    policy = RetryPolicy(max_attempts=3, base_delay=0.1, breaker=CircuitBreaker(failure_threshold=10))
+    delay = policy.on_failure(TTSRequestError(400, code="Throttling.RateQuota"), attempt=1)
+    assert delay == tts_retry.TTS_THROTTLE_DELAY
+
+
+def test_permanent_error_is_not_retried():
+    policy = RetryPolicy(max_attempts=5)
+    assert policy.on_failure(TTSRequestError(400, code="InvalidParameter"), attempt=1) is None
+    assert policy.breaker.failures == 0
+
+
+def test_call_retries_then_succeeds(no_sleep):
+    outcomes = [TTSRequestError(500), ConnectionError("reset"), "ok"]
+
+    def flaky():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    retries = []
+    policy = RetryPolicy(max_attempts=3, base_delay=0.01)
+    assert policy.call(flaky, on_retry=lambda attempt, error, delay: retries.append(attempt)) == "ok"
+    assert retries == [1, 2]
+    assert len(no_sleep) == 2
+    assert policy.breaker.state == "closed" and policy.breaker.failures == 0
+
+
+def test_call_gives_up_after_max_attempts(no_sleep):
+    def broken():
+        raise TTSRequestError(503)
+
+    policy = RetryPolicy(max_attempts=3, base_delay=0.01, breaker=CircuitBreaker(failure_threshold=10))
+    with pytest.raises(TTSRequestError) as excinfo:
+        policy.call(broken)
+    assert excinfo.value.attempts == 3
+    assert len(no_sleep) == 2
+
+
+def test_breaker_opens_after_threshold_and_probes_after_cooldown(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(tts_retry.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=30)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] += 31
+    breaker.wait()  # 冷却结束，放行一个探测请求
+    assert breaker.state == "half_open" and breaker.probing
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    future = datetime.now(timezone.utc) + timedelta(seconds=60)
+    assert parse_retry_after(format_datetime(future, usegmt=True)) == pytest.approx(60, abs=2)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""音频精灵与二进制语音包"""
+
+import json
+import os
+import wave
+
+import pytest
+
+from audio_encode import find_wav_clips
+from voice_bank import SPRITE_DIR, VoiceBank, build_event_sprite, build_sprite, build_voice_bank
+from voice_verify import find_wav_files
+
+
+def write_wav(output_dir, rel_path, frames, rate=16000, channels=1, value=b"\x01\x00"):
+    path = os.path.join(output_dir, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(value * channels * frames)
+    return path
+
+
+def test_build_sprite_offsets(tmp_path):
+    output_dir = str(tmp_path)
+    write_wav(output_dir, "game_events/start.wav", 8000)  # 500 ms
+    write_wav(output_dir, "game_events/end.wav", 4000)  # 250 ms
+    sprite = build_sprite(output_dir, {"start": "game_events/start.wav", "missing": "game_events/none.wav",
+                                       "end": "game_events/end.wav"}, "sprites/events.wav", gap_ms=100)
+    assert sprite == {"src": "sprites/events.wav", "sprite": {"start": [0, 500], "end": [600, 250]}}
+    with wave.open(str(tmp_path / "sprites" / "events.wav"), 'rb') as wav:
+        assert wav.getnframes() == 8000 + 1600 + 4000 + 1600
+
+
+def test_build_sprite_parameter_mismatch_cleans_up(tmp_path):
+    output_dir = str(tmp_path)
+    write_wav(output_dir, "game_events/start.wav", 1600)
+    write_wav(output_dir, "game_events/end.wav", 1600, rate=24000)
+    with pytest.raises(ValueError):
+        build_sprite(output_dir, {"start": "game_events/start.wav", "end": "game_events/end.wav"},
+                     "sprites/events.wav")
+    assert os.listdir(tmp_path / "sprites") == []
+
+
+def test_build_sprite_without_clips_writes_nothing(tmp_path):
+    assert build_sprite(str(tmp_path), {"start": "game_events/none.wav"}, "sprites/events.wav") is None
+    assert not (tmp_path / "sprites").exists()
+
+
+def test_event_sprite_stays_out_of_the_clip_tree(tmp_path):
+    output_dir = str(tmp_path)
+    write_wav(output_dir, "game_events/event_game_start.wav", 1600)
+    write_wav(output_dir, "game_events/sprite.wav", 1600)  # 旧版本写在片段目录里的精灵
+    with open(tmp_path / "game_events" / "game_events_voices.json", 'w', encoding='utf-8') as f:
+        json.dump({"event_voices": {"game_start": "game_events/event_game_start.wav"}}, f)
+
+    sprite = build_event_sprite(output_dir)
+    assert sprite["src"] == f"{SPRITE_DIR}/game_events.wav"
+    assert (tmp_path / SPRITE_DIR / "game_events.wav").exists()
+    assert json.loads((tmp_path / SPRITE_DIR / "game_events.json").read_text(encoding='utf-8')) == sprite
+    assert not (tmp_path / "game_events" / "sprite.wav").exists()
+    # 校验和编码扫描语音目录时看不到精灵
+    assert find_wav_files(output_dir) == ["game_events/event_game_start.wav"]
+    assert find_wav_clips(output_dir, {}) == (["game_events/event_game_start.wav"], {})
+
+
+def test_voice_bank_round_trip(tmp_path):
+    output_dir = str(tmp_path)
+    attack = write_wav(output_dir, "characters/关羽/attack.wav", 800, value=b"\x02\x00")
+    write_wav(output_dir, "characters/张飞/attack.wav", 800, value=b"\x02\x00")  # 内容相同，共用一份数据
+    start = write_wav(output_dir, "game_events/start.wav", 400)
+    with open(tmp_path / "voice_database.json", 'w', encoding='utf-8') as f:
+        json.dump({
+            "character_voices": [
+                {"character_name": "关羽", "voices": {"attack": "characters/关羽/attack.wav"}},
+                {"character_name": "张飞", "voices": {"attack": "characters/张飞/attack.wav"}},
+            ],
+            "game_event_voices": {"event_voices": {"start": "game_events/start.wav"}},
+        }, f, ensure_ascii=False)
+
+    bank_path = build_voice_bank(output_dir)
+    with VoiceBank(bank_path) as bank:
+        assert sorted(bank.keys()) == ["characters/关羽/attack", "characters/张飞/attack", "game_events/start"]
+        assert bank.index["characters/关羽/attack"] == bank.index["characters/张飞/attack"]
+        with open(attack, 'rb') as f:
+            clip = bank.get("characters/关羽/attack")
+            assert clip == f.read()
+            clip.release()
+        with open(start, 'rb') as f:
+            clip = bank.get("game_events/start")
+            assert clip == f.read()
+            clip.release()
+        assert bank.get("missing") is None
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""语音清单对比与增量构建计划"""
+
+import os
+
+from voice_manifest import build_clip_catalog, diff_clip_catalog, dirty_groups, make_clip_entry, restrict_plan
+
+MODEL = "qwen-tts"
+
+
+def job(output_dir, rel_path, text, voice="Cherry"):
+    return (rel_path, text, voice, os.path.join(output_dir, *rel_path.split("/")))
+
+
+def touch(output_dir, rel_path):
+    path = os.path.join(output_dir, *rel_path.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b"RIFF")
+
+
+def test_build_clip_catalog_uses_relative_paths_and_skips_empty_text(tmp_path):
+    output_dir = str(tmp_path)
+    catalog = build_clip_catalog([
+        job(output_dir, "characters/道士/attack.wav", " 看招！ "),
+        job(output_dir, "characters/道士/idle.wav", ""),
+    ], MODEL, output_dir)
+    assert list(catalog) == ["characters/道士/attack.wav"]
+    assert catalog["characters/道士/attack.wav"]["entry"]["text"] == "看招！"
+
+
+def test_diff_clip_catalog(tmp_path):
+    output_dir = str(tmp_path)
+    for rel_path in ("characters/道士/attack.wav", "characters/道士/hurt.wav", "game_events/start.wav"):
+        touch(output_dir, rel_path)
+    old_clips = {
+        "characters/道士/attack.wav": make_clip_entry(MODEL, "Cherry", "看招！"),
+        "characters/道士/hurt.wav": make_clip_entry(MODEL, "Cherry", "啊！"),
+        "characters/道士/death.wav": make_clip_entry(MODEL, "Cherry", "我命休矣"),  # 记录还在，文件已丢失
+        "game_events/start.wav": make_clip_entry(MODEL, "Ethan", "游戏开始"),
+    }
+    catalog = build_clip_catalog([
+        job(output_dir, "characters/道士/attack.wav", "看招！"),
+        job(output_dir, "characters/道士/hurt.wav", "哎哟！"),
+        job(output_dir, "characters/道士/death.wav", "我命休矣"),
+        job(output_dir, "characters/僵尸/attack.wav", "吼！", voice="Dylan"),
+    ], MODEL, output_dir)
+
+    plan = diff_clip_catalog(old_clips, catalog, output_dir)
+    assert plan == {
+        "added": ["characters/道士/death.wav", "characters/僵尸/attack.wav"],
+        "changed": ["characters/道士/hurt.wav"],
+        "unchanged": ["characters/道士/attack.wav"],
+        "adopted": [],
+        "orphaned": ["game_events/start.wav"],
+    }
+    assert dirty_groups(plan) == ({"道士", "僵尸"}, True)
+
+
+def test_diff_clip_catalog_detects_voice_and_model_changes(tmp_path):
+    output_dir = str(tmp_path)
+    touch(output_dir, "characters/道士/attack.wav")
+    touch(output_dir, "characters/道士/hurt.wav")
+    old_clips = {
+        "characters/道士/attack.wav": make_clip_entry(MODEL, "Ethan", "看招！"),
+        "characters/道士/hurt.wav": make_clip_entry("qwen-tts-old", "Cherry", "啊！"),
+    }
+    catalog = build_clip_catalog([
+        job(output_dir, "characters/道士/attack.wav", "看招！"),
+        job(output_dir, "characters/道士/hurt.wav", "啊！"),
+    ], MODEL, output_dir)
+    assert diff_clip_catalog(old_clips, catalog, output_dir)["changed"] == [
+        "characters/道士/attack.wav", "characters/道士/hurt.wav"]
+
+
+def test_diff_clip_catalog_adopts_recorded_files_without_manifest(tmp_path):
+    """清单缺失时，缓存登记与当前台词一致的已有文件不计入合成次数"""
+    output_dir = str(tmp_path)
+    for rel_path in ("characters/道士/attack.wav", "characters/道士/hurt.wav", "characters/道士/death.wav"):
+        touch(output_dir, rel_path)
+    catalog = build_clip_catalog([
+        job(output_dir, "characters/道士/attack.wav", "看招！"),
+        job(output_dir, "characters/道士/hurt.wav", "哎哟！"),
+        job(output_dir, "characters/道士/death.wav", "我命休矣"),
+        job(output_dir, "characters/道士/skill.wav", "天地无极"),
+    ], MODEL, output_dir)
+    size = len(b"RIFF")
+    records = {
+        "characters/道士/attack.wav": (make_clip_entry(MODEL, "Cherry", "看招！")["fingerprint"], size),
+        "characters/道士/hurt.wav": (make_clip_entry(MODEL, "Cherry", "啊！")["fingerprint"], size),  # 旧台词
+        "characters/道士/death.wav": (make_clip_entry(MODEL, "Cherry", "我命休矣")["fingerprint"], size + 1),
+    }
+
+    def output_record(path):
+        return records.get(os.path.relpath(path, output_dir).replace("\\", "/"))
+
+    plan = diff_clip_catalog({}, catalog, output_dir, output_record)
+    assert plan["adopted"] == ["characters/道士/attack.wav"]
+    assert sorted(plan["added"]) == ["characters/道士/death.wav", "characters/道士/hurt.wav", "characters/道士/skill.wav"]
+    # 没有登记可查时一律按新增处理
+    assert len(diff_clip_catalog({}, catalog, output_dir)["added"]) == 4
+
+
+def test_restrict_plan_defers_other_changes():
+    plan = {"added": ["a.wav", "b.wav"], "changed": ["c.wav"], "unchanged": ["d.wav"], "adopted": ["f.wav"],
+            "orphaned": ["e.wav"]}
+    assert restrict_plan(plan, {"b.wav", "c.wav"}) == {
+        "added": ["b.wav"], "changed": ["c.wav"], "unchanged": ["d.wav"], "adopted": ["f.wav"], "orphaned": []}
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""WAV 文件头校验"""
+
+import struct
+import wave
+
+import pytest
+
+from voice_verify import WavFormatError, read_wav_info
+
+
+def chunk(chunk_id, body, declared=None):
+    data = struct.pack("<4sI", chunk_id, len(body) if declared is None else declared) + body
+    return data + b"\x00" * (len(body) & 1)
+
+
+def fmt_chunk(rate=16000, channels=1, bits=16, audio_format=1):
+    block_align = channels * bits // 8
+    return chunk(b"fmt ", struct.pack("<HHIIHH", audio_format, channels, rate, rate * block_align, block_align, bits))
+
+
+def riff(*chunks):
+    body = b"WAVE" + b"".join(chunks)
+    return struct.pack("<4sI", b"RIFF", len(body)) + body
+
+
+def write(tmp_path, content, name="clip.wav"):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def problem_of(path):
+    with pytest.raises(WavFormatError) as excinfo:
+        read_wav_info(path)
+    return excinfo.value.problem
+
+
+def test_reads_wave_module_output(tmp_path):
+    path = str(tmp_path / "clip.wav")
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(22050)
+        wav.writeframes(b"\x01\x00" * 2 * 22050)
+    info = read_wav_info(path)
+    assert (info["format"], info["channels"], info["rate"], info["bits"]) == (1, 2, 22050, 16)
+    assert info["data_offset"] == 44
+    assert info["data_bytes"] == 4 * 22050
+    assert info["duration"] == pytest.approx(1.0)
+
+
+def test_skips_odd_sized_chunks(tmp_path):
+    content = riff(fmt_chunk(), chunk(b"LIST", b"abc"), chunk(b"data", b"\x00\x01" * 8000))
+    info = read_wav_info(write(tmp_path, content))
+    assert info["data_offset"] == len(content) - 16000
+    assert info["duration"] == pytest.approx(0.5)
+
+
+def test_streaming_placeholder_size_uses_file_size(tmp_path):
+    content = riff(fmt_chunk(), chunk(b"data", b"\x00\x01" * 16000, declared=0xFFFFFFFF))
+    assert read_wav_info(write(tmp_path, content))["duration"] == pytest.approx(1.0)
+
+
+def test_empty_file(tmp_path):
+    assert problem_of(write(tmp_path, b"")) == "empty"
+
+
+def test_empty_data_chunk(tmp_path):
+    assert problem_of(write(tmp_path, riff(fmt_chunk(), chunk(b"data", b"")))) == "empty"
+
+
+def test_html_error_page(tmp_path):
+    path = write(tmp_path, b"<!DOCTYPE html><html><body>403 Forbidden</body></html>")
+    with pytest.raises(WavFormatError) as excinfo:
+        read_wav_info(path)
+    assert excinfo.value.problem == "not_wav"
+    assert "HTML" in str(excinfo.value)
+
+
+def test_json_error_response(tmp_path):
+    path = write(tmp_path, b'{"code": "Throttling", "message": "rate limited"}')
+    with pytest.raises(WavFormatError) as excinfo:
+        read_wav_info(path)
+    assert "JSON" in str(excinfo.value)
+
+
+def test_truncated_download(tmp_path):
+    content = riff(fmt_chunk(), chunk(b"data", b"\x00\x01" * 16000))
+    assert problem_of(write(tmp_path, content[:len(content) // 2])) == "truncated"
+
+
+def test_missing_data_chunk(tmp_path):
+    assert problem_of(write(tmp_path, riff(fmt_chunk()))) == "truncated"
+
+
+def test_data_before_fmt(tmp_path):
+    assert problem_of(write(tmp_path, riff(chunk(b"data", b"\x00\x01" * 100), fmt_chunk()))) == "not_wav"
+
+
+def test_unsupported_format(tmp_path):
+    assert problem_of(write(tmp_path, riff(fmt_chunk(audio_format=0x55), chunk(b"data", b"\x00" * 100)))) == "not_wav"
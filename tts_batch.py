@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多句合并合成
+同一音色的短台词用停顿标记拼成一次合成请求，返回的整段音频按静音检测切回逐句片段，
+并按台词长度校验每个片段的时长。停顿找不准或时长对不上时整批退回逐句合成。
+"""
+
+import array
+import os
+import wave
+
+TTS_BATCH_LINES = int(os.getenv("TTS_BATCH_LINES", "0"))  # 每批最多合并的台词数，0 或 1 表示不合并
+TTS_BATCH_MAX_CHARS = int(os.getenv("TTS_BATCH_MAX_CHARS", "120"))  # 每批合计字数上限
+TTS_BATCH_LINE_MAX_CHARS = int(os.getenv("TTS_BATCH_LINE_MAX_CHARS", "20"))  # 超过该长度的台词单独合成
+TTS_BATCH_PAUSE = os.getenv("TTS_BATCH_PAUSE", "……\n")  # 句间停顿标记
+
+WINDOW_MS = 10  # 能量检测窗口
+MIN_GAP_MS = 150  # 句间停顿的最短时长
+GAP_MARGIN = 1.3  # 选中的最短句间停顿至少比落选的最长停顿长这么多倍，否则视为切分不明确
+SILENCE_RATIO = 0.05  # 低于峰值能量的该比例视为静音
+SILENCE_FLOOR = 200  # 16 位 PCM 的绝对静音门限
+PAD_MS = 60  # 每个片段前后保留的静音
+CHARS_PER_SECOND = (1.5, 12.0)  # 合理语速范围（字/秒）
+SHARE_TOLERANCE = 2.0  # 片段时长与按字数分摊的时长之比允许的偏差倍数
+
+
+class BatchSplitError(ValueError):
+    """合并音频无法可靠地切回逐句片段"""
+
+
+def speech_chars(text):
+    """用于估算时长的字数：只计文字和数字，不计标点与空白"""
+    return sum(1 for ch in text if ch.isalnum())
+
+
+def plan_batches(jobs, max_lines=TTS_BATCH_LINES, max_chars=TTS_BATCH_MAX_CHARS,
+                 line_max_chars=TTS_BATCH_LINE_MAX_CHARS):
+    """把任务分为 (合并批次列表, 逐句任务列表)
+
+    只合并同一音色的短台词，每批不超过 max_lines 句、max_chars 字；凑不满两句的批次按逐句处理。
+    """
+    if max_lines < 2:
+        return [], list(jobs)
+    by_voice = {}
+    singles = []
+    for job in jobs:
+        text = job[1].strip()
+        if len(text) > line_max_chars or not speech_chars(text):
+            singles.append(job)
+        else:
+            by_voice.setdefault(job[2], []).append(job)
+
+    batches = []
+    for voice_jobs in by_voice.values():
+        batch, chars = [], 0
+        for job in voice_jobs:
+            length = len(job[1].strip())
+            if batch and (len(batch) >= max_lines or chars + length > max_chars):
+                batches.append(batch)
+                batch, chars = [], 0
+            batch.append(job)
+            chars += length
+        if batch:
+            batches.append(batch)
+
+    singles.extend(job for batch in batches if len(batch) == 1 for job in batch)
+    return [batch for batch in batches if len(batch) > 1], singles
+
+
+def batch_text(texts, pause=TTS_BATCH_PAUSE):
+    """用停顿标记拼接多句台词"""
+    return pause.join(text.strip() for text in texts)
+
+
+def _window_levels(samples, window):
+    return [sum(map(abs, samples[i:i + window])) / len(samples[i:i + window]) for i in range(0, len(samples), window)]
+
+
+def _silent_runs(levels, threshold):
+    """返回静音窗口区间列表 [(起始窗口, 结束窗口)]，结束为开区间"""
+    runs = []
+    start = None
+    for i, level in enumerate(levels):
+        if level < threshold:
+            if start is None:
+                start = i
+        elif start is not None:
+            runs.append((start, i))
+            start = None
+    if start is not None:
+        runs.append((start, len(levels)))
+    return runs
+
+
+def split_batch_audio(wav_path, texts):
+    """把合并合成的 WAV 切回逐句片段
+
+    返回 (wave 参数, [每句的 PCM 字节])。找到的句间停顿数与台词数对不上、最短的句间停顿
+    与句内停顿区分不开，或某句时长与字数明显不符时抛出 BatchSplitError。
+    """
+    with wave.open(wav_path, 'rb') as wav:
+        params = wav.getparams()
+        frames = wav.readframes(params.nframes)
+    if params.sampwidth != 2:
+        raise BatchSplitError(f"只支持 16 位 PCM，实际为 {params.sampwidth * 8} 位")
+
+    samples = array.array('h')
+    samples.frombytes(frames)
+    if array.array('h', [1]).tobytes() != b"\x01\x00":
+        samples.byteswap()  # WAV 为小端序
+    window = max(1, params.framerate * WINDOW_MS // 1000) * params.nchannels
+    levels = _window_levels(samples, window)
+    if not levels:
+        raise BatchSplitError("音频为空")
+    threshold = max(SILENCE_FLOOR, max(levels) * SILENCE_RATIO)
+    runs = _silent_runs(levels, threshold)
+
+    # 首尾的静音不是句间停顿
+    gaps = [run for run in runs if run[0] > 0 and run[1] < len(levels) and (run[1] - run[0]) * WINDOW_MS >= MIN_GAP_MS]
+    needed = len(texts) - 1
+    if len(gaps) < needed:
+        raise BatchSplitError(f"只找到 {len(gaps)} 处停顿，需要 {needed} 处")
+    ranked = sorted(gaps, key=lambda run: run[1] - run[0], reverse=True)
+    if len(ranked) > needed:
+        chosen_shortest = ranked[needed - 1][1] - ranked[needed - 1][0]
+        rejected_longest = ranked[needed][1] - ranked[needed][0]
+        if chosen_shortest < rejected_longest * GAP_MARGIN:
+            raise BatchSplitError(
+                f"句间停顿 ({chosen_shortest * WINDOW_MS} ms) 与句内停顿 ({rejected_longest * WINDOW_MS} ms) 区分不开"
+            )
+    cuts = sorted(ranked[:needed])
+
+    # 每句的有声区间（窗口下标）
+    voiced = []
+    start = runs[0][1] if runs and runs[0][0] == 0 else 0
+    for gap_start, gap_end in cuts:
+        voiced.append((start, gap_start))
+        start = gap_end
+    end = runs[-1][0] if runs and runs[-1][1] == len(levels) else len(levels)
+    voiced.append((start, end))
+
+    seconds = [(stop - begin) * WINDOW_MS / 1000 for begin, stop in voiced]
+    chars = [speech_chars(text) for text in texts]
+    seconds_per_char = sum(seconds) / sum(chars)
+    for text, duration, count in zip(texts, seconds, chars):
+        rate = count / duration if duration > 0 else float("inf")
+        if not CHARS_PER_SECOND[0] <= rate <= CHARS_PER_SECOND[1]:
+            raise BatchSplitError(f"「{text[:10]}」时长 {duration:.2f} 秒与 {count} 字不符")
+        share = duration / (count * seconds_per_char)
+        if not 1 / SHARE_TOLERANCE <= share <= SHARE_TOLERANCE:
+            raise BatchSplitError(f"「{text[:10]}」时长占比异常 ({share:.2f})")
+
+    pad = PAD_MS // WINDOW_MS
+    bytes_per_window = window * params.sampwidth
+    bounds = [0] + [(gap_start + gap_end) // 2 for gap_start, gap_end in cuts] + [len(levels)]
+    clips = []
+    for (begin, stop), low, high in zip(voiced, bounds, bounds[1:]):
+        begin = max(low, begin - pad)
+        stop = min(high, stop + pad)
+        clips.append(frames[begin * bytes_per_window:stop * bytes_per_window])
+    return params, clips
+
+
+def write_clip(output_path, params, pcm):
+    """以与合并音频相同的格式写出单句 WAV（先写临时文件再原子替换）"""
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = f"{output_path}.part"
+    with wave.open(tmp_path, 'wb') as wav:
+        wav.setnchannels(params.nchannels)
+        wav.setsampwidth(params.sampwidth)
+        wav.setframerate(params.framerate)
+        wav.writeframes(pcm)
+    os.replace(tmp_path, output_path)
+    return output_path
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音流水线离线基准测试
+在本地启动 DashScope qwen_tts 接口的替身服务和音频文件服务（延迟分布、错误率、文件大小均可配置），
+把 VoiceGenerator 指向它，统计每秒生成片段数、各阶段 (synthesize / download / write) 的
+p50/p95/p99 耗时和峰值内存，可对比顺序、线程池、asyncio 三种模式，不消耗真实接口配额。
+
+用法:
+    python tts_benchmark.py --modes sequential,threads,async --synth-latency 0.8 --error-rate 0.05
+    python tts_benchmark.py --output bench.json            # 保存结果
+    python tts_benchmark.py --baseline bench.json          # 与上次结果对比
+"""
+
+import argparse
+import asyncio
+import importlib
+import io
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import get_context
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，峰值内存记为 None
+    resource = None
+
+BENCH_MODES = ("sequential", "threads", "async")
+BENCH_STAGES = ("synthesize", "download", "write")
+TTS_ENDPOINT = "/api/v1/services/aigc/multimodal-generation/generation"
+SAMPLE_RATE = 24000
+
+
+def make_wav_payload(payload_bytes):
+    """生成约 payload_bytes 字节的 16 位单声道 WAV（440Hz 正弦波）"""
+    nframes = max(1, (payload_bytes - 44) // 2)
+    frames = bytearray()
+    for i in range(nframes):
+        sample = int(8000 * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE))
+        frames += sample.to_bytes(2, "little", signed=True)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+def sample_latency(median, sigma):
+    """按对数正态分布抽样延迟（秒），sigma 为 0 时固定为 median"""
+    if median <= 0:
+        return 0.0
+    if sigma <= 0:
+        return median
+    return random.lognormvariate(math.log(median), sigma)
+
+
+class FakeTTSServer:
+    """qwen_tts 接口 + 音频文件的本地替身服务"""
+
+    def __init__(self, synth_latency=0.8, download_latency=0.05, latency_sigma=0.4,
+                 error_rate=0.0, throttle_rate=0.0, payload_bytes=150000, bandwidth=0):
+        self.synth_latency = synth_latency
+        self.download_latency = download_latency
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.bandwidth = bandwidth  # 每个连接的字节/秒，0 为不限速
+        self.payload = make_wav_payload(payload_bytes)
+        self.stats = {"synth_requests": 0, "synth_errors": 0, "throttled": 0, "downloads": 0, "bytes_served": 0}
+        self.lock = threading.Lock()
+        self.httpd = None
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.stats[name] += amount
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, body, headers=None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path != TTS_ENDPOINT:
+                    self._send_json(404, {"code": "NotFound", "message": self.path})
+                    return
+                server._count("synth_requests")
+                time.sleep(sample_latency(server.synth_latency, server.latency_sigma))
+                request_id = uuid.uuid4().hex
+                roll = random.random()
+                if roll < server.throttle_rate:
+                    server._count("throttled")
+                    self._send_json(429, {"code": "Throttling.RateQuota", "message": "Requests rate limit exceeded",
+                                          "request_id": request_id}, {"Retry-After": "1"})
+                    return
+                if roll < server.throttle_rate + server.error_rate:
+                    server._count("synth_errors")
+                    self._send_json(500, {"code": "InternalError", "message": "benchmark injected error",
+                                          "request_id": request_id})
+                    return
+                host = self.headers.get("Host")
+                self._send_json(200, {
+                    "request_id": request_id,
+                    "output": {
+                        "finish_reason": "stop",
+                        "audio": {"id": request_id, "url": f"http://{host}/audio/{request_id}.wav",
+                                  "expires_at": int(time.time()) + 86400}
+                    },
+                    "usage": {"input_tokens": 10, "output_tokens": 100}
+                })
+
+            def do_GET(self):
+                if not self.path.startswith("/audio/"):
+                    self.send_error(404)
+                    return
+                server._count("downloads")
+                time.sleep(sample_latency(server.download_latency, server.latency_sigma))
+                payload = server.payload
+                self.send_response(200)
+                self.send_header("Content-Type", "audio/wav")
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("ETag", '"bench"')
+                self.end_headers()
+                chunk_size = 64 * 1024
+                for start in range(0, len(payload), chunk_size):
+                    chunk = payload[start:start + chunk_size]
+                    self.wfile.write(chunk)
+                    if server.bandwidth:
+                        time.sleep(len(chunk) / server.bandwidth)
+                server._count("bytes_served", len(payload))
+
+        return Handler
+
+    def start(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.httpd.server_port}/api/v1"
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+
+def percentile(values, pct):
+    """最近秩法百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize_samples(values):
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _write_extra_characters(count):
+    os.makedirs("character_cards", exist_ok=True)
+    types = ["武将", "谋士", "美女", "君主", "医者"]
+    factions = ["蜀", "魏", "吴", "群"]
+    for i in range(count):
+        card = {"name": f"测试角色{i + 1}", "title": f"第{i + 1}号", "faction": factions[i % 4], "type": types[i % 5]}
+        with open(os.path.join("character_cards", f"{card['name']}.json"), 'w', encoding='utf-8') as f:
+            json.dump(card, f, ensure_ascii=False)
+
+
+def run_mode(mode, config):
+    """在独立进程中跑一种模式，返回结果字典（独立进程保证峰值内存互不影响）"""
+    workdir = tempfile.mkdtemp(prefix="tts_bench_")
+    os.chdir(workdir)
+
+    import dashscope
+    from tts_cache import TTSCache
+    from tts_limiter import RateLimiter
+    from tts_metrics import VoiceMetrics
+
+    module = importlib.import_module(config["generator"])
+    module.TTS_API_KEY = "benchmark"  # 生成器在第一次合成时才导入 dashscope 并设置 API Key
+    dashscope.base_http_api_url = config["api_url"]
+    os.makedirs(module.CHARACTER_VOICES_DIR, exist_ok=True)
+    os.makedirs(module.GAME_VOICES_DIR, exist_ok=True)
+
+    workers = 1 if mode == "sequential" else config["workers"]
+    generator = module.VoiceGenerator(
+        workers=workers,
+        limiter=RateLimiter(requests_per_second=config["rps"], max_concurrent=max(workers, config["workers"])),
+        tts_cache=TTSCache(os.path.join(workdir, ".tts_cache")),
+        metrics=VoiceMetrics()  # 各阶段耗时直接取自生成器自身的 span，不写 JSON Lines 日志
+    )
+    with redirect_stdout(io.StringIO()):
+        generator.write_sample_characters("character_cards")
+    _write_extra_characters(config["extra_characters"])
+
+    started = time.perf_counter()
+    try:
+        with redirect_stdout(sys.stdout if config["verbose"] else io.StringIO()):
+            if mode == "async":
+                database = asyncio.run(generator.create_voice_database_async())
+            else:
+                database = generator.create_voice_database()
+        wall = time.perf_counter() - started
+    finally:
+        os.chdir(tempfile.gettempdir())
+        if not config["keep"]:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    clips = len(database.get("clips", {}))
+    samples = {
+        stage: generator.metrics.stages[stage].durations if stage in generator.metrics.stages else []
+        for stage in BENCH_STAGES
+    }
+    return {
+        "mode": mode,
+        "workers": workers,
+        "clips": clips,
+        "api_calls": len(samples["synthesize"]),
+        "failed": len(generator.failure_ledger),
+        "wall_seconds": wall,
+        "clips_per_sec": clips / wall if wall else None,
+        "stages": {stage: summarize_samples(values) for stage, values in samples.items()},
+        "peak_rss_mb": peak_rss_mb(),
+        "workdir": workdir if config["keep"] else None,
+    }
+
+
+def _ms(value):
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+
+def print_report(results, server_stats, baseline=None):
+    """打印各模式的对比表"""
+    print("\n📊 基准测试结果")
+    print(f"{'模式':<12}{'workers':>8}{'片段':>6}{'调用':>6}{'失败':>6}{'耗时(s)':>10}{'片段/秒':>10}{'峰值内存(MB)':>14}")
+    for result in results:
+        rss = "-" if result["peak_rss_mb"] is None else f"{result['peak_rss_mb']:.1f}"
+        print(f"{result['mode']:<12}{result['workers']:>8}{result['clips']:>6}{result['api_calls']:>6}"
+              f"{result['failed']:>6}{result['wall_seconds']:>10.2f}{result['clips_per_sec']:>10.2f}{rss:>14}")
+
+    print(f"\n{'模式':<12}{'阶段':<12}{'次数':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for result in results:
+        for stage in BENCH_STAGES:
+            info = result["stages"][stage]
+            print(f"{result['mode']:<12}{stage:<12}{info['count']:>6}{_ms(info['p50']):>10}"
+                  f"{_ms(info['p95']):>10}{_ms(info['p99']):>10}")
+
+    if len(results) > 1 and results[0]["clips_per_sec"]:
+        base = results[0]
+        for result in results[1:]:
+            print(f"⚡ {result['mode']} 相对 {base['mode']}: {result['clips_per_sec'] / base['clips_per_sec']:.2f}x")
+
+    if baseline:
+        previous = {result["mode"]: result for result in baseline.get("results", [])}
+        for result in results:
+            old = previous.get(result["mode"])
+            if old and old.get("clips_per_sec"):
+                change = (result["clips_per_sec"] - old["clips_per_sec"]) / old["clips_per_sec"] * 100
+                marker = "🔴" if change < -10 else "🟢"
+                print(f"{marker} {result['mode']} 与基线相比: {old['clips_per_sec']:.2f} → "
+                      f"{result['clips_per_sec']:.2f} 片段/秒 ({change:+.1f}%)")
+
+    print(f"\n🛰️ 替身服务: 合成请求 {server_stats['synth_requests']} 次, 注入错误 {server_stats['synth_errors']} 次, "
+          f"限流 {server_stats['throttled']} 次, 下载 {server_stats['downloads']} 次, "
+          f"{server_stats['bytes_served'] / 1024 / 1024:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="语音流水线离线基准测试")
+    parser.add_argument("--generator", default="voice_generator", choices=["voice_generator", "new_gen"])
+    parser.add_argument("--modes", default=",".join(BENCH_MODES), help="逗号分隔: sequential,threads,async")
+    parser.add_argument("--workers", type=int, default=8, help="threads/async 模式的并发数")
+    parser.add_argument("--rps", type=float, default=1000.0, help="限流器速率，默认足够大以测出流水线本身的吞吐")
+    parser.add_argument("--extra-characters", type=int, default=0, help="额外生成的测试角色数，用于放大数据量")
+    parser.add_argument("--synth-latency", type=float, default=0.8, help="合成接口延迟中位数（秒）")
+    parser.add_argument("--download-latency", type=float, default=0.05, help="音频下载首字节延迟中位数（秒）")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="对数正态分布的 sigma，0 为固定延迟")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="合成接口返回 500 的比例")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="合成接口返回 429 的比例")
+    parser.add_argument("--payload-bytes", type=int, default=150000, help="每个音频文件的字节数")
+    parser.add_argument("--bandwidth", type=float, default=0, help="每个下载连接的字节/秒，0 为不限速")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子，便于复现")
+    parser.add_argument("--output", help="把结果保存为 JSON")
+    parser.add_argument("--baseline", help="与之前保存的 JSON 结果对比")
+    parser.add_argument("--keep", action="store_true", help="保留每次运行的临时目录")
+    parser.add_argument("--verbose", action="store_true", help="显示生成器自身的输出")
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in BENCH_MODES]
+    if unknown:
+        parser.error(f"未知模式: {', '.join(unknown)}")
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    server = FakeTTSServer(
+        synth_latency=args.synth_latency, download_latency=args.download_latency,
+        latency_sigma=args.latency_sigma, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+        payload_bytes=args.payload_bytes, bandwidth=args.bandwidth
+    )
+    api_url = server.start()
+    print(f"🛰️ 替身服务已启动: {api_url}")
+
+    config = {
+        "generator": args.generator,
+        "api_url": api_url,
+        "workers": max(1, args.workers),
+        "rps": args.rps,
+        "extra_characters": args.extra_characters,
+        "keep": args.keep,
+        "verbose": args.verbose,
+    }
+    # 基准目录下的模块需要在子进程中可导入
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    results = []
+    try:
+        for mode in modes:
+            print(f"⏱️ 运行模式: {mode}")
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                results.append(pool.submit(run_mode, mode, config).result())
+    finally:
+        server.stop()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(results, server.stats, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"config": vars(args), "results": results, "server": server.stats}, f, ensure_ascii=False, indent=2)
+        print(f"💾 结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TTS 持久化缓存
+按 (模型, 音色, 规范化文本) 的哈希寻址，SQLite 做索引，按字节预算做 LRU 淘汰。
+voices/ 与 voices_new/ 等多个输出目录共用同一份缓存，相同台词只付费合成一次。
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from voice_verify import WavFormatError, read_wav_info
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", ".tts_cache")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+def normalize_text(text):
+    """规范化台词文本：全角半角统一、去掉首尾及多余空白"""
+    text = unicodedata.normalize("NFKC", text or "")
+    return " ".join(text.split())
+
+
+def make_cache_key(model, voice, text):
+    """计算缓存键"""
+    payload = "\x1f".join([model, voice, normalize_text(text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """内容寻址的 TTS 音频缓存"""
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                voice TEXT NOT NULL,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access);
+            CREATE TABLE IF NOT EXISTS outputs (
+                path TEXT PRIMARY KEY,
+                key TEXT NOT NULL,
+                size INTEGER NOT NULL
+            );
+        """)
+        self.db.commit()
+
+    def _object_path(self, key):
+        return os.path.join(self.objects_dir, key[:2], f"{key}.wav")
+
+    def get(self, model, voice, text):
+        """查询缓存，命中时返回缓存中的音频路径"""
+        key = make_cache_key(model, voice, text)
+        path = self._object_path(key)
+        with self.lock:
+            row = self.db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row and os.path.exists(path) and os.path.getsize(path) == row[0]:
+                self.db.execute(
+                    "UPDATE entries SET last_access = ?, hits = hits + 1 WHERE key = ?",
+                    (time.time(), key)
+                )
+                self.db.commit()
+                self.hits += 1
+                return path
+            if row:
+                # 索引与文件不一致，丢弃这条记录
+                self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.db.commit()
+            self.misses += 1
+            return None
+
+    def put(self, model, voice, text, source_path):
+        """把已生成的音频文件放入缓存，返回缓存路径"""
+        key = make_cache_key(model, voice, text)
+        path = self._object_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries (key, model, voice, text, size, created_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE((SELECT hits FROM entries WHERE key = ?), 0))",
+                (key, model, voice, normalize_text(text), size, now, now, key)
+            )
+            self.db.commit()
+            self._evict()
+        return path
+
+    def _evict(self):
+        """超出字节预算时按最近访问时间淘汰（调用方持有锁）"""
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.db.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._object_path(key))
+            except FileNotFoundError:
+                pass
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+        self.db.commit()
+
+    def materialize(self, cached_path, output_path):
+        """把缓存音频落到输出路径，优先硬链接，跨文件系统时复制"""
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.link(cached_path, tmp_path)
+        except OSError:
+            shutil.copyfile(cached_path, tmp_path)
+        os.replace(tmp_path, output_path)
+        return output_path
+
+    def record_output(self, output_path, model, voice, text):
+        """记录输出文件由哪条台词生成，用于判断文本是否被修改"""
+        key = make_cache_key(model, voice, text)
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO outputs (path, key, size) VALUES (?, ?, ?)",
+                (os.path.abspath(output_path), key, os.path.getsize(output_path))
+            )
+            self.db.commit()
+
+    def is_current(self, output_path, model, voice, text, fingerprint=None):
+        """判断已存在的输出文件是否对应当前台词
+
+        没有登记的旧文件无法证明由哪条台词生成，只有清单（voice_database.json 的 clips）中记录的
+        fingerprint 与当前台词一致、且文件头是完整的 WAV 时才收录进缓存；否则返回 False 重新合成，
+        以免旧台词或旧音色的音频以当前台词的键进入缓存、再被其他输出和 /tts 复用。
+        台词或音色变更、文件大小不符时同样返回 False。
+        """
+        if not os.path.exists(output_path):
+            return False
+        key = make_cache_key(model, voice, text)
+        with self.lock:
+            row = self.db.execute(
+                "SELECT key, size FROM outputs WHERE path = ?", (os.path.abspath(output_path),)
+            ).fetchone()
+        if row is None:
+            if fingerprint != key:
+                return False
+            try:
+                read_wav_info(output_path)
+            except (WavFormatError, OSError):
+                return False
+            self.put(model, voice, text, output_path)
+            self.record_output(output_path, model, voice, text)
+            return True
+        return row[0] == key and row[1] == os.path.getsize(output_path)
+
+    def output_record(self, output_path):
+        """输出文件登记时的 (指纹, 字节数)，没有记录时返回 None"""
+        with self.lock:
+            return self.db.execute(
+                "SELECT key, size FROM outputs WHERE path = ?", (os.path.abspath(output_path),)
+            ).fetchone()
+
+    def forget_output(self, output_path):
+        """删除输出文件的登记记录"""
+        with self.lock:
+            self.db.execute("DELETE FROM outputs WHERE path = ?", (os.path.abspath(output_path),))
+            self.db.commit()
+
+    def discard(self, model, voice, text):
+        """丢弃一条缓存（缓存的音频本身可能就是坏的），下次需要时重新合成"""
+        key = make_cache_key(model, voice, text)
+        with self.lock:
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.db.commit()
+        try:
+            os.remove(self._object_path(key))
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        """返回缓存统计信息"""
+        with self.lock:
+            entries, total = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes
+        }
+
+    def close(self):
+        with self.lock:
+            self.db.close()
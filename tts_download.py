@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音频下载工具
+共享 keep-alive 连接池，分块流式写入临时文件，fsync 后原子重命名，
+连接中断时通过 HTTP Range 断点续传。
+requests 在第一次下载时才导入，导入本模块不会拖慢离线命令的启动。
+"""
+
+import json
+import os
+import threading
+
+from tts_limiter import TTS_WORKERS
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_TIMEOUT = (5, 30)  # (连接超时, 读取超时)
+DOWNLOAD_MAX_RESUMES = 3
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """获取进程内共享的 requests 会话（连接池大小与合成线程数匹配）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(10, TTS_WORKERS * 2))
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _fsync_dir(path):
+    """确保重命名操作落盘（Windows 不支持对目录 fsync，直接跳过）"""
+    if os.name != "posix":
+        return
+    fd = os.open(path or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _load_part_meta(meta_path, url):
+    """读取未完成下载的元数据，仅当 URL 一致时才允许续传"""
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("url") == url else None
+
+
+def _range_total(content_range):
+    """从 416 响应的 Content-Range（bytes */N）取出资源总长度，无法解析时返回 None"""
+    unit, _, spec = (content_range or "").partition(" ")
+    if unit.strip().lower() != "bytes" or not spec.startswith("*/"):
+        return None
+    try:
+        return int(spec[2:])
+    except ValueError:
+        return None
+
+
+def _discard_part(part_path, meta_path):
+    for path in (part_path, meta_path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def download_file(url, output_path, session=None, chunk_size=DOWNLOAD_CHUNK_SIZE,
+                  timeout=DOWNLOAD_TIMEOUT, max_resumes=DOWNLOAD_MAX_RESUMES):
+    """流式下载 url 到 output_path，返回写入的字节数
+
+    数据先写入 output_path + ".part"，完整后 fsync 并原子替换目标文件，
+    中途崩溃不会留下半截的 .wav。失败时抛出 requests 异常。
+    """
+    import requests
+
+    session = session or get_session()
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    part_path = f"{output_path}.part"
+    meta_path = f"{part_path}.json"
+
+    meta = _load_part_meta(meta_path, url)
+    if meta is None and os.path.exists(part_path):
+        # 旧的残留文件来自别的 URL，不能拼接
+        os.remove(part_path)
+    etag = meta.get("etag") if meta else None
+
+    resumes = 0
+    while True:
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            if etag:
+                headers["If-Range"] = etag
+
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 416 and offset:
+                    if _range_total(response.headers.get("Content-Range")) == offset:
+                        break  # .part 已是完整文件
+                    # .part 比资源还大，或资源已变化（新 ETag 使 If-Range 失效）：丢弃后从头下载
+                    print(f"♻️ 断点续传文件与服务端不符，重新下载: {os.path.basename(output_path)}")
+                    _discard_part(part_path, meta_path)
+                    etag = None
+                    continue
+                response.raise_for_status()
+
+                if response.status_code != 206:
+                    # 服务端不支持 Range 或资源已变化，从头开始
+                    offset = 0
+                etag = response.headers.get("ETag") or etag
+                with open(meta_path, 'w', encoding='utf-8') as f:
+                    json.dump({"url": url, "etag": etag}, f)
+
+                expected = response.headers.get("Content-Length")
+                expected = offset + int(expected) if expected is not None else None
+
+                with open(part_path, 'ab' if offset else 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            written = os.path.getsize(part_path)
+            if expected is not None and written < expected:
+                raise requests.exceptions.ChunkedEncodingError(
+                    f"下载不完整: {written}/{expected} 字节"
+                )
+            break
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.ReadTimeout):
+            resumes += 1
+            if resumes > max_resumes:
+                raise
+            print(f"🔁 下载中断，断点续传 (第 {resumes}/{max_resumes} 次): {os.path.basename(output_path)}")
+
+    os.replace(part_path, output_path)
+    _fsync_dir(output_dir)
+    try:
+        os.remove(meta_path)
+    except FileNotFoundError:
+        pass
+    return os.path.getsize(output_path)
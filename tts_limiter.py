@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TTS 调用限流器
+令牌桶（每秒请求数）+ 并发上限，替代原来散落在各处的 time.sleep
+"""
+
+import os
+import threading
+import time
+
+# 默认配额，可通过环境变量按账号实际配额调整
+TTS_REQUESTS_PER_SECOND = float(os.getenv("TTS_REQUESTS_PER_SECOND", "2"))
+TTS_MAX_CONCURRENT = int(os.getenv("TTS_MAX_CONCURRENT", "4"))
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "4"))
+
+
+class RateLimiter:
+    """令牌桶限流器，同时限制每秒请求数与同时在途的请求数"""
+
+    def __init__(self, requests_per_second=TTS_REQUESTS_PER_SECOND,
+                 max_concurrent=TTS_MAX_CONCURRENT, burst=None):
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second 必须大于 0")
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent 必须至少为 1")
+
+        self.rate = float(requests_per_second)
+        # 桶容量默认为 1 秒的配额，至少能放下一个令牌
+        self.capacity = float(burst) if burst else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        """阻塞直到拿到并发槽位和一个令牌"""
+        self.slots.acquire()
+        try:
+            while True:
+                with self.lock:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                time.sleep(wait)
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def release(self):
+        """归还并发槽位"""
+        self.slots.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
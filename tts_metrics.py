@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音流水线的结构化指标
+合成 / 下载 / 写入等阶段以 span 记录耗时、字节数、重试次数和缓存命中情况，
+逐行写入 JSON Lines 日志，可选导出 Prometheus 文本格式，运行结束时打印汇总表。
+每个 span 只是一次计时加一行追加写入，生产环境可以常开。
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+TTS_METRICS_LOG = os.getenv("TTS_METRICS_LOG", "metrics.jsonl")  # 相对于输出目录，设为空字符串可关闭
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+class StageStats:
+    """单个阶段的聚合统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.durations = []
+        self.buckets = [0] * len(DURATION_BUCKETS)
+
+    def add(self, duration, nbytes, failed):
+        self.count += 1
+        self.errors += 1 if failed else 0
+        self.seconds += duration
+        self.bytes += nbytes
+        self.durations.append(duration)
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if duration <= bound:
+                self.buckets[i] += 1
+
+
+class VoiceMetrics:
+    """线程安全的阶段计时与计数器"""
+
+    def __init__(self, log_path=None):
+        self.run_id = os.urandom(6).hex()
+        self.started_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.counters = {}
+        self.log_path = log_path
+        self.log_file = None  # 第一条记录写入时才打开，只读的命令不会留下空日志
+
+    def _emit(self, record):
+        if self.log_path:
+            line = json.dumps(record, ensure_ascii=False)
+            with self.lock:
+                if self.log_file is None:
+                    os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                    self.log_file = open(self.log_path, 'a', encoding='utf-8', buffering=1)
+                self.log_file.write(line + "\n")
+
+    @contextmanager
+    def span(self, stage, **fields):
+        """记录一个阶段；with 块内可往返回的字典里补充 bytes 等字段"""
+        record = dict(fields)
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield record
+        except BaseException as e:
+            failed = True
+            record["error"] = str(e)
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            failed = failed or record.get("status") == "failed"
+            with self.lock:
+                self.stages.setdefault(stage, StageStats()).add(duration, int(record.get("bytes") or 0), failed)
+            entry = {
+                "ts": datetime.now().isoformat(),
+                "run_id": self.run_id,
+                "stage": stage,
+                "duration_ms": round(duration * 1000, 2),
+                "status": "failed" if failed else record.get("status", "ok")
+            }
+            entry.update((key, value) for key, value in record.items() if key != "status")
+            self._emit(entry)
+
+    def count(self, name, amount=1):
+        """累加计数器，如 cache_hit / cache_miss / cache_current / retries / failed"""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def to_prometheus(self):
+        """导出为 Prometheus 文本格式"""
+        lines = [
+            "# HELP tts_stage_duration_seconds 语音流水线各阶段耗时",
+            "# TYPE tts_stage_duration_seconds histogram",
+        ]
+        with self.lock:
+            stages = sorted(self.stages.items())
+            counters = sorted(self.counters.items())
+        for stage, stats in stages:
+            for bound, bucket in zip(DURATION_BUCKETS, stats.buckets):
+                lines.append(f'tts_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {bucket}')
+            lines.append(f'tts_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {stats.count}')
+            lines.append(f'tts_stage_duration_seconds_sum{{stage="{stage}"}} {stats.seconds:.6f}')
+            lines.append(f'tts_stage_duration_seconds_count{{stage="{stage}"}} {stats.count}')
+        lines += ["# HELP tts_stage_errors_total 各阶段失败次数", "# TYPE tts_stage_errors_total counter"]
+        lines += [f'tts_stage_errors_total{{stage="{stage}"}} {stats.errors}' for stage, stats in stages]
+        lines += ["# HELP tts_stage_bytes_total 各阶段处理的字节数", "# TYPE tts_stage_bytes_total counter"]
+        lines += [f'tts_stage_bytes_total{{stage="{stage}"}} {stats.bytes}' for stage, stats in stages]
+        lines += ["# HELP tts_events_total 缓存命中、重试、失败等事件计数", "# TYPE tts_events_total counter"]
+        lines += [f'tts_events_total{{event="{name}"}} {value}' for name, value in counters]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """原子写出 Prometheus 文本文件（可供 node_exporter textfile collector 采集）"""
+        tmp_path = f"{path}.part"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+        print(f"📈 Prometheus 指标已写出: {path}")
+
+    def print_summary(self):
+        """打印本次运行的阶段汇总表"""
+        with self.lock:
+            stages = sorted(self.stages.items())
+            counters = dict(self.counters)
+        if not stages and not counters:
+            return
+        print(f"\n📈 阶段耗时汇总 (run {self.run_id}, 总耗时 {time.monotonic() - self.started_at:.1f} 秒)")
+        print(f"   {'阶段':<12}{'次数':>6}{'失败':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'总耗时(s)':>11}{'MB':>8}")
+        for stage, stats in stages:
+            p50 = _percentile(stats.durations, 50)
+            p95 = _percentile(stats.durations, 95)
+            print(f"   {stage:<12}{stats.count:>6}{stats.errors:>6}{p50 * 1000:>10.0f}{p95 * 1000:>10.0f}"
+                  f"{stats.seconds:>11.1f}{stats.bytes / 1024 / 1024:>8.2f}")
+        if counters:
+            print("   " + ", ".join(f"{name}: {value}" for name, value in sorted(counters.items())))
+
+    def close(self):
+        if self.log_file:
+            self.log_file.close()
+            self.log_file = None
+
+
+def create_metrics(output_dir, log_name=TTS_METRICS_LOG):
+    """按配置为输出目录创建指标记录器"""
+    return VoiceMetrics(os.path.join(output_dir, log_name) if log_name else None)
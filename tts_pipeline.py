@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+两级 asyncio 语音流水线
+合成阶段与下载阶段各自一个队列、各自的并发上限，下载队列有界形成背压，
+已合成片段的下载与仍在进行的合成请求重叠执行。
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+
+class VoicePipeline:
+    """合成 → 下载 两级流水线
+
+    generator 需提供 fetch_cached_voice / request_audio_url / download_voice / save_generated_voice /
+    record_failure 以及 retry_policy、metrics，即 voice_generator.VoiceGenerator 和 new_gen.VoiceGenerator。
+    """
+
+    def __init__(self, generator, synth_concurrency=4, download_concurrency=8, queue_size=None):
+        self.generator = generator
+        self.synth_concurrency = max(1, int(synth_concurrency))
+        self.download_concurrency = max(1, int(download_concurrency))
+        # 下载队列满时合成阶段会等待，避免拿到的音频地址堆积过期
+        self.queue_size = queue_size or self.download_concurrency * 2
+        self.policy = generator.retry_policy
+
+    async def run(self, jobs):
+        """执行 (任务键, 文本, 音色, 输出路径) 任务列表，返回 {任务键: 输出路径}"""
+        if not jobs:
+            return {}
+
+        self.loop = asyncio.get_running_loop()
+        self.executor = ThreadPoolExecutor(max_workers=self.synth_concurrency + self.download_concurrency)
+        self.synth_queue = asyncio.Queue()
+        self.download_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.results = {}
+        self.failed = 0
+        self.remaining = len(jobs)
+        self.done = asyncio.Event()
+
+        for job in jobs:
+            self.synth_queue.put_nowait((job, 1))
+
+        print(f"⚡ 流水线合成 {len(jobs)} 条语音 "
+              f"(合成并发: {self.synth_concurrency}, 下载并发: {self.download_concurrency})")
+        started_at = time.monotonic()
+
+        workers = [asyncio.create_task(self._synth_worker()) for _ in range(self.synth_concurrency)]
+        workers += [asyncio.create_task(self._download_worker()) for _ in range(self.download_concurrency)]
+        try:
+            await self.done.wait()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.executor.shutdown(wait=True)
+
+        print(f"⏱️ 流水线完成: 成功 {len(self.results)} 条, 失败 {self.failed} 条, "
+              f"耗时 {time.monotonic() - started_at:.1f} 秒")
+        return self.results
+
+    def _in_thread(self, func, *args):
+        return self.loop.run_in_executor(self.executor, func, *args)
+
+    def _finish(self, job_key, output_path):
+        if output_path:
+            self.results[job_key] = output_path
+            self.generator.mark_done(job_key)
+        else:
+            self.failed += 1
+        self.remaining -= 1
+        if self.remaining == 0:
+            self.done.set()
+
+    def _retry_or_fail(self, job, attempt, error):
+        delay = self.policy.on_failure(error, attempt)
+        if delay is None:
+            job_key, text, voice_type, output_path = job
+            self.generator.record_failure(text, voice_type, output_path, error, attempt)
+            self._finish(job_key, None)
+            return
+        self.generator.metrics.count("retries")
+        # 退避期间不占用合成 worker
+        self.loop.call_later(delay, self.synth_queue.put_nowait, (job, attempt + 1))
+
+    async def _synth_worker(self):
+        while True:
+            job, attempt = await self.synth_queue.get()
+            job_key, text, voice_type, output_path = job
+            try:
+                if await self._in_thread(self.generator.fetch_cached_voice, text, voice_type, output_path):
+                    self._finish(job_key, output_path)
+                    continue
+                # 熔断期间在线程中阻塞等待，不占用事件循环
+                await self._in_thread(self.policy.before_attempt)
+                audio_url = await self._in_thread(self.generator.request_audio_url, text, voice_type)
+            except Exception as e:
+                print(f"❌ 语音生成出错: {str(e)}")
+                self._retry_or_fail(job, attempt, e)
+                continue
+
+            await self.download_queue.put((job, attempt, audio_url))
+
+    async def _download_worker(self):
+        while True:
+            job, attempt, audio_url = await self.download_queue.get()
+            job_key, text, voice_type, output_path = job
+            try:
+                await self._in_thread(self.generator.download_voice, audio_url, output_path)
+                await self._in_thread(self.generator.save_generated_voice, text, voice_type, output_path)
+            except Exception as e:
+                print(f"❌ 语音下载出错 {os.path.basename(output_path)}: {str(e)}")
+                self._retry_or_fail(job, attempt, e)
+                continue
+            self.policy.on_success()
+            self._finish(job_key, output_path)
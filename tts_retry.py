@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TTS 调用重试策略
+带抖动的指数退避、遵守 Retry-After / 限流响应、永久性 4xx 错误不重试，
+熔断器在服务商持续异常时暂停整个线程池，最终失败的片段写入失败清单供下次单独重放。
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+TTS_MAX_ATTEMPTS = int(os.getenv("TTS_MAX_ATTEMPTS", "3"))
+TTS_RETRY_BASE_DELAY = float(os.getenv("TTS_RETRY_BASE_DELAY", "1"))
+TTS_RETRY_MAX_DELAY = float(os.getenv("TTS_RETRY_MAX_DELAY", "30"))
+TTS_THROTTLE_DELAY = float(os.getenv("TTS_THROTTLE_DELAY", "5"))  # 限流响应未给出 Retry-After 时的最短等待
+TTS_BREAKER_THRESHOLD = int(os.getenv("TTS_BREAKER_THRESHOLD", "5"))
+TTS_BREAKER_COOLDOWN = float(os.getenv("TTS_BREAKER_COOLDOWN", "30"))
+
+FAILURE_LEDGER_NAME = "failed_clips.json"
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 头（秒数或 HTTP 日期），返回等待秒数，无法解析时返回 None"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime  # 只有 HTTP 日期格式才需要
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TTSRequestError(Exception):
+    """TTS 接口返回的非 200 响应"""
+
+    def __init__(self, status_code, code=None, message=None, retry_after=None):
+        super().__init__(f"状态码: {status_code}, 错误码: {code}, 错误信息: {message}")
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_response(cls, response):
+        """从 dashscope 响应构造异常"""
+        headers = {str(name).lower(): value for name, value in (getattr(response, "headers", None) or {}).items()}
+        return cls(
+            response.status_code,
+            code=getattr(response, "code", None),
+            message=getattr(response, "message", None),
+            retry_after=parse_retry_after(headers.get("retry-after"))
+        )
+
+    @property
+    def throttled(self):
+        return self.status_code == 429 or str(self.code or "").startswith("Throttling")
+
+    @property
+    def permanent(self):
+        """4xx（限流除外）说明请求本身有问题，例如不支持的音色，重试也不会成功"""
+        return 400 <= int(self.status_code or 0) < 500 and not self.throttled
+
+
+def is_permanent_error(error):
+    return isinstance(error, TTSRequestError) and error.permanent
+
+
+def retry_after_of(error):
+    """从异常中取出服务端要求的等待时间"""
+    if isinstance(error, TTSRequestError):
+        if error.retry_after is not None:
+            return error.retry_after
+        return TTS_THROTTLE_DELAY if error.throttled else None
+    response = getattr(error, "response", None)  # requests.HTTPError 等携带响应的异常
+    if response is not None and getattr(response, "headers", None) is not None:
+        return parse_retry_after(response.headers.get("Retry-After"))
+    return None
+
+
+class CircuitBreaker:
+    """熔断器
+
+    连续 failure_threshold 次临时性失败后断开，cooldown 秒内所有调用方阻塞等待；
+    冷却结束后只放行一个探测请求，成功则恢复，失败则重新断开。
+    """
+
+    def __init__(self, failure_threshold=TTS_BREAKER_THRESHOLD, cooldown=TTS_BREAKER_COOLDOWN):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.cooldown = float(cooldown)
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.condition = threading.Condition()
+
+    def wait(self):
+        """断开期间阻塞，直到可以发起请求"""
+        with self.condition:
+            while True:
+                if self.state == "closed":
+                    return
+                if self.state == "open":
+                    remaining = self.opened_at + self.cooldown - time.monotonic()
+                    if remaining > 0:
+                        self.condition.wait(remaining)
+                        continue
+                    self.state = "half_open"
+                    print("🟡 熔断冷却结束，发送探测请求")
+                if not self.probing:
+                    self.probing = True
+                    return
+                self.condition.wait()
+
+    def record_success(self):
+        with self.condition:
+            if self.state != "closed":
+                print("🟢 服务恢复，熔断器闭合")
+            self.state = "closed"
+            self.failures = 0
+            self.probing = False
+            self.condition.notify_all()
+
+    def record_failure(self):
+        with self.condition:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"🔌 连续失败 {self.failures} 次，熔断 {self.cooldown:.0f} 秒，暂停所有合成请求")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self.probing = False
+            self.condition.notify_all()
+
+    def release_probe(self):
+        """探测请求以永久性错误结束时归还探测名额，不改变熔断状态"""
+        with self.condition:
+            self.probing = False
+            self.condition.notify_all()
+
+
+class RetryPolicy:
+    """重试策略：决定一次失败之后是否重试、等待多久，并维护共享的熔断器"""
+
+    def __init__(self, max_attempts=TTS_MAX_ATTEMPTS, base_delay=TTS_RETRY_BASE_DELAY,
+                 max_delay=TTS_RETRY_MAX_DELAY, breaker=None):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self.breaker = breaker or CircuitBreaker()
+
+    def backoff(self, attempt):
+        """第 attempt 次失败后的等待时间（full jitter 指数退避）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def before_attempt(self):
+        self.breaker.wait()
+
+    def on_success(self):
+        self.breaker.record_success()
+
+    def on_failure(self, error, attempt):
+        """登记一次失败，返回重试前的等待秒数；不应再重试时返回 None"""
+        if is_permanent_error(error):
+            self.breaker.release_probe()
+            return None
+        self.breaker.record_failure()
+        if attempt >= self.max_attempts:
+            return None
+        retry_after = retry_after_of(error)
+        if retry_after is not None:
+            return max(retry_after, self.backoff(attempt))
+        return self.backoff(attempt)
+
+    def call(self, func, *args, on_retry=None):
+        """按策略执行 func，最终失败时抛出最后一次的异常，异常带有 attempts 属性
+
+        on_retry(attempt, error, delay) 在每次决定重试时调用，用于记录重试次数。
+        """
+        attempt = 1
+        while True:
+            self.before_attempt()
+            try:
+                result = func(*args)
+            except Exception as e:
+                delay = self.on_failure(e, attempt)
+                if delay is None:
+                    e.attempts = attempt
+                    raise
+                reason = "永久性错误" if is_permanent_error(e) else str(e)
+                print(f"🔁 第 {attempt}/{self.max_attempts} 次失败 ({reason})，{delay:.1f} 秒后重试")
+                if on_retry:
+                    on_retry(attempt, e, delay)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.on_success()
+            return result
+
+
+class FailureLedger:
+    """持久化的失败清单 {相对路径: 失败记录}，下次运行可只重放这些片段"""
+
+    def __init__(self, output_dir, name=FAILURE_LEDGER_NAME):
+        self.path = os.path.join(output_dir, name)
+        self.lock = threading.Lock()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _save(self):
+        if not self.entries:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.part"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(sorted(self.entries.items())), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def record(self, rel_path, text, voice, model, error, attempts):
+        """记录最终失败的片段"""
+        with self.lock:
+            self.entries[rel_path] = {
+                "text": text.strip(),
+                "voice": voice,
+                "model": model,
+                "error": str(error),
+                "status_code": getattr(error, "status_code", None),
+                "permanent": is_permanent_error(error),
+                "attempts": attempts,
+                "failed_at": datetime.now().isoformat()
+            }
+            self._save()
+
+    def resolve(self, rel_path):
+        """片段已成功生成，从清单中移除"""
+        with self.lock:
+            if self.entries.pop(rel_path, None) is not None:
+                self._save()
+
+    def paths(self):
+        with self.lock:
+            return set(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
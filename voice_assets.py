@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音静态资源
+为 voices/ 下的每个音频文件生成带内容哈希的 URL（characters/关羽/defend.3f2a9c1b04d5.wav），
+并把 voice_database.json、voices.json 中的相对路径改写成这些 URL 作为对外提供的副本。
+哈希只取决于文件字节，重新部署时只有字节真正变化的片段换 URL，其余片段的浏览器缓存继续有效。
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+
+ASSET_HASH_CHARS = 12  # URL 中内容哈希的长度
+ASSET_RESCAN_SECONDS = float(os.getenv("ASSET_RESCAN_SECONDS", "10"))  # 配置文件未变时重新检查片段的间隔
+
+_HASHED_NAME = re.compile(r"^(?P<stem>.+)\.(?P<digest>[0-9a-f]{%d})(?P<ext>\.[^./]+)$" % ASSET_HASH_CHARS)
+
+_digests = {}  # (路径, mtime_ns, 大小) → sha256
+_digests_lock = threading.Lock()
+
+
+def file_digest(path):
+    """文件内容的 sha256，按 (mtime, 大小) 记忆，文件未变时只需一次 stat"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _digests_lock:
+        digest = _digests.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        with _digests_lock:
+            _digests[key] = digest
+    return digest
+
+
+def hashed_name(rel_path, digest):
+    """characters/关羽/defend.wav → characters/关羽/defend.<哈希>.wav"""
+    stem, ext = os.path.splitext(rel_path)
+    return f"{stem}.{digest[:ASSET_HASH_CHARS]}{ext}"
+
+
+def split_hashed_name(rel_path):
+    """带哈希的路径拆成 (原始相对路径, 哈希)，不带哈希时哈希为 None"""
+    directory, name = os.path.split(rel_path)
+    match = _HASHED_NAME.match(name)
+    if not match:
+        return rel_path, None
+    return os.path.join(directory, match["stem"] + match["ext"]).replace("\\", "/"), match["digest"]
+
+
+class VoiceAssets:
+    """voices/ 目录的内容寻址视图，供 app.py 对外提供"""
+
+    def __init__(self, output_dir, url_prefix="/voices/"):
+        self.output_dir = output_dir
+        self.url_prefix = url_prefix
+        self.lock = threading.Lock()
+        self.manifests = {}  # 相对路径 → {"key", "checked_at", "body", "gzip", "etag", "urls"}
+
+    def resolve(self, rel_path):
+        """把相对路径解析为目录内的真实文件路径，越出目录或文件不存在时返回 None"""
+        from werkzeug.security import safe_join
+
+        path = safe_join(self.output_dir, rel_path)
+        if path is None or not os.path.isfile(path):
+            return None
+        return path
+
+    def _rewrite(self, value, urls):
+        """递归改写指向片段文件的字符串，字典的键（clips 段的路径）保持不变"""
+        if isinstance(value, dict):
+            return {key: self._rewrite(item, urls) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._rewrite(item, urls) for item in value]
+        if not isinstance(value, str):
+            return value
+        if value not in urls and os.path.splitext(value)[1] and not value.endswith(".json"):
+            path = self.resolve(value)
+            if path:
+                urls[value] = self.url_prefix + hashed_name(value, file_digest(path))
+        return urls.get(value, value)
+
+    def _build(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        urls = {}
+        manifest = self._rewrite(manifest, urls)
+        body = json.dumps(manifest, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return {
+            "body": body,
+            "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+            "etag": hashlib.sha256(body).hexdigest()[:32],
+            "urls": urls,
+        }
+
+    def manifest(self, rel_path, now):
+        """JSON 配置（voice_database.json、voices.json 等）对外提供的副本，文件不存在时返回 None
+
+        返回 {"body": 改写后的 JSON, "gzip": 预压缩的 body, "etag", "urls": 相对路径 → 带哈希 URL}。
+        配置文件变化时立即重建；未变化时每 ASSET_RESCAN_SECONDS 秒重建一次，以发现单独重新编码
+        或替换过的片段（未变的片段只需 stat，不重新计算哈希）。
+        """
+        path = self.resolve(rel_path)
+        if path is None:
+            return None
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            served = self.manifests.get(rel_path)
+            if served is None or key != served["key"] or now - served["checked_at"] >= ASSET_RESCAN_SECONDS:
+                built = self._build(path)
+                if served is None or built["etag"] != served["etag"]:
+                    print(f"🔗 {rel_path} 已改写: {len(built['urls'])} 个文件, "
+                          f"{len(built['body']) / 1024:.1f} KB → gzip {len(built['gzip']) / 1024:.1f} KB")
+                    served = self.manifests[rel_path] = built
+                served["key"] = key
+                served["checked_at"] = now
+            return served
+
+    def current_url(self, rel_path):
+        """文件当前内容对应的带哈希 URL，文件不存在时返回 None"""
+        path = self.resolve(rel_path)
+        return self.url_prefix + hashed_name(rel_path, file_digest(path)) if path else None
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音频精灵与语音包
+把 game_events（以及可选的每个角色）的片段拼接成一个音频精灵 + 偏移/时长 JSON，
+减少网页端的请求数，精灵统一放在 sprites/ 下，不与台词片段混在一起；另外打包成带索引头的二进制语音包，服务端可 mmap 后按偏移切片。
+两者都从 game_events_voices.json / voice_database.json 生成，保持同步。
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import wave
+
+from voice_verify import SPRITE_DIR
+
+SPRITE_GAP_MS = 100  # 片段之间插入的静音，避免播放时串音
+
+BANK_MAGIC = b"VBNK"
+BANK_VERSION = 1
+BANK_HEADER = struct.Struct("<4sHHIQ")  # 魔数, 版本, 保留, 条目数, 索引字节数
+BANK_ENTRY = struct.Struct("<QQ")  # 偏移, 长度
+
+
+def _load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.part"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def build_sprite(output_dir, clips, sprite_rel_path, gap_ms=SPRITE_GAP_MS):
+    """把 {名称: 相对路径} 中的 WAV 拼接成一个精灵文件
+
+    返回精灵描述 {"src": 相对路径, "sprite": {名称: [起始毫秒, 时长毫秒]}}，
+    格式与 howler.js 的 sprite 参数一致。所有片段的采样参数必须相同。
+    """
+    sprite_path = os.path.join(output_dir, sprite_rel_path)
+    tmp_path = f"{sprite_path}.part"
+    params = None
+    sprite = {}
+    position = 0  # 以帧计
+    out = None  # 读到第一个片段、知道采样参数后才创建临时文件
+
+    try:
+        for name, rel_path in clips.items():
+            clip_path = os.path.join(output_dir, rel_path)
+            if not os.path.exists(clip_path):
+                print(f"⚠️ 片段不存在，跳过: {rel_path}")
+                continue
+            with wave.open(clip_path, 'rb') as wf:
+                clip_params = (wf.getnchannels(), wf.getsampwidth(), wf.getframerate())
+                if params is None:
+                    params = clip_params
+                    os.makedirs(os.path.dirname(sprite_path), exist_ok=True)
+                    out = wave.open(tmp_path, 'wb')
+                    out.setnchannels(params[0])
+                    out.setsampwidth(params[1])
+                    out.setframerate(params[2])
+                elif clip_params != params:
+                    raise ValueError(f"{rel_path} 的采样参数 {clip_params} 与精灵 {params} 不一致")
+                frames = wf.readframes(wf.getnframes())
+                nframes = wf.getnframes()
+
+            framerate = params[2]
+            sprite[name] = [round(position * 1000 / framerate), round(nframes * 1000 / framerate)]
+            out.writeframes(frames)
+            gap_frames = framerate * gap_ms // 1000
+            out.writeframes(b"\x00" * gap_frames * params[0] * params[1])
+            position += nframes + gap_frames
+    except BaseException:
+        if out is not None:
+            # 先关闭写入器再删除临时文件：写入器关闭时会回写文件头，Windows 上也无法删除打开的文件
+            try:
+                out.close()
+            finally:
+                os.remove(tmp_path)
+        raise
+
+    if out is None:
+        return None
+    out.close()
+    os.replace(tmp_path, sprite_path)
+    return {"src": sprite_rel_path, "sprite": sprite}
+
+
+def _remove_legacy_sprite(output_dir, group_dir):
+    """删除旧版本写在片段目录里的 sprite.wav / sprite.json，避免被当作台词片段"""
+    for name in ("sprite.wav", "sprite.json"):
+        try:
+            os.remove(os.path.join(output_dir, group_dir, name))
+        except FileNotFoundError:
+            pass
+
+
+def build_event_sprite(output_dir, gap_ms=SPRITE_GAP_MS):
+    """根据 game_events_voices.json 生成 sprites/game_events.wav 和 sprites/game_events.json"""
+    config = _load_json(os.path.join(output_dir, "game_events", "game_events_voices.json"))
+    _remove_legacy_sprite(output_dir, "game_events")
+    sprite = build_sprite(output_dir, config.get("event_voices", {}), f"{SPRITE_DIR}/game_events.wav", gap_ms)
+    if sprite:
+        _write_json(os.path.join(output_dir, SPRITE_DIR, "game_events.json"), sprite)
+        print(f"🧩 游戏事件精灵: {len(sprite['sprite'])} 个片段 → {sprite['src']}")
+    return sprite
+
+
+def build_character_sprites(output_dir, gap_ms=SPRITE_GAP_MS):
+    """根据 voice_database.json 为每个角色生成 sprites/characters/<角色>.wav 和 .json"""
+    database = _load_json(os.path.join(output_dir, "voice_database.json"))
+    sprites = {}
+    for config in database.get("character_voices", []):
+        name = config["character_name"]
+        _remove_legacy_sprite(output_dir, os.path.join("characters", name))
+        sprite = build_sprite(output_dir, config.get("voices", {}), f"{SPRITE_DIR}/characters/{name}.wav", gap_ms)
+        if sprite:
+            _write_json(os.path.join(output_dir, SPRITE_DIR, "characters", f"{name}.json"), sprite)
+            sprites[name] = sprite
+    print(f"🧩 角色精灵: {len(sprites)} 个角色")
+    return sprites
+
+
+def collect_bank_clips(output_dir):
+    """从 voice_database.json 收集语音包条目 {键: 相对路径}，键为去掉扩展名的相对路径"""
+    database = _load_json(os.path.join(output_dir, "voice_database.json"))
+    clips = {}
+    for config in database.get("character_voices", []):
+        for rel_path in config.get("voices", {}).values():
+            clips[os.path.splitext(rel_path)[0]] = rel_path
+    for rel_path in database.get("game_event_voices", {}).get("event_voices", {}).values():
+        clips[os.path.splitext(rel_path)[0]] = rel_path
+    return clips
+
+
+def build_voice_bank(output_dir, bank_name="voice_bank.bin"):
+    """把所有片段打包为单个二进制语音包
+
+    布局: 头部(BANK_HEADER) + 索引(每条: u16 键长, 键, u64 偏移, u64 长度) + 数据区。
+    每条数据都是完整的 WAV 文件，内容相同的片段共用一份数据。
+    """
+    clips = collect_bank_clips(output_dir)
+    blobs = []
+    blob_index = {}  # 内容哈希 → 在 blobs 中的位置
+    entries = []
+    for key, rel_path in sorted(clips.items()):
+        clip_path = os.path.join(output_dir, rel_path)
+        if not os.path.exists(clip_path):
+            continue
+        with open(clip_path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha1(data).digest()
+        if digest not in blob_index:
+            blob_index[digest] = len(blobs)
+            blobs.append(data)
+        entries.append((key.encode("utf-8"), blob_index[digest]))
+
+    index_size = sum(2 + len(key) + BANK_ENTRY.size for key, _ in entries)
+    data_start = BANK_HEADER.size + index_size
+    blob_offsets = []
+    offset = data_start
+    for data in blobs:
+        blob_offsets.append(offset)
+        offset += len(data)
+
+    bank_path = os.path.join(output_dir, bank_name)
+    tmp_path = f"{bank_path}.part"
+    with open(tmp_path, 'wb') as f:
+        f.write(BANK_HEADER.pack(BANK_MAGIC, BANK_VERSION, 0, len(entries), index_size))
+        for key, blob in entries:
+            f.write(struct.pack("<H", len(key)))
+            f.write(key)
+            f.write(BANK_ENTRY.pack(blob_offsets[blob], len(blobs[blob])))
+        for data in blobs:
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, bank_path)
+
+    print(f"📦 语音包: {len(entries)} 个条目 / {len(blobs)} 份数据, "
+          f"{os.path.getsize(bank_path) / 1024 / 1024:.2f} MB → {bank_name}")
+    return bank_path
+
+
+class VoiceBank:
+    """只读语音包，mmap 打开后按键返回零拷贝的 memoryview 切片
+
+    关闭前需释放所有取出的切片，否则 mmap 无法关闭。
+    """
+
+    def __init__(self, bank_path):
+        self.file = open(bank_path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count, index_size = BANK_HEADER.unpack_from(self.map, 0)
+        if magic != BANK_MAGIC or version != BANK_VERSION:
+            self.close()
+            raise ValueError(f"不是有效的语音包: {bank_path}")
+
+        self.index = {}
+        position = BANK_HEADER.size
+        for _ in range(count):
+            (key_len,) = struct.unpack_from("<H", self.map, position)
+            position += 2
+            key = bytes(self.map[position:position + key_len]).decode("utf-8")
+            position += key_len
+            self.index[key] = BANK_ENTRY.unpack_from(self.map, position)
+            position += BANK_ENTRY.size
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def keys(self):
+        return self.index.keys()
+
+    def get(self, key):
+        """返回条目的 memoryview，不存在时返回 None"""
+        if key not in self.index:
+            return None
+        offset, length = self.index[key]
+        return memoryview(self.map)[offset:offset + length]
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def build_voice_packs(output_dir, include_characters=False, gap_ms=SPRITE_GAP_MS):
+    """生成游戏事件精灵、（可选）角色精灵和二进制语音包"""
+    build_event_sprite(output_dir, gap_ms)
+    if include_characters:
+        build_character_sprites(output_dir, gap_ms)
+    return build_voice_bank(output_dir)
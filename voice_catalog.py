@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+台词目录
+所有角色台词、音色角色、游戏事件台词以及 generate_game_voices 的语音表统一放在 voice_catalog.json，
+启动时校验并编译为只读的索引表（角色 → 台词类型 → 文本），进程内按文件 mtime 缓存编译结果，
+每次查询都是一次字典查找。
+"""
+
+import json
+import os
+import threading
+from types import MappingProxyType
+
+VOICE_CATALOG_PATH = os.getenv(
+    "VOICE_CATALOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "voice_catalog.json")
+)
+CATALOG_SCHEMA_VERSION = 1
+
+_compiled = {}  # 绝对路径 → (缓存键, VoiceCatalog)
+_compiled_lock = threading.Lock()
+
+
+class CatalogError(ValueError):
+    """台词目录不符合格式要求"""
+
+
+def _require(condition, path, message):
+    if not condition:
+        raise CatalogError(f"{path}: {message}")
+
+
+def _require_text(value, path):
+    _require(isinstance(value, str) and value.strip(), path, "必须是非空字符串")
+
+
+def _require_mapping(value, path):
+    _require(isinstance(value, dict), path, "必须是对象")
+
+
+def validate_catalog(raw):
+    """校验台词目录结构，发现问题时抛出 CatalogError（带出错位置）"""
+    _require_mapping(raw, "$")
+    _require(raw.get("version") == CATALOG_SCHEMA_VERSION, "version", f"只支持版本 {CATALOG_SCHEMA_VERSION}")
+
+    roles = raw.get("voice_roles")
+    _require(isinstance(roles, list) and roles, "voice_roles", "必须是非空列表")
+    for i, role in enumerate(roles):
+        _require_text(role, f"voice_roles[{i}]")
+    roles = set(roles)
+
+    line_types = raw.get("line_types")
+    _require(isinstance(line_types, list) and line_types, "line_types", "必须是非空列表")
+    line_types = set(line_types)
+
+    default_lines = raw.get("default_lines")
+    _require_mapping(default_lines, "default_lines")
+    for line_type in line_types:
+        _require_text(default_lines.get(line_type), f"default_lines.{line_type}")
+
+    _require_mapping(raw.get("type_voices"), "type_voices")
+    for char_type, role in raw["type_voices"].items():
+        _require(role in roles, f"type_voices.{char_type}", f"未知的音色角色 {role!r}")
+    _require(raw.get("default_voice") in roles, "default_voice", "必须是 voice_roles 中的一项")
+
+    _require_mapping(raw.get("characters"), "characters")
+    for name, entry in raw["characters"].items():
+        path = f"characters.{name}"
+        _require_mapping(entry, path)
+        unknown = set(entry) - {"voice", "lines", "special"}
+        _require(not unknown, path, f"未知字段 {sorted(unknown)}")
+        if "voice" in entry:
+            _require(entry["voice"] in roles, f"{path}.voice", f"未知的音色角色 {entry['voice']!r}")
+        lines = entry.get("lines", {})
+        _require_mapping(lines, f"{path}.lines")
+        for line_type, text in lines.items():
+            _require(line_type in line_types, f"{path}.lines.{line_type}", "未知的台词类型")
+            _require_text(text, f"{path}.lines.{line_type}")
+        special = entry.get("special", {})
+        _require_mapping(special, f"{path}.special")
+        for key, text in special.items():
+            _require_text(text, f"{path}.special.{key}")
+
+    events = raw.get("game_events")
+    _require_mapping(events, "game_events")
+    _require(events.get("voice") in roles, "game_events.voice", "必须是 voice_roles 中的一项")
+    _require_mapping(events.get("lines"), "game_events.lines")
+    for key, text in events["lines"].items():
+        _require_text(text, f"game_events.lines.{key}")
+
+    game_voices = raw.get("game_voices")
+    _require_mapping(game_voices, "game_voices")
+    _require_mapping(game_voices.get("events"), "game_voices.events")
+    filenames = set()
+    for key, entry in game_voices["events"].items():
+        path = f"game_voices.events.{key}"
+        _require_mapping(entry, path)
+        _require_text(entry.get("text"), f"{path}.text")
+        _require_text(entry.get("voice"), f"{path}.voice")
+        _require_text(entry.get("filename"), f"{path}.filename")
+        _require(entry["filename"].endswith(".wav"), f"{path}.filename", "必须以 .wav 结尾")
+        _require(entry["filename"] not in filenames, f"{path}.filename", f"与其他事件重复: {entry['filename']}")
+        filenames.add(entry["filename"])
+    _require_mapping(game_voices.get("characters"), "game_voices.characters")
+    for name, voices in game_voices["characters"].items():
+        _require_mapping(voices, f"game_voices.characters.{name}")
+        for voice_type, entry in voices.items():
+            path = f"game_voices.characters.{name}.{voice_type}"
+            _require_mapping(entry, path)
+            _require_text(entry.get("text"), f"{path}.text")
+            _require_text(entry.get("voice"), f"{path}.voice")
+
+
+def compile_catalog(raw):
+    """把校验后的目录整理为查询用的扁平表（普通字典）"""
+    validate_catalog(raw)
+    characters = raw["characters"]
+    return {
+        "line_types": tuple(raw["line_types"]),
+        "default_lines": dict(raw["default_lines"]),
+        "type_voices": dict(raw["type_voices"]),
+        "default_voice": raw["default_voice"],
+        "voice_roles": {name: entry["voice"] for name, entry in characters.items() if "voice" in entry},
+        "lines": {name: dict(entry.get("lines", {})) for name, entry in characters.items()},
+        "special": {name: dict(entry["special"]) for name, entry in characters.items() if entry.get("special")},
+        "event_voice": raw["game_events"]["voice"],
+        "event_lines": dict(raw["game_events"]["lines"]),
+        "game_events": {key: dict(entry) for key, entry in raw["game_voices"]["events"].items()},
+        "game_characters": {
+            name: {voice_type: dict(entry) for voice_type, entry in voices.items()}
+            for name, voices in raw["game_voices"]["characters"].items()
+        },
+    }
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    return value
+
+
+class VoiceCatalog:
+    """编译后的只读台词目录"""
+
+    EMPTY = MappingProxyType({})
+
+    def __init__(self, tables):
+        tables = _freeze(tables)
+        self.line_types = tables["line_types"]
+        self.default_lines = tables["default_lines"]
+        self.type_voices = tables["type_voices"]
+        self.default_voice = tables["default_voice"]
+        self.voice_roles = tables["voice_roles"]
+        self.lines = tables["lines"]
+        self.special = tables["special"]
+        self.event_voice = tables["event_voice"]
+        self.event_lines = tables["event_lines"]
+        self.game_events = tables["game_events"]
+        self.game_characters = tables["game_characters"]
+
+    def line(self, name, line_type):
+        """角色的某类台词，目录中没有时使用默认模板"""
+        text = self.lines.get(name, self.EMPTY).get(line_type)
+        if text is None:
+            text = self.default_lines[line_type].format(name=name)
+        return text
+
+    def special_lines(self, name):
+        """角色的特殊台词（只读）"""
+        return self.special.get(name, self.EMPTY)
+
+    def voice_role(self, name, char_type):
+        """角色的音色角色：先按角色名，再按角色类型，最后使用默认值"""
+        return self.voice_roles.get(name) or self.type_voices.get(char_type) or self.default_voice
+
+
+def _cache_key(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, CATALOG_SCHEMA_VERSION)
+
+
+def load_catalog(path=VOICE_CATALOG_PATH):
+    """加载台词目录
+
+    进程内按 (路径, mtime, 大小) 复用已编译的目录，文件改动后自动重新校验和编译。
+    """
+    key = _cache_key(path)
+    with _compiled_lock:
+        cached = _compiled.get(key[0])
+        if cached and cached[0] == key:
+            return cached[1]
+
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+        catalog = VoiceCatalog(compile_catalog(raw))
+        _compiled[key[0]] = (key, catalog)
+        return catalog
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音生成统一命令行
+    python voice_cli.py plan      只打印增量构建计划
+    python voice_cli.py generate  合成语音（完整 / 增量 / asyncio 流水线 / 重放失败清单）
+    python voice_cli.py verify    离线校验语音文件的完整性（文件头、时长、静音）以及与台词目录是否一致
+    python voice_cli.py pack      生成音频精灵和二进制语音包
+    python voice_cli.py cards     按势力 / 类型 / 角色名查询角色卡片索引
+plan / verify / pack / cards 不导入 TTS SDK、不访问网络；生成器模块在解析完参数后才导入。
+plan / verify 只构建台词目录与清单，.tts_cache 不存在时不会创建。
+"""
+
+import argparse
+import importlib
+import os
+import sys
+
+GENERATORS = ("voice_generator", "new_gen")
+
+
+def load_generator(name):
+    """导入生成器模块（voice_generator 输出到 voices/，new_gen 输出到 voices_new/）"""
+    return importlib.import_module(name)
+
+
+def existing_cache_dir():
+    """已存在的 TTS 缓存目录，不存在时返回 None（只读命令改用内存中的角色索引）"""
+    from tts_cache import TTS_CACHE_DIR
+
+    return TTS_CACHE_DIR if os.path.isdir(TTS_CACHE_DIR) else None
+
+
+def readonly_generator(module):
+    """只用于读取台词目录和清单的生成器：角色索引沿用已有的缓存目录，否则建在内存里"""
+    from character_index import CharacterIndex
+
+    return module.VoiceGenerator(character_index=CharacterIndex(cache_dir=existing_cache_dir()))
+
+
+def cmd_plan(args):
+    module = load_generator(args.generator)
+    generator = readonly_generator(module)
+    only = generator.failure_ledger.paths() if args.retry_failed else None
+    generator.create_voice_database_incremental(plan_only=True, only=only)
+    return 0
+
+
+def cmd_generate(args):
+    if args.game_voices and args.generator != "voice_generator":
+        print("❌ --game-voices 只支持 voice_generator（输出到 voices/）")
+        return 2
+    from voice_priority import PlayPriority
+
+    module = load_generator(args.generator)
+    encode_formats = tuple(args.encode.split(",")) if args.encode else None
+    generator = module.VoiceGenerator(
+        workers=args.workers or module.TTS_WORKERS,
+        encode_formats=encode_formats,
+        prometheus_path=args.metrics_prom,
+        batch_lines=module.TTS_BATCH_LINES if args.batch is None else args.batch,
+        priority=PlayPriority(args.play_log) if args.play_log else None
+    )
+
+    if args.game_voices:
+        from generate_game_voices import GameVoiceGenerator
+
+        GameVoiceGenerator(voice_gen=generator).run_all()
+        return 1 if len(generator.failure_ledger) else 0
+
+    if args.retry_failed:
+        failed = generator.failure_ledger.paths()
+        if not failed:
+            print("✅ 失败清单为空，无需重放")
+            return 0
+        print(f"🔁 重放失败清单中的 {len(failed)} 个片段")
+        generator.create_voice_database_incremental(only=failed)
+    elif args.incremental:
+        generator.create_voice_database_incremental()
+    elif args.use_async:
+        import asyncio
+
+        asyncio.run(generator.create_voice_database_async())
+    else:
+        generator.create_voice_database()
+
+    if args.pack:
+        from voice_bank import build_voice_packs
+
+        build_voice_packs(module.VOICE_OUTPUT_DIR, include_characters=args.pack_characters)
+
+    print(f"\n🎉 语音生成完成，文件保存在: {module.VOICE_OUTPUT_DIR}/")
+    return 1 if len(generator.failure_ledger) else 0
+
+
+def collect_clip_texts(generator, output_dir, clips):
+    """校验用的 {相对路径: (台词, 音色, 来源)}：清单中的片段，以及 generate_game_voices 任务队列中的片段"""
+    from voice_jobs import VOICE_JOBS_NAME, VoiceJobQueue
+
+    texts = {}
+    if os.path.exists(os.path.join(output_dir, VOICE_JOBS_NAME)):
+        queue = VoiceJobQueue(output_dir)
+        texts.update({rel_path: (text, voice, "jobs") for rel_path, (text, voice) in queue.clip_texts().items()})
+        queue.close()
+    texts.update({rel_path: (entry.get("text"), entry.get("voice"), "clips") for rel_path, entry in clips.items()})
+    return texts
+
+
+def queue_repairs(module, generator, output_dir, broken, texts):
+    """删除损坏的片段并丢弃对应缓存，登记到失败清单（任务队列中的片段标记为失败），下次只重新合成这些片段"""
+    from voice_jobs import VOICE_JOBS_NAME, VoiceJobQueue
+
+    queue = None
+    if os.path.exists(os.path.join(output_dir, VOICE_JOBS_NAME)):
+        queue = VoiceJobQueue(output_dir)
+    for rel_path, (problem, detail) in sorted(broken.items()):
+        path = os.path.join(output_dir, rel_path)
+        text, voice, source = texts.get(rel_path, (None, None, None))
+        if os.path.exists(path):
+            os.remove(path)
+        generator.tts_cache.forget_output(path)
+        if text and voice:
+            generator.tts_cache.discard(module.TTS_MODEL, voice, text)
+        if source == "clips":
+            generator.failure_ledger.record(rel_path, text, voice, module.TTS_MODEL, f"校验失败: {detail}", 0)
+        elif source == "jobs":
+            queue.fail(path, f"校验失败: {detail}")
+    if queue:
+        queue.close()
+
+
+def cmd_verify(args):
+    from voice_manifest import diff_clip_catalog, load_voice_database
+    from voice_verify import PROBLEM_LABELS, REPORT_ONLY_PROBLEMS, check_clips, find_wav_files
+
+    # 先收集所有输出目录的片段，再在同一个进程池里统一校验
+    outputs = []
+    tasks = []
+    for name in (GENERATORS if args.all else (args.generator,)):
+        module = load_generator(name)
+        output_dir = module.VOICE_OUTPUT_DIR
+        if not os.path.isdir(output_dir):
+            print(f"⏭️ 跳过 {output_dir}/: 目录不存在")
+            continue
+        database = load_voice_database(os.path.join(output_dir, "voice_database.json"))
+        clips = database.get("clips", {})
+        generator = module.VoiceGenerator() if args.repair else readonly_generator(module)
+        texts = collect_clip_texts(generator, output_dir, clips)
+        rel_paths = sorted(set(find_wav_files(output_dir)) | set(clips))
+        tasks.extend((os.path.join(output_dir, rel_path), texts.get(rel_path, (None,))[0]) for rel_path in rel_paths)
+        outputs.append((module, generator, output_dir, database, clips, texts, rel_paths))
+    if not outputs:
+        print("❌ 没有可校验的语音目录，请先运行 generate")
+        return 1
+
+    print(f"🔍 校验 {len(tasks)} 个语音文件 ...")
+    results = check_clips(tasks, workers=args.workers)
+    has_cache = args.repair or existing_cache_dir() is not None  # 没有缓存目录时没有生成记录可对照
+
+    issues = 0
+    for module, generator, output_dir, database, clips, texts, rel_paths in outputs:
+        broken = {}
+        for rel_path in rel_paths:
+            path = os.path.join(output_dir, rel_path)
+            if path in results:
+                broken[rel_path] = results[path]
+                continue
+            # 文件本身完好时，对照清单指纹与登记的生成记录，发现被替换或改动过的文件
+            entry = clips.get(rel_path)
+            record = generator.tts_cache.output_record(path) if entry and has_cache else None
+            if record and record[0] != entry.get("fingerprint"):
+                broken[rel_path] = ("overwritten", "文件由清单以外的台词生成")
+            elif record and record[1] != os.path.getsize(path):
+                broken[rel_path] = ("mismatch", f"文件大小 {os.path.getsize(path)} 与生成时的 {record[1]} 字节不符")
+
+        report = {label: [] for label in PROBLEM_LABELS.values()}
+        for rel_path, (problem, detail) in sorted(broken.items()):
+            report[PROBLEM_LABELS[problem]].append(f"{rel_path}  ({detail})")
+        if database.get("character_voices") and not clips:
+            print(f"⚠️ {output_dir}/voice_database.json 中没有片段指纹记录（旧版数据库），"
+                  f"只校验文件本身，可运行 generate --incremental 补全")
+        if clips:
+            _, _, catalog = generator.get_clip_catalog()
+            plan = diff_clip_catalog(clips, catalog, output_dir,
+                                     generator.tts_cache.output_record if has_cache else None)
+            report["尚未生成"] = [rel_path for rel_path in plan["added"] if rel_path not in clips]
+            report["台词已修改"] = plan["changed"]
+            report["孤立片段"] = plan["orphaned"]
+        report["失败清单"] = sorted(generator.failure_ledger.paths())
+
+        print(f"🔍 {output_dir}/: {len(rel_paths)} 个语音文件，清单 {len(clips)} 个片段")
+        for label, paths in report.items():
+            if not paths:
+                continue
+            issues += len(paths)
+            print(f"   ⚠️ {label}: {len(paths)} 个")
+            for rel_path in paths[:args.limit]:
+                print(f"     - {rel_path}")
+            if len(paths) > args.limit:
+                print(f"     ... 另有 {len(paths) - args.limit} 个")
+
+        repairs = {rel_path: item for rel_path, item in broken.items() if item[0] not in REPORT_ONLY_PROBLEMS}
+        if repairs and args.repair:
+            queue_repairs(module, generator, output_dir, repairs, texts)
+            print(f"🔁 已删除 {len(repairs)} 个损坏片段并加入重新合成队列")
+
+    if issues:
+        if args.repair:
+            print(f"❌ 发现 {issues} 个问题，运行 generate --retry-failed（游戏语音为 generate --game-voices）只重新合成损坏的片段")
+        else:
+            print(f"❌ 发现 {issues} 个问题，加 --repair 把损坏片段加入重新合成队列，其余可运行 generate --incremental 修复")
+        return 1
+    print("✅ 语音文件完好，且与台词目录一致")
+    return 0
+
+
+def cmd_pack(args):
+    from voice_bank import build_voice_packs
+
+    module = load_generator(args.generator)
+    build_voice_packs(module.VOICE_OUTPUT_DIR, include_characters=args.characters)
+    return 0
+
+
+def cmd_cards(args):
+    from character_index import CharacterIndex
+
+    index = CharacterIndex()
+    index.refresh()
+    characters = index.query(faction=args.faction, char_type=args.type, name=args.name)
+    for character in characters:
+        print(f"   {character['name']:<8}{character.get('title', ''):<8}{character.get('faction', ''):<4}"
+              f"{character.get('type', '')}")
+    print(f"📊 共 {len(characters)} 个角色")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="三国杀游戏语音生成")
+    parser.add_argument("--generator", choices=GENERATORS, default="voice_generator",
+                        help="使用的生成器（默认 voice_generator，输出 voices/；new_gen 输出 voices_new/）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    plan = subparsers.add_parser("plan", help="只打印增量构建计划，不调用接口")
+    plan.add_argument("--retry-failed", action="store_true", help="只计划重放失败清单中的片段")
+    plan.set_defaults(func=cmd_plan)
+
+    generate = subparsers.add_parser("generate", help="合成语音")
+    mode = generate.add_mutually_exclusive_group()
+    mode.add_argument("--incremental", action="store_true", help="只合成新增或修改的台词，并清理孤立文件")
+    mode.add_argument("--async", dest="use_async", action="store_true", help="使用 asyncio 流水线合成与下载")
+    mode.add_argument("--retry-failed", action="store_true", help="只重放失败清单中的片段")
+    mode.add_argument("--game-voices", action="store_true", help="生成 generate_game_voices 的游戏环节与角色语音")
+    generate.add_argument("--workers", type=int, help="并发合成的线程数（默认取 TTS_WORKERS）")
+    generate.add_argument("--batch", type=int, metavar="N",
+                          help="把同音色的短台词每 N 句合并成一次合成请求，再按静音切回逐句片段（默认取 TTS_BATCH_LINES）")
+    generate.add_argument("--encode", metavar="FORMATS", help="合成后编码为网页格式，逗号分隔，如 opus,mp3")
+    generate.add_argument("--pack", action="store_true", help="合成后生成游戏事件音频精灵和二进制语音包")
+    generate.add_argument("--pack-characters", action="store_true", help="打包时同时为每个角色生成音频精灵")
+    generate.add_argument("--play-log", metavar="PATH",
+                          help="客户端播放记录（JSON Lines），按实际播放频率调整合成顺序（默认取 TTS_PLAY_LOG）")
+    generate.add_argument("--metrics-prom", metavar="PATH", help="运行结束时把指标以 Prometheus 文本格式写到 PATH")
+    generate.set_defaults(func=cmd_generate)
+
+    verify = subparsers.add_parser("verify", help="离线校验语音文件，有问题时退出码为 1")
+    verify.add_argument("--limit", type=int, default=20, help="每类问题最多列出的片段数")
+    verify.add_argument("--all", action="store_true", help="同时校验 voices/ 与 voices_new/")
+    verify.add_argument("--repair", action="store_true",
+                        help="删除损坏的片段并丢弃对应缓存，登记到失败清单，之后 generate --retry-failed 只重新合成这些片段")
+    verify.add_argument("--workers", type=int, help="校验进程数（默认取 CPU 核数）")
+    verify.set_defaults(func=cmd_verify)
+
+    pack = subparsers.add_parser("pack", help="根据已有的语音数据库打包，不调用 TTS 接口")
+    pack.add_argument("--characters", action="store_true", help="同时为每个角色生成音频精灵")
+    pack.set_defaults(func=cmd_pack)
+
+    cards = subparsers.add_parser("cards", help="查询角色卡片索引")
+    cards.add_argument("--faction", help="按势力筛选，如 蜀")
+    cards.add_argument("--type", help="按角色类型筛选，如 武将")
+    cards.add_argument("--name", help="按角色名查找")
+    cards.set_defaults(func=cmd_cards)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成前的台词去重
+跨角色、跨游戏事件按 (规范化文本, 音色) 合并任务，每组只调用一次接口，
+其余输出路径以硬链接落盘。
+"""
+
+from tts_cache import make_cache_key
+
+
+def dedupe_jobs(jobs, model):
+    """合并 (任务键, 文本, 音色, 输出路径) 列表中的重复台词
+
+    返回 (去重后的任务列表, [(重复任务, 对应的首个任务)])，保持原有顺序。
+    """
+    primaries = {}
+    unique = []
+    duplicates = []
+    for job in jobs:
+        key = make_cache_key(model, job[2], job[1])
+        if key in primaries:
+            duplicates.append((job, primaries[key]))
+        else:
+            primaries[key] = job
+            unique.append(job)
+    return unique, duplicates
+
+
+def print_dedupe_report(unique, duplicates):
+    """打印去重报告"""
+    if not duplicates:
+        return
+    total = len(unique) + len(duplicates)
+    print(f"🔗 台词去重: {total} 条任务 → {len(unique)} 次合成，节省 {len(duplicates)} 次接口调用")
+    for job, primary in duplicates:
+        print(f"     {job[3]} ⇐ {primary[3]}")
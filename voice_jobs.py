@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可续跑的语音任务队列
+每个输出文件一行（文本、音色、状态、尝试次数、耗时），状态变化立即落盘到 SQLite。
+进程被杀后重新运行时，已完成的任务直接跳过，中断时处于 running 的任务重新排队。
+排队的任务按播放概率（priority）从高到低取出。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from tts_cache import make_cache_key
+
+VOICE_JOBS_NAME = "voice_jobs.sqlite"
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class VoiceJobQueue:
+    """持久化的语音任务队列，任务以相对于输出目录的路径为主键"""
+
+    def __init__(self, output_dir, name=VOICE_JOBS_NAME):
+        self.output_dir = output_dir
+        self.lock = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(output_dir, name), check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                path TEXT PRIMARY KEY,
+                grp TEXT NOT NULL,
+                job_key TEXT NOT NULL,
+                text TEXT NOT NULL,
+                voice TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                enqueued_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                duration_ms REAL,
+                priority REAL NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS jobs_state ON jobs (grp, state);
+        """)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(jobs)")}
+        if "priority" not in columns:  # 旧版队列文件
+            self.db.execute("ALTER TABLE jobs ADD COLUMN priority REAL NOT NULL DEFAULT 0")
+        # 上次运行被中断时还在执行的任务重新排队
+        recovered = self.db.execute("UPDATE jobs SET state = ? WHERE state = ?", (PENDING, RUNNING)).rowcount
+        self.db.commit()
+        if recovered:
+            print(f"⏯️ 恢复上次中断的 {recovered} 个任务")
+
+    def _rel_path(self, path):
+        return os.path.relpath(path, self.output_dir).replace("\\", "/")
+
+    def enqueue(self, group, jobs, model, prune=False, weights=None):
+        """登记一组任务 (任务键, 文本, 音色, 输出路径)
+
+        台词或音色未变且输出文件仍在的已完成任务保持完成；修改过的、失败的任务重新排队。
+        prune 为 True 时删除该组中不在本次任务列表里的旧任务。weights 为 {任务键: 播放概率}，
+        决定取出顺序和覆盖率。返回排队中的任务数。
+        """
+        weights = weights or {}
+        now = time.time()
+        paths = set()
+        with self.lock:
+            existing = {
+                path: (fingerprint, state)
+                for path, fingerprint, state in self.db.execute(
+                    "SELECT path, fingerprint, state FROM jobs WHERE grp = ?", (group,)
+                )
+            }
+            for job_key, text, voice_type, audio_path in jobs:
+                if not text:
+                    continue
+                rel_path = self._rel_path(audio_path)
+                paths.add(rel_path)
+                fingerprint = make_cache_key(model, voice_type, text)
+                old = existing.get(rel_path)
+                if old and old[0] == fingerprint:
+                    if old[1] == DONE and os.path.exists(audio_path):
+                        continue
+                    if old[1] == PENDING:
+                        continue
+                    self.db.execute("UPDATE jobs SET state = ?, error = NULL WHERE path = ?", (PENDING, rel_path))
+                    continue
+                self.db.execute(
+                    "INSERT OR REPLACE INTO jobs (path, grp, job_key, text, voice, fingerprint, state, attempts, "
+                    "enqueued_at) VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?)",
+                    (rel_path, group, json.dumps(job_key, ensure_ascii=False), text, voice_type, fingerprint,
+                     PENDING, now)
+                )
+            self.db.executemany(
+                "UPDATE jobs SET priority = ? WHERE path = ?",
+                [(weights.get(job[0], 0.0), self._rel_path(job[3])) for job in jobs if job[1]]
+            )
+            if prune:
+                stale = [(path,) for path in existing if path not in paths]
+                self.db.executemany("DELETE FROM jobs WHERE path = ?", stale)
+            self.db.commit()
+            return self.db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE grp = ? AND state = ?", (group, PENDING)
+            ).fetchone()[0]
+
+    def claim(self, groups):
+        """取出播放概率最高的待执行任务并标记为 running，没有可执行的任务时返回 None
+
+        与正在执行的任务台词相同的任务暂不取出，等前者完成后直接命中缓存。
+        """
+        marks = ", ".join("?" * len(groups))
+        with self.lock:
+            row = self.db.execute(
+                f"SELECT path, job_key, text, voice FROM jobs WHERE state = ? AND grp IN ({marks}) "
+                f"AND fingerprint NOT IN (SELECT fingerprint FROM jobs WHERE state = ?) "
+                f"ORDER BY priority DESC, rowid LIMIT 1",
+                (PENDING, *groups, RUNNING)
+            ).fetchone()
+            if row is None:
+                return None
+            self.db.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, started_at = ? WHERE path = ?",
+                (RUNNING, time.time(), row[0])
+            )
+            self.db.commit()
+        path, job_key, text, voice = row
+        return json.loads(job_key), text, voice, os.path.join(self.output_dir, path)
+
+    def _finish(self, audio_path, state, error=None):
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "UPDATE jobs SET state = ?, error = ?, finished_at = ?, duration_ms = (? - started_at) * 1000 "
+                "WHERE path = ?",
+                (state, error, now, now, self._rel_path(audio_path))
+            )
+            self.db.commit()
+
+    def complete(self, audio_path):
+        self._finish(audio_path, DONE)
+
+    def fail(self, audio_path, error):
+        self._finish(audio_path, FAILED, str(error))
+
+    def has_pending(self, groups):
+        """是否还有排队或执行中的任务"""
+        marks = ", ".join("?" * len(groups))
+        with self.lock:
+            return self.db.execute(
+                f"SELECT 1 FROM jobs WHERE grp IN ({marks}) AND state IN (?, ?) LIMIT 1", (*groups, PENDING, RUNNING)
+            ).fetchone() is not None
+
+    def counts(self, groups):
+        """各状态的任务数"""
+        marks = ", ".join("?" * len(groups))
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT state, COUNT(*) FROM jobs WHERE grp IN ({marks}) GROUP BY state", groups
+            ).fetchall()
+        return dict(rows)
+
+    def priorities(self, groups):
+        """返回 ({输出路径: 播放概率}, 已完成的输出路径列表)，用于按播放概率汇报覆盖率"""
+        marks = ", ".join("?" * len(groups))
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT path, priority, state FROM jobs WHERE grp IN ({marks})", groups
+            ).fetchall()
+        weights = {os.path.join(self.output_dir, path): priority for path, priority, _ in rows}
+        done = [os.path.join(self.output_dir, path) for path, _, state in rows if state == DONE]
+        return weights, done
+
+    def clip_texts(self):
+        """各任务输出文件的 {相对路径: (台词, 音色)}"""
+        with self.lock:
+            return {path: (text, voice) for path, text, voice in self.db.execute("SELECT path, text, voice FROM jobs")}
+
+    def completed_paths(self):
+        """已完成任务的相对路径集合"""
+        with self.lock:
+            return {path for path, in self.db.execute("SELECT path FROM jobs WHERE state = ?", (DONE,))}
+
+    def close(self):
+        with self.lock:
+            self.db.close()
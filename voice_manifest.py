@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音清单与增量构建
+voice_database.json 的 "clips" 段记录每个片段的 (文本, 音色, 模型) 指纹，
+与当前台词目录对比后只合成新增或修改的片段，并清理孤立文件。
+"""
+
+import json
+import os
+
+from tts_cache import make_cache_key
+
+# 单次合成请求的平均耗时（秒），用于 --plan 估算
+TTS_AVG_LATENCY = float(os.getenv("TTS_AVG_LATENCY", "2.5"))
+
+
+def make_clip_entry(model, voice, text):
+    """生成清单中单个片段的指纹记录"""
+    return {
+        "text": text.strip(),
+        "voice": voice,
+        "model": model,
+        "fingerprint": make_cache_key(model, voice, text)
+    }
+
+
+def relative_voice_path(path, output_dir):
+    """输出文件相对于语音根目录的路径（统一使用 /）"""
+    return os.path.relpath(path, output_dir).replace("\\", "/")
+
+
+def build_clip_catalog(jobs, model, output_dir):
+    """把任务列表整理为 {相对路径: {"job": 任务, "entry": 指纹记录}}"""
+    catalog = {}
+    for job in jobs:
+        job_key, text, voice_type, audio_path = job
+        if not text:
+            continue
+        catalog[relative_voice_path(audio_path, output_dir)] = {
+            "job": job,
+            "entry": make_clip_entry(model, voice_type, text)
+        }
+    return catalog
+
+
+def load_voice_database(database_path):
+    """读取现有的 voice_database.json，不存在或损坏时返回空字典"""
+    try:
+        with open(database_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def diff_clip_catalog(old_clips, catalog, output_dir, output_record=None):
+    """对比旧清单与当前台词目录
+
+    返回 {"added": [...], "changed": [...], "unchanged": [...], "adopted": [...], "orphaned": [...]}，
+    元素均为相对路径。旧清单里有记录但文件已丢失的片段按新增处理。
+    output_record(路径) 返回缓存登记的 (指纹, 字节数)：清单里没有记录、但文件已存在且登记与当前台词一致的
+    片段（例如清单丢失）与增量构建时的 is_current 判断相同，直接沿用，记为 adopted，不需要合成。
+    """
+    plan = {"added": [], "changed": [], "unchanged": [], "adopted": [], "orphaned": []}
+    for rel_path, item in catalog.items():
+        path = os.path.join(output_dir, rel_path)
+        old_entry = old_clips.get(rel_path)
+        if not os.path.exists(path):
+            plan["added"].append(rel_path)
+        elif old_entry is None:
+            record = output_record(path) if output_record else None
+            if record and record[0] == item["entry"]["fingerprint"] and record[1] == os.path.getsize(path):
+                plan["adopted"].append(rel_path)
+            else:
+                plan["added"].append(rel_path)
+        elif old_entry.get("fingerprint") != item["entry"]["fingerprint"]:
+            plan["changed"].append(rel_path)
+        else:
+            plan["unchanged"].append(rel_path)
+    plan["orphaned"] = sorted(rel_path for rel_path in old_clips if rel_path not in catalog)
+    return plan
+
+
+def restrict_plan(plan, paths):
+    """只保留 paths 中的新增/修改片段，其余改动留待下次构建，且不清理孤立文件"""
+    deferred = [rel_path for rel_path in plan["added"] + plan["changed"] if rel_path not in paths]
+    if deferred:
+        print(f"⏭️ 本次只处理指定片段，其余 {len(deferred)} 个改动留待下次增量构建")
+    return {
+        "added": [rel_path for rel_path in plan["added"] if rel_path in paths],
+        "changed": [rel_path for rel_path in plan["changed"] if rel_path in paths],
+        "unchanged": plan["unchanged"],
+        "adopted": plan["adopted"],
+        "orphaned": []
+    }
+
+
+def estimate_api_seconds(job_count, requests_per_second, workers, avg_latency=TTS_AVG_LATENCY):
+    """按限流速率和并发数估算合成耗时"""
+    if job_count == 0:
+        return 0.0
+    throughput = min(requests_per_second, workers / avg_latency)
+    return job_count / throughput
+
+
+def print_build_plan(plan, requests_per_second, workers, unique_count=None):
+    """打印增量构建计划，unique_count 为台词去重后实际需要的合成次数"""
+    job_count = len(plan["added"]) + len(plan["changed"])
+    if unique_count is not None:
+        job_count = min(job_count, unique_count)
+    print(f"📋 增量构建计划:")
+    print(f"   - 新增片段: {len(plan['added'])} 个")
+    print(f"   - 修改片段: {len(plan['changed'])} 个")
+    print(f"   - 未变片段: {len(plan['unchanged'])} 个")
+    print(f"   - 沿用片段: {len(plan['adopted'])} 个 (文件已存在且与台词一致，只补记清单)")
+    print(f"   - 孤立片段: {len(plan['orphaned'])} 个 (将被删除)")
+    print(f"   - 需要合成: {job_count} 次接口调用，预计耗时约 "
+          f"{estimate_api_seconds(job_count, requests_per_second, workers):.0f} 秒")
+    for label in ("added", "changed", "orphaned"):
+        for rel_path in plan[label]:
+            print(f"     [{label}] {rel_path}")
+
+
+def remove_orphan_clips(orphaned, output_dir):
+    """删除孤立的语音文件，目录清空后一并删除"""
+    for rel_path in orphaned:
+        path = os.path.join(output_dir, rel_path)
+        try:
+            os.remove(path)
+            print(f"🗑️ 删除孤立语音: {rel_path}")
+        except FileNotFoundError:
+            continue
+        parent = os.path.dirname(path)
+        remaining = [name for name in os.listdir(parent) if name != "voices.json"]
+        if not remaining and os.path.normpath(parent) != os.path.normpath(output_dir):
+            for name in os.listdir(parent):
+                os.remove(os.path.join(parent, name))
+            os.rmdir(parent)
+
+
+def dirty_groups(plan):
+    """根据计划找出需要重写配置的角色名，以及游戏事件配置是否需要重写"""
+    characters = set()
+    events = False
+    for rel_path in plan["added"] + plan["changed"] + plan["orphaned"]:
+        parts = rel_path.split("/")
+        if parts[0] == "characters" and len(parts) > 2:
+            characters.add(parts[1])
+        elif parts[0] == "game_events":
+            events = True
+    return characters, events
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成优先级
+按对局中被播放的概率给每个片段打分：回合流程和杀 / 闪 / 桃等核心台词最先，其次是阵亡与胜负，
+最后是 tension / relax 之类的氛围台词。客户端的播放记录（JSON Lines，每行
+{"character": "关羽", "event": "attack"} 或 {"event": "kill_use"}，可带 "count"）会按贝叶斯平滑
+修正默认分数。进度按已完成片段的播放概率之和（覆盖率）汇报，中断或限流时先拿到的是最常播放的语音。
+"""
+
+import json
+import os
+import threading
+from collections import Counter
+
+PLAY_LOG_PATH = os.getenv("TTS_PLAY_LOG", "play_log.jsonl")
+PLAY_PRIOR_PLAYS = float(os.getenv("TTS_PLAY_PRIOR_PLAYS", "200"))  # 默认分数相当于多少次播放记录
+TABLE_SEATS = 8  # 一局最多的武将数，用于把角色台词的默认分数折算为播放概率
+
+CORE_WEIGHT = 10.0
+OUTCOME_WEIGHT = 4.0
+NORMAL_WEIGHT = 2.0
+FLAVOR_WEIGHT = 1.0
+
+# 回合流程与杀 / 闪 / 桃 / 伤害（含角色的攻击、防御、受伤台词）
+CORE_KEYS = {
+    "game_start", "turn_start", "turn_end", "card_draw", "card_play", "kill_use", "dodge_use", "peach_use",
+    "damage_deal", "damage_receive", "draw_phase", "play_phase", "discard_phase", "card_kill", "card_dodge",
+    "card_peach", "damage_taken", "attack", "defend", "damage", "kill", "dodge", "peach",
+}
+# 阵亡、胜负与身份揭晓
+OUTCOME_KEYS = {
+    "game_end", "death", "player_death", "victory", "victory_lord", "victory_traitor", "victory_loyalist",
+    "victory_spy", "game_end_victory", "game_end_defeat", "lord_victory", "rebel_victory", "traitor_victory",
+    "identity_reveal", "lord_reveal",
+}
+# 氛围与提示类台词
+FLAVOR_KEYS = {
+    "tension", "relax", "surprise", "climax", "link_start", "link_end", "info", "success", "warning", "error",
+    "game_pause", "game_resume", "game_restart",
+}
+# 台词目录中的固定台词类型（含 game_voices 的 kill / dodge），其余角色台词（taunt、ally 等特殊台词）按氛围台词处理
+CHARACTER_LINE_KEYS = {"intro", "attack", "defend", "skill", "damage", "death", "victory", "kill", "dodge", "peach"}
+
+
+def play_key(job_key):
+    """任务键 → (角色名或 None, 事件 / 台词类型)
+
+    事件任务的键为事件名或 ("game_events", 事件名)，角色任务的键为 (角色名, 台词类型)。
+    """
+    if isinstance(job_key, str):
+        return None, job_key
+    owner, key = job_key
+    if owner == "game_events":
+        return None, key
+    return owner, key
+
+
+def default_weight(character, key):
+    """不考虑播放记录时的默认分数"""
+    if key in CORE_KEYS:
+        return CORE_WEIGHT
+    if key in OUTCOME_KEYS:
+        return OUTCOME_WEIGHT
+    if key in FLAVOR_KEYS or (character is not None and key not in CHARACTER_LINE_KEYS):
+        return FLAVOR_WEIGHT
+    return NORMAL_WEIGHT
+
+
+def load_play_counts(path=PLAY_LOG_PATH):
+    """读取客户端播放记录，返回 {(角色名或 None, 事件): 次数}，文件不存在时为空"""
+    counts = Counter()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    counts[(record.get("character"), record["event"])] += int(record.get("count", 1))
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    continue  # 跳过写了一半或格式不对的行
+    except FileNotFoundError:
+        pass
+    return counts
+
+
+class PlayPriority:
+    """片段的播放概率估计"""
+
+    def __init__(self, play_log=PLAY_LOG_PATH, prior_plays=PLAY_PRIOR_PLAYS):
+        self.play_log = play_log
+        self.prior_plays = prior_plays
+        self._counts = None
+
+    @property
+    def counts(self):
+        """播放记录在第一次计算权重时才读取"""
+        if self._counts is None:
+            self._counts = load_play_counts(self.play_log) if self.play_log else Counter()
+            if self._counts:
+                print(f"🎧 已读取播放记录: {sum(self._counts.values())} 次播放, {len(self._counts)} 条台词")
+        return self._counts
+
+    def weights(self, jobs):
+        """给一组任务估计播放概率，返回 {任务键: 概率}，概率之和为 1
+
+        默认分数归一化为先验，与播放记录的频率按 PLAY_PRIOR_PLAYS 次伪播放做平滑：
+        没有记录时完全按默认分数，记录越多越接近实际播放频率。
+        每次出杀都播放 kill_use，但只播放出杀武将的 attack，角色台词的先验因此按
+        1 / max(角色数, TABLE_SEATS) 折算（武将在场的概率 × 在场时由他出牌的概率）。
+        """
+        keys = {job[0]: play_key(job[0]) for job in jobs}
+        characters = {character for character, _ in keys.values() if character is not None}
+        seat_share = 1.0 / max(len(characters), TABLE_SEATS)
+        prior = {
+            job_key: default_weight(character, key) * (seat_share if character is not None else 1.0)
+            for job_key, (character, key) in keys.items()
+        }
+        prior_total = sum(prior.values()) or 1.0
+
+        counts = self.counts
+        observed = {job_key: counts.get(key, 0) for job_key, key in keys.items()}
+        plays = sum(observed.values())
+        return {
+            job_key: (observed[job_key] + self.prior_plays * prior[job_key] / prior_total) / (plays + self.prior_plays)
+            for job_key in keys
+        }
+
+    def order(self, jobs, weights):
+        """按播放概率从高到低排序任务，概率相同时保持原顺序"""
+        return sorted(jobs, key=lambda job: -weights.get(job[0], 0.0))
+
+
+class CoverageProgress:
+    """按播放概率加权的完成进度"""
+
+    def __init__(self, weights, done=(), report_every=0.1):
+        self.weights = weights
+        self.total = sum(weights.values()) or 1.0
+        self.lock = threading.Lock()
+        self.done = {job_key for job_key in done if job_key in weights}
+        self.report_every = report_every  # 覆盖率每增长这么多汇报一次
+        self.covered = sum(weights[job_key] for job_key in self.done)
+        self.reported = self.covered
+
+    def complete(self, job_key):
+        """记录一个完成的任务，覆盖率跨过汇报间隔时打印进度"""
+        with self.lock:
+            if job_key not in self.weights or job_key in self.done:
+                return
+            self.done.add(job_key)
+            self.covered += self.weights[job_key]
+            if (self.covered - self.reported) / self.total < self.report_every:
+                return
+            self.reported = self.covered
+        self.print_progress()
+
+    def coverage(self):
+        return self.covered / self.total
+
+    def print_progress(self):
+        print(f"📈 播放覆盖率 {self.coverage() * 100:.1f}% (已完成 {len(self.done)}/{len(self.weights)} 个片段)")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音文件完整性校验
+逐块解析 RIFF/WAVE 文件头（跳过音频数据本身），识别空文件、截断的下载和误存成 .wav 的 HTML / JSON 错误页；
+按台词字数检查时长，抽样读取少量窗口判断是否整段静音。文件多时在进程池中并行校验。
+"""
+
+import array
+import os
+import struct
+
+from tts_batch import CHARS_PER_SECOND, speech_chars
+
+SILENCE_PEAK = int(os.getenv("VERIFY_SILENCE_PEAK", "300"))  # 16 位 PCM 抽样峰值低于该值视为静音
+SILENCE_PROBES = 32  # 静音检测抽样的窗口数
+PROBE_MS = 20  # 每个抽样窗口的时长
+DURATION_SLACK = 2.0  # 时长上限额外允许的秒数（首尾静音、停顿）
+VERIFY_POOL_MIN = 64  # 文件数少于该值时不启动进程池
+SPRITE_DIR = "sprites"  # voice_bank 生成的音频精灵目录，不是台词片段，扫描语音目录时跳过
+
+WAVE_FORMATS = (1, 3, 0xFFFE)  # PCM、IEEE float、WAVE_FORMAT_EXTENSIBLE
+STREAMING_SIZES = (0, 0xFFFFFFFF)  # 流式生成的 WAV 在文件头里写的占位长度
+
+# 问题类型 → 报告中的名称
+PROBLEM_LABELS = {
+    "missing": "缺失文件",
+    "empty": "空文件",
+    "not_wav": "不是 WAV",
+    "truncated": "文件截断",
+    "silent": "整段静音",
+    "too_short": "时长过短",
+    "too_long": "时长过长",
+    "mismatch": "与生成记录不符",
+    "overwritten": "被其他台词覆盖",
+}
+# 文件本身完好、只是由别的台词生成（例如 generate_game_voices 写到了同一路径），不自动重新合成
+REPORT_ONLY_PROBLEMS = {"overwritten"}
+
+
+class WavFormatError(ValueError):
+    """文件不是完整的 WAV 音频"""
+
+    def __init__(self, problem, message):
+        super().__init__(message)
+        self.problem = problem
+
+
+def _sniff(header):
+    """猜测非 WAV 内容的来源，用于错误信息"""
+    stripped = header.lstrip()
+    if stripped[:1] == b"<":
+        return "内容像 HTML / XML 错误页"
+    if stripped[:1] in (b"{", b"["):
+        return "内容像 JSON 错误响应"
+    return f"文件头为 {header[:4]!r}"
+
+
+def read_wav_info(path):
+    """解析 WAV 文件头，返回 {"format", "channels", "rate", "bits", "block_align", "data_offset", "data_bytes",
+    "duration"}；不是完整 WAV 时抛出 WavFormatError
+
+    只读取各个块的块头，用 seek 跳过块内容，数据块的长度与文件大小对照判断是否截断。
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.read(12)
+        if not header:
+            raise WavFormatError("empty", "空文件")
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            raise WavFormatError("not_wav", f"不是 WAV 文件（{_sniff(header)}）")
+
+        fmt = None
+        offset = 12
+        while offset + 8 <= size:
+            f.seek(offset)
+            chunk_id, chunk_size = struct.unpack("<4sI", f.read(8))
+            body = offset + 8
+            if chunk_id == b"fmt ":
+                raw = f.read(16)
+                if chunk_size < 16 or len(raw) < 16:
+                    raise WavFormatError("truncated", "fmt 块不完整")
+                audio_format, channels, rate, _, block_align, bits = struct.unpack("<HHIIHH", raw)
+                if audio_format not in WAVE_FORMATS or not channels or not rate or not block_align:
+                    raise WavFormatError("not_wav", f"不支持的 WAV 格式 (format={audio_format}, 声道={channels}, "
+                                                    f"采样率={rate})")
+                fmt = {"format": audio_format, "channels": channels, "rate": rate, "bits": bits,
+                       "block_align": block_align}
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise WavFormatError("not_wav", "data 块之前缺少 fmt 块")
+                available = size - body
+                if chunk_size in STREAMING_SIZES:
+                    chunk_size = available
+                elif chunk_size > available:
+                    raise WavFormatError("truncated", f"数据块声明 {chunk_size} 字节，实际只有 {available} 字节")
+                data_bytes = chunk_size - chunk_size % fmt["block_align"]
+                if not data_bytes:
+                    raise WavFormatError("empty", "数据块为空")
+                return dict(fmt, data_offset=body, data_bytes=data_bytes,
+                            duration=data_bytes / (fmt["rate"] * fmt["block_align"]))
+            offset = body + chunk_size + (chunk_size & 1)
+    raise WavFormatError("truncated", "缺少 data 块")
+
+
+def is_silent(path, info, probes=SILENCE_PROBES, peak=SILENCE_PEAK):
+    """在音频数据中均匀抽取 probes 个窗口，所有窗口的峰值都低于 peak 时视为静音
+
+    只支持 16 位 PCM，其他格式返回 False。
+    """
+    if info["format"] != 1 or info["bits"] != 16:
+        return False
+    window = max(info["block_align"], info["rate"] * PROBE_MS // 1000 * info["block_align"])
+    data_bytes = info["data_bytes"]
+    if data_bytes <= window * probes:
+        starts = [0]
+        window = data_bytes
+    else:
+        step = (data_bytes - window) // (probes - 1)
+        starts = [i * step - i * step % info["block_align"] for i in range(probes)]
+
+    with open(path, 'rb') as f:
+        for start in starts:
+            f.seek(info["data_offset"] + start)
+            samples = array.array('h')
+            raw = f.read(window)
+            samples.frombytes(raw[:len(raw) - len(raw) % 2])
+            if array.array('h', [1]).tobytes() != b"\x01\x00":
+                samples.byteswap()  # WAV 为小端序
+            if samples and max(max(samples), -min(samples)) >= peak:
+                return False
+    return True
+
+
+def check_clip(task):
+    """校验单个片段，task 为 (路径, 台词或 None)，返回 (路径, 问题类型或 None, 说明, 时长)
+
+    顶层函数，供进程池调用。
+    """
+    path, text = task
+    try:
+        info = read_wav_info(path)
+    except FileNotFoundError:
+        return path, "missing", "文件不存在", None
+    except WavFormatError as e:
+        return path, e.problem, str(e), None
+    except (OSError, struct.error) as e:
+        return path, "not_wav", str(e), None
+
+    duration = info["duration"]
+    if is_silent(path, info):
+        return path, "silent", f"{duration:.2f} 秒全部低于静音门限", duration
+    chars = speech_chars(text) if text else 0
+    if chars:
+        shortest = chars / CHARS_PER_SECOND[1]
+        longest = chars / CHARS_PER_SECOND[0] + DURATION_SLACK
+        if duration < shortest:
+            return path, "too_short", f"{duration:.2f} 秒不足以读完 {chars} 字（至少 {shortest:.2f} 秒）", duration
+        if duration > longest:
+            return path, "too_long", f"{duration:.2f} 秒远超 {chars} 字的正常时长（至多 {longest:.2f} 秒）", duration
+    return path, None, "", duration
+
+
+def check_clips(tasks, workers=None):
+    """并行校验一组 (路径, 台词或 None)，返回 {路径: (问题类型, 说明)}，只包含有问题的片段"""
+    tasks = list(tasks)
+    if len(tasks) < VERIFY_POOL_MIN or workers == 1:
+        results = map(check_clip, tasks)
+        return {path: (problem, detail) for path, problem, detail, _ in results if problem}
+
+    from concurrent.futures import ProcessPoolExecutor  # 进程池连带 multiprocessing，只在文件多时导入
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(check_clip, tasks, chunksize=chunksize)
+        return {path: (problem, detail) for path, problem, detail, _ in results if problem}
+
+
+def find_wav_files(output_dir):
+    """语音目录下的全部 .wav 文件（相对路径，统一使用 /），不包括音频精灵"""
+    found = []
+    for root, dirs, files in os.walk(output_dir):
+        if root == output_dir and SPRITE_DIR in dirs:
+            dirs.remove(SPRITE_DIR)
+        for name in files:
+            if name.endswith(".wav"):
+                found.append(os.path.relpath(os.path.join(root, name), output_dir).replace("\\", "/"))
+    return sorted(found)
+
+
+def check_wav(path):
+    """下载完成后确认文件是完整的 WAV，不是时删除文件并抛出 WavFormatError"""
+    try:
+        return read_wav_info(path)
+    except WavFormatError:
+        os.remove(path)
+        raise